@@ -0,0 +1,306 @@
+import os
+import math
+import time
+import asyncio
+import hashlib
+import contextvars
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Optional, Sequence, Tuple
+
+from prompts import estimate_tokens
+
+# Requests per minute per tenant, for each rate-limited endpoint (0 disables). Off by
+# default: without an X-API-Key, users behind one NAT or proxy share a tenant
+RATE_LIMIT_START_PER_MINUTE = int(os.getenv("RATE_LIMIT_START_PER_MINUTE", "0"))
+RATE_LIMIT_ANSWER_PER_MINUTE = int(os.getenv("RATE_LIMIT_ANSWER_PER_MINUTE", "0"))
+RATE_LIMIT_PARTIAL_PER_MINUTE = int(os.getenv("RATE_LIMIT_PARTIAL_PER_MINUTE", "0"))
+RATE_LIMIT_END_PER_MINUTE = int(os.getenv("RATE_LIMIT_END_PER_MINUTE", "0"))
+# Estimated LLM tokens a single tenant may spend per minute (0 disables)
+TENANT_TOKENS_PER_MINUTE = int(os.getenv("TENANT_TOKENS_PER_MINUTE", "0"))
+# Upstream quota shared by all tenants, e.g. the Gemini tokens-per-minute limit (0 disables)
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "0"))
+# Longest a request may queue for upstream quota before getting a 429
+ADMISSION_MAX_WAIT_SECONDS = float(os.getenv("ADMISSION_MAX_WAIT_SECONDS", "10"))
+
+ENDPOINT_LIMITS = {
+    "start-interview": RATE_LIMIT_START_PER_MINUTE,
+    "submit-answer": RATE_LIMIT_ANSWER_PER_MINUTE,
+    "partial-answer": RATE_LIMIT_PARTIAL_PER_MINUTE,
+    "end-interview": RATE_LIMIT_END_PER_MINUTE,
+}
+
+# Tokens reserved per request until enough real usage has been measured
+DEFAULT_ENDPOINT_TOKENS = {
+    "start-interview": 3000,
+    "submit-answer": 2500,
+    "partial-answer": 1000,
+    "end-interview": 2500,
+}
+MIN_SAMPLES_FOR_ESTIMATE = 10
+
+MAX_TRACKED_KEYS = 10000
+
+_usage_scope: contextvars.ContextVar[Tuple[str, Optional[str], str]] = \
+    contextvars.ContextVar("usage_scope", default=("unattributed", None, "background"))
+# Sessions that split the cost of a call made on behalf of all of them
+_shared_sessions: contextvars.ContextVar[Tuple[str, ...]] = contextvars.ContextVar("shared_sessions", default=())
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a request can't be admitted; carries the Retry-After delay"""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def tenant_id(api_key: Optional[str], client_host: Optional[str]) -> str:
+    """Identify a tenant by (hashed) API key, falling back to the client address"""
+    if api_key:
+        return "key:" + hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+    return "ip:" + (client_host or "unknown")
+
+
+def bind_usage(tenant: str, session_id: Optional[str], endpoint: str) -> None:
+    """Attribute LLM usage in the current request (and tasks it starts) to a tenant and session"""
+    _usage_scope.set((tenant, session_id, endpoint))
+    _shared_sessions.set(())
+
+
+def bind_shared_usage(session_ids: Sequence[str], endpoint: str) -> None:
+    """Split LLM usage in the current task evenly across sessions (and their tenants)"""
+    _usage_scope.set(("unattributed", None, endpoint))
+    _shared_sessions.set(tuple(session_ids))
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, holding at most `capacity`"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self, amount: float = 1.0) -> float:
+        """Take `amount` tokens; returns 0 on success, else seconds until they'd be available"""
+        self._refill()
+        # Requests bigger than the bucket are admitted once it's full
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            self.tokens -= amount
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+
+class TokenLedger:
+    """Estimated (reserved at admission) and actual (measured) LLM tokens per session and tenant"""
+
+    def __init__(self):
+        self.sessions: "OrderedDict[str, Dict[str, int]]" = OrderedDict()
+        self.tenants: "OrderedDict[str, Dict[str, int]]" = OrderedDict()
+        self.endpoints: Dict[str, Dict[str, int]] = {}
+        self._session_tenants: "OrderedDict[str, str]" = OrderedDict()
+
+    @staticmethod
+    def _entry(table: OrderedDict, key: str) -> Dict[str, int]:
+        entry = table.pop(key, None) or {"estimated": 0, "actual": 0, "calls": 0}
+        table[key] = entry
+        while len(table) > MAX_TRACKED_KEYS:
+            table.popitem(last=False)
+        return entry
+
+    def estimate(self, endpoint: str) -> int:
+        """Expected tokens for one request, from measured usage once there's enough of it"""
+        measured = self.endpoints.get(endpoint)
+        if measured and measured["requests"] >= MIN_SAMPLES_FOR_ESTIMATE:
+            return max(1, measured["actual"] // measured["requests"])
+        return DEFAULT_ENDPOINT_TOKENS.get(endpoint, 1000)
+
+    def reserve(self, tenant: str, session_id: Optional[str], endpoint: str, tokens: int,
+                requests: int = 1) -> None:
+        """Record an admission-time estimate"""
+        self._entry(self.tenants, tenant)["estimated"] += tokens
+        if session_id:
+            self._entry(self.sessions, session_id)["estimated"] += tokens
+            self._session_tenants.pop(session_id, None)
+            self._session_tenants[session_id] = tenant
+            while len(self._session_tenants) > MAX_TRACKED_KEYS:
+                self._session_tenants.popitem(last=False)
+        self.endpoints.setdefault(endpoint, {"requests": 0, "actual": 0})["requests"] += requests
+
+    def record(self, prompt: str, response: str) -> int:
+        """Record the measured size of a completed call in the current usage scope"""
+        tenant, session_id, endpoint = _usage_scope.get()
+        tokens = estimate_tokens(prompt) + estimate_tokens(response)
+        shared = _shared_sessions.get()
+        if shared:
+            for i, shared_id in enumerate(shared):
+                share = tokens // len(shared) + (1 if i < tokens % len(shared) else 0)
+                self._charge(self._session_tenants.get(shared_id, tenant), shared_id, share)
+        else:
+            if session_id and tenant == "unattributed":
+                tenant = self._session_tenants.get(session_id, tenant)
+            self._charge(tenant, session_id, tokens)
+        if endpoint in self.endpoints:
+            self.endpoints[endpoint]["actual"] += tokens
+        return tokens
+
+    def _charge(self, tenant: str, session_id: Optional[str], tokens: int) -> None:
+        for entry in [self._entry(self.tenants, tenant)] + \
+                ([self._entry(self.sessions, session_id)] if session_id else []):
+            entry["actual"] += tokens
+            entry["calls"] += 1
+
+    def session_usage(self, session_id: str) -> Optional[Dict[str, int]]:
+        entry = self.sessions.get(session_id)
+        return dict(entry) if entry else None
+
+    def stats(self, top: int = 20) -> Dict[str, object]:
+        heaviest = sorted(self.tenants.items(), key=lambda item: item[1]["actual"], reverse=True)[:top]
+        return {
+            "tenants": {tenant: dict(entry) for tenant, entry in heaviest},
+            "endpoint_estimates": {endpoint: self.estimate(endpoint) for endpoint in DEFAULT_ENDPOINT_TOKENS},
+            "tracked_sessions": len(self.sessions),
+        }
+
+
+class FairQuota:
+    """Shared upstream token quota, granted round-robin across tenants when saturated
+
+    Each tenant has its own FIFO of waiting requests; the dispatcher serves
+    one request per tenant in turn, so a tenant with a burst of requests
+    can't starve the others.
+    """
+
+    def __init__(self, tokens_per_minute: int, max_wait: float = ADMISSION_MAX_WAIT_SECONDS):
+        self.bucket = TokenBucket(tokens_per_minute / 60.0, tokens_per_minute / 6.0)
+        self.max_wait = max_wait
+        self._waiting: "OrderedDict[str, Deque[Tuple[int, asyncio.Future]]]" = OrderedDict()
+        self._dispatcher: Optional[asyncio.Task] = None
+        self.queued = 0
+        self.rejected = 0
+
+    async def acquire(self, tenant: str, tokens: int) -> None:
+        """Wait for quota, or raise RateLimitExceeded if the wait would be too long"""
+        if not self._waiting and self.bucket.try_take(tokens) == 0:
+            return
+        wait = self._wait_estimate(tenant, tokens)
+        if wait > self.max_wait:
+            self.rejected += 1
+            raise RateLimitExceeded("Upstream quota saturated", wait)
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiting.setdefault(tenant, deque()).append((tokens, future))
+        self.queued += 1
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        await future
+
+    def _wait_estimate(self, tenant: str, tokens: int) -> float:
+        """Seconds until a new request would be granted under round-robin
+
+        Other tenants only get ahead of it by as much as this tenant has queued.
+        """
+        own = sum(cost for cost, _ in self._waiting.get(tenant, ())) + min(tokens, self.bucket.capacity)
+        ahead = own
+        for other, queue in self._waiting.items():
+            if other != tenant:
+                ahead += min(own, sum(cost for cost, _ in queue))
+        return max(0.0, ahead - self.bucket.tokens) / self.bucket.rate
+
+    async def _dispatch(self) -> None:
+        while self._waiting:
+            tenant, queue = next(iter(self._waiting.items()))
+            tokens, future = queue[0]
+            if not future.done():
+                delay = self.bucket.try_take(tokens)
+                if delay:
+                    await asyncio.sleep(delay)
+                    continue
+                future.set_result(None)
+            queue.popleft()
+            # Rotate: this tenant goes to the back of the line
+            del self._waiting[tenant]
+            if queue:
+                self._waiting[tenant] = queue
+
+    def depth(self) -> int:
+        return sum(len(queue) for queue in self._waiting.values())
+
+
+class AdmissionController:
+    """Per-tenant, per-endpoint request limits plus token budgets and a fair upstream queue"""
+
+    def __init__(self, ledger: TokenLedger, limits: Dict[str, int] = ENDPOINT_LIMITS,
+                 tenant_tokens_per_minute: int = TENANT_TOKENS_PER_MINUTE,
+                 upstream_tokens_per_minute: int = LLM_TOKENS_PER_MINUTE):
+        self.ledger = ledger
+        self.limits = limits
+        self.tenant_tokens_per_minute = tenant_tokens_per_minute
+        self.quota = FairQuota(upstream_tokens_per_minute) if upstream_tokens_per_minute else None
+        self._request_buckets: "OrderedDict[Tuple[str, str], TokenBucket]" = OrderedDict()
+        self._token_buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self.admitted = 0
+        self.rejected: Dict[str, int] = {"requests": 0, "tenant_tokens": 0, "upstream_quota": 0}
+
+    @staticmethod
+    def _bucket(table: OrderedDict, key, rate: float, capacity: float) -> TokenBucket:
+        bucket = table.pop(key, None) or TokenBucket(rate, capacity)
+        table[key] = bucket
+        while len(table) > MAX_TRACKED_KEYS:
+            table.popitem(last=False)
+        return bucket
+
+    async def admit(self, tenant: str, endpoint: str, session_id: Optional[str] = None,
+                    units: int = 1) -> None:
+        """Admit a request or raise RateLimitExceeded
+
+        `units` is the number of sessions a batch request covers; it counts
+        as one request but reserves tokens for each session.
+        """
+        per_minute = self.limits.get(endpoint, 0)
+        if per_minute:
+            # Bursts of up to a quarter of the per-minute limit
+            bucket = self._bucket(self._request_buckets, (tenant, endpoint),
+                                  per_minute / 60.0, max(1, math.ceil(per_minute / 4)))
+            delay = bucket.try_take()
+            if delay:
+                self.rejected["requests"] += 1
+                raise RateLimitExceeded(f"Too many {endpoint} requests", delay)
+
+        tokens = self.ledger.estimate(endpoint) * units
+        if self.tenant_tokens_per_minute:
+            bucket = self._bucket(self._token_buckets, tenant,
+                                  self.tenant_tokens_per_minute / 60.0, self.tenant_tokens_per_minute)
+            delay = bucket.try_take(tokens)
+            if delay:
+                self.rejected["tenant_tokens"] += 1
+                raise RateLimitExceeded("Token budget exhausted", delay)
+
+        if self.quota is not None:
+            try:
+                await self.quota.acquire(tenant, tokens)
+            except RateLimitExceeded:
+                self.rejected["upstream_quota"] += 1
+                raise
+
+        bind_usage(tenant, session_id, endpoint)
+        self.ledger.reserve(tenant, session_id, endpoint, tokens, units)
+        self.admitted += 1
+
+    def stats(self) -> Dict[str, object]:
+        """Admission counters, upstream queue depth and per-tenant token usage"""
+        return {
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+            "upstream_queue": self.quota.depth() if self.quota else 0,
+            "upstream_queued_total": self.quota.queued if self.quota else 0,
+            "ledger": self.ledger.stats(),
+        }
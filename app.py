@@ -1,29 +1,73 @@
 import os
 import json
+import math
 import uuid
+import asyncio
 import base64
-from typing import Dict, List, Optional
-from fastapi import FastAPI, Request, HTTPException, UploadFile, File, Form
-from fastapi.responses import HTMLResponse, JSONResponse
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence
+from fastapi import FastAPI, Request, HTTPException, UploadFile, File, Form, Query
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel
-import google.generativeai as genai
+from llm_client import LLMClient, create_backend, cancel_on_disconnect
+from resilience import LLM_DRAIN_SECONDS, ResilientLLMClient, LLMUnavailableError
+from admission import AdmissionController, RateLimitExceeded, TokenLedger, bind_shared_usage, bind_usage, tenant_id
+import telemetry
+from telemetry import (
+    STAGE_SECONDS, TraceMiddleware, child_span, finish_span, recent_traces, render_metrics, stage
+)
+from session_store import create_session_store
+from transcript_log import DurableSessionStore, TranscriptLog, apply_event
+from session_view import compress, encode_json, etag_for, etag_matches, parse_fields, project_session, response_headers
+from cache import TextCache, content_key
+from question_pool import QuestionPool, QUESTION_POOL_WARM_ON_STARTUP
+from memory import ConversationMemory, digest_history
+from evaluation import (
+    EvaluationQueue, FEEDBACK_SYNTHESIS, aggregate_feedback, build_batch_synthesis_prompt,
+    build_synthesis_prompt, parse_batch_synthesis
+)
+from feedback_batch import (
+    FeedbackBatcher, FEEDBACK_BATCH_CONCURRENCY, FEEDBACK_BATCH_MAX_SIZE, FEEDBACK_BATCH_SYNTHESIS_SIZE
+)
+from structured_output import (
+    Feedback, FeedbackSynthesis, StructuredOutputError, generate_structured, parse_json_response, validate
+)
+import structured_output
+from prompts import Prompt, PromptTemplate, context_cache
+from speculation import SpeculationManager, SPECULATIVE_FOLLOWUPS, TOPIC_ADVANCE, PARTIAL_ANSWER
+from question_bank import QuestionBank
+from resume_parser import (
+    RESUME_MAX_BYTES, ResumeTooLargeError, parse_resume_async, needs_llm_fallback, shutdown_executor
+)
 
-# Configure Gemini API
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if not GEMINI_API_KEY:
-    raise ValueError("GEMINI_API_KEY environment variable not set")
+# Estimated and measured token usage per tenant and session
+token_ledger = TokenLedger()
 
-genai.configure(api_key=GEMINI_API_KEY)
+# Configure the LLM client (Gemini by default, LLM_BACKEND=fake for offline runs),
+# with retries, a circuit breaker and optional hedging around every call
+llm = ResilientLLMClient(LLMClient(create_backend()), ledger=token_ledger)
+
+# Per-tenant rate limits and a fairly shared upstream token quota
+admission = AdmissionController(token_ledger)
 
 # Initialize FastAPI app
 app = FastAPI(title="Interview Practice Partner")
 app.mount("/static", StaticFiles(directory="static"), name="static")
 templates = Jinja2Templates(directory="templates")
 
-# In-memory session storage
-sessions: Dict[str, dict] = {}
+# Session storage (in-memory LRU by default, SQLite/Redis for multi-worker deployments)
+sessions = create_session_store()
+
+# Optional append-only transcript log: sessions survive restarts and are rebuilt on access
+transcript = TranscriptLog()
+if transcript.enabled:
+    sessions = DurableSessionStore(sessions, transcript)
+
+# Content-addressed caches so re-uploading the same resume skips the LLM entirely
+resume_text_cache = TextCache("resume_text")
+resume_summary_cache = TextCache("resume_summary")
 
 # Pydantic models for request/response
 class StartInterviewRequest(BaseModel):
@@ -36,10 +80,20 @@ class AnswerRequest(BaseModel):
     session_id: str
     answer: str
 
+class PartialAnswerRequest(BaseModel):
+    session_id: str
+    partial_answer: str
+
 class EndInterviewRequest(BaseModel):
     session_id: str
 
-# Enhanced Prompt templates with human-like conversation
+class EndInterviewsRequest(BaseModel):
+    session_ids: List[str]
+
+# Enhanced Prompt templates with human-like conversation.
+# Prompts are split into a static prefix (persona, role, resume) that is
+# byte-identical for a whole session and a per-turn tail, so providers can
+# reuse their cached context for the prefix.
 INTERVIEWER_SYSTEM_PROMPT = """You are an experienced professional interviewer named Alex conducting a {role} interview for a {experience_level} candidate at a {company_type} company.
 
 YOUR PERSONALITY & STYLE:
@@ -68,11 +122,48 @@ INTERVIEW APPROACH:
 FOCUS AREAS FOR {role}:
 {focus_areas}
 
-CURRENT STAGE: Question {question_number} of approximately 8-10 questions
+The interview runs approximately 8-10 questions.
 
 REMEMBER: You're having a conversation, not conducting an interrogation. Be human, be curious, be engaged.
 """
 
+OPENING_QUESTION_PROMPT = """
+You're starting the interview now.
+
+Generate a natural, engaging opening question. Options:
+1. If they have a resume: Ask about a specific project or experience from their background
+2. Classic opener with a twist: "Walk me through your journey into {role} - what sparked your interest?"
+3. Recent work: "Tell me about the most interesting {role}-related project you've worked on recently"
+
+Choose the most appropriate approach. Keep it conversational and welcoming (2-3 sentences max).
+{avoid_section}
+Return ONLY the question, nothing else."""
+
+FOLLOWUP_PROMPT = """
+{summary_section}RECENT CONVERSATION:
+{conversation}
+
+CURRENT STAGE: Question {question_number} of approximately 8-10 questions
+
+Based on their last answer, generate your next question. Consider:
+- What they just said - any interesting points to explore?
+- What haven't you asked about yet from the focus areas?
+- Should you dig deeper or move to a new topic?
+- If they were vague, can you ask for a specific example?
+- Around question {question_number}, consider gradually increasing depth
+
+Your response should feel natural, like you're genuinely interested in their answer.
+
+Return ONLY your next question (1-3 sentences), nothing else."""
+
+TOPIC_ADVANCE_PROMPT = """
+QUESTIONS ASKED SO FAR:
+{asked}
+The candidate is answering the last question right now. Write your next question, moving on to a focus area that hasn't been covered yet.
+Open with a brief, neutral transition (e.g. "Thanks for that. Let's talk about...") that doesn't depend on the details of their answer.
+
+Return ONLY your next question (1-3 sentences), nothing else."""
+
 RESUME_CONTEXT_TEMPLATE = """
 CANDIDATE'S RESUME HIGHLIGHTS:
 {resume_summary}
@@ -125,15 +216,56 @@ FOCUS_AREAS = {
 - Empathy: Understanding and addressing customer needs"""
 }
 
+# Served when the model is unavailable (circuit open or retries exhausted), so an
+# outage degrades the interview instead of failing it
+DEGRADED_QUESTIONS = {
+    "Software Engineer / SDE": [
+        "Tell me about the most technically challenging project you've worked on. What made it hard?",
+        "Walk me through how you'd debug a production issue you've never seen before.",
+        "How do you decide when code is good enough to ship? What does your testing look like?",
+        "Describe a time you disagreed with a teammate about a technical decision. How was it resolved?",
+        "How do you approach learning a new language or framework for a project?",
+    ],
+    "Data Analyst / Data Scientist": [
+        "Tell me about an analysis you did that changed a business decision. What was your approach?",
+        "How do you check that a dataset is clean and trustworthy before you use it?",
+        "Describe a time you had to explain a complex finding to a non-technical audience.",
+        "Which tools and methods do you reach for first on a new data problem, and why?",
+        "How do you decide which questions are worth investigating?",
+    ],
+    "Sales / Business Development": [
+        "Walk me through a deal you're proud of closing. What was your strategy?",
+        "Tell me about a tough objection from a prospect and how you handled it.",
+        "How do you find and qualify new leads?",
+        "How have you performed against your targets, and what drove those results?",
+        "How do you stay motivated after losing a deal you expected to win?",
+    ],
+    "Retail Associate / Customer Support": [
+        "Tell me about a time you turned an unhappy customer into a satisfied one.",
+        "How do you stay calm and organized when the store or queue is very busy?",
+        "What does great customer service mean to you? Give me an example.",
+        "How do you learn about new products so you can help customers?",
+        "Describe a time you worked with a colleague to solve a customer's problem.",
+    ],
+}
+
+GENERIC_DEGRADED_QUESTIONS = [
+    "Tell me about yourself and what draws you to this role.",
+    "Describe a challenge you faced at work and how you handled it.",
+    "What accomplishment are you most proud of, and why?",
+    "How do you handle feedback from a manager or colleague?",
+    "Where would you like to grow professionally over the next few years?",
+]
+
+# Values offered by the setup form (index.html)
+EXPERIENCE_LEVELS = ["Fresher", "Junior", "Mid", "Senior"]
+COMPANY_TYPES = ["general", "product-based", "service-based", "startup", "enterprise"]
+
 FEEDBACK_SYSTEM_PROMPT = """You are an expert interview coach named Sarah who provides constructive, specific feedback.
 
 INTERVIEW DETAILS:
 Role: {role}
 Experience Level: {experience_level}
-{resume_note}
-
-CONVERSATION TRANSCRIPT:
-{transcript}
 
 PROVIDE COMPREHENSIVE FEEDBACK in the following JSON format:
 {{
@@ -176,25 +308,69 @@ EVALUATION GUIDELINES:
 - If they were vague, note where they could have been more specific
 - Highlight both what worked AND what would make them stand out more
 
-Focus on actionable feedback that will genuinely help them improve."""
+Focus on actionable feedback that will genuinely help them improve.
+"""
 
-def get_gemini_model():
-    """Initialize Gemini model"""
-    return genai.GenerativeModel('gemini-2.5-flash')
+FEEDBACK_TRANSCRIPT_PROMPT = """
+{resume_note}
+CONVERSATION TRANSCRIPT:
+{transcript}
+Return ONLY the feedback JSON."""
+
+# Compiled once at import; rendering is a plain join
+interviewer_template = PromptTemplate(INTERVIEWER_SYSTEM_PROMPT)
+resume_context_template = PromptTemplate(RESUME_CONTEXT_TEMPLATE)
+opening_question_template = PromptTemplate(OPENING_QUESTION_PROMPT)
+followup_template = PromptTemplate(FOLLOWUP_PROMPT)
+topic_advance_template = PromptTemplate(TOPIC_ADVANCE_PROMPT)
+feedback_template = PromptTemplate(FEEDBACK_SYSTEM_PROMPT)
+feedback_transcript_template = PromptTemplate(FEEDBACK_TRANSCRIPT_PROMPT)
 
-def extract_resume_text(file_content: bytes, filename: str) -> str:
-    """Extract text from uploaded resume (PDF or plain text)"""
+@lru_cache(maxsize=1024)
+def interviewer_prefix(role: str, experience_level: str, company_type: str, resume_summary: str = "") -> str:
+    """The static part of every interviewer prompt, identical for a whole session"""
+    resume_context = ""
+    if resume_summary:
+        resume_context = resume_context_template.render(resume_summary=resume_summary)
+    return interviewer_template.render(
+        role=role,
+        experience_level=experience_level,
+        company_type=company_type,
+        focus_areas=FOCUS_AREAS.get(role, "General professional competencies"),
+        resume_context=resume_context
+    )
+
+@stage("resume_extraction")
+async def extract_resume_text(file_content: bytes, filename: str, content_type: str = "") -> str:
+    """Extract text from uploaded resume (PDF, DOCX or plain text)
+
+    Raises a 413 for uploads over RESUME_MAX_BYTES; other failures yield "".
+    """
+    cache_key = content_key(os.path.splitext(filename.lower())[1], file_content)
+    cached = await resume_text_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
     try:
-        if filename.lower().endswith('.pdf'):
-            # Use Gemini to extract text from PDF
-            model = get_gemini_model()
-            
-            # Convert to base64
-            import base64
-            pdf_base64 = base64.b64encode(file_content).decode('utf-8')
-            
-            prompt = """Extract all text content from this resume/CV. 
-            
+        # Parse locally first; Gemini is only needed for scanned PDFs
+        text = ""
+        try:
+            text = await parse_resume_async(file_content, filename, content_type)
+        except ResumeTooLargeError as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        except Exception as e:
+            print(f"Local resume parsing failed: {e}")
+        
+        if not needs_llm_fallback(text, filename):
+            if text:
+                await resume_text_cache.set(cache_key, text)
+            return text
+        
+        # Scanned or image-only PDF: use Gemini to extract text
+        pdf_base64 = base64.b64encode(file_content).decode('utf-8')
+        
+        prompt = """Extract all text content from this resume/CV. 
+        
 Format the output to include:
 - Contact information
 - Work experience (with dates, roles, companies)
@@ -205,28 +381,31 @@ Format the output to include:
 
 Keep the formatting clean and structured."""
 
-            response = model.generate_content([
-                {
-                    "mime_type": "application/pdf",
-                    "data": pdf_base64
-                },
-                prompt
-            ])
-            
-            return response.text
-        else:
-            # Plain text file
-            return file_content.decode('utf-8')
+        text = await llm.generate([
+            {
+                "mime_type": "application/pdf",
+                "data": pdf_base64
+            },
+            prompt
+        ])
+        await resume_text_cache.set(cache_key, text)
+        return text
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error extracting resume: {e}")
         return ""
 
-def analyze_resume_for_interview(resume_text: str, role: str) -> str:
+@stage("resume_analysis")
+async def analyze_resume_for_interview(resume_text: str, role: str) -> str:
     """Analyze resume and extract key points for interview"""
     if not resume_text or not resume_text.strip():
         return ""
     
-    model = get_gemini_model()
+    cache_key = content_key(role, resume_text)
+    cached = await resume_summary_cache.get(cache_key)
+    if cached is not None:
+        return cached
     
     prompt = f"""Analyze this resume for a {role} interview. Extract key points that an interviewer should probe:
 
@@ -243,90 +422,300 @@ Provide a concise summary (150-200 words) covering:
 Format as a bullet-point summary that an interviewer can quickly reference."""
     
     try:
-        response = model.generate_content(prompt)
-        return response.text
+        summary = await llm.generate(prompt)
+        await resume_summary_cache.set(cache_key, summary)
+        return summary
     except Exception as e:
         print(f"Error analyzing resume: {e}")
         return f"Resume uploaded - candidate has experience relevant to {role}"
 
-def generate_initial_question(role: str, experience_level: str, company_type: str, resume_summary: str = "") -> str:
-    """Generate the first interview question"""
-    model = get_gemini_model()
-    
-    focus = FOCUS_AREAS.get(role, "General professional competencies")
-    
-    resume_context = ""
-    if resume_summary:
-        resume_context = f"\n\nCANDIDATE'S BACKGROUND:\n{resume_summary}\n\nConsider their background when crafting your opening question."
-    
-    prompt = f"""You're Alex, starting an interview for a {role} position ({experience_level} level) at a {company_type} company.
-{resume_context}
+async def generate_initial_question(role: str, experience_level: str, company_type: str, resume_summary: str = "",
+                                    avoid: Sequence[str] = ()) -> str:
+    """Generate the first interview question, different from any in `avoid`"""
+    avoid_section = ""
+    if avoid:
+        avoid_section = "\nAsk something different from these questions:\n" + \
+            "".join(f"- {question}\n" for question in avoid)
+    prompt = context_cache.build(
+        "opening",
+        interviewer_prefix(role, experience_level, company_type, resume_summary),
+        opening_question_template.render(role=role, avoid_section=avoid_section)
+    )
+    response = await llm.generate(prompt.text, hedge=True)
+    return response.strip()
 
-Generate a natural, engaging opening question. Options:
-1. If they have a resume: Ask about a specific project or experience from their background
-2. Classic opener with a twist: "Walk me through your journey into {role} - what sparked your interest?"
-3. Recent work: "Tell me about the most interesting {role}-related project you've worked on recently"
+def degraded_question(role: str, asked: List[str]) -> str:
+    """A canned question for the role that hasn't been asked yet in this session"""
+    llm.degraded_responses += 1
+    candidates = DEGRADED_QUESTIONS.get(role, []) + GENERIC_DEGRADED_QUESTIONS
+    for question in candidates:
+        if question not in asked:
+            return question
+    return "Is there anything else about your experience you'd like to share?"
 
-Choose the most appropriate approach. Keep it conversational and welcoming (2-3 sentences max).
+# Opening questions for candidates without a resume depend only on the form
+# choices, so they can be generated ahead of time
+question_pool = QuestionPool(
+    generate_initial_question,
+    [(role, level, company_type)
+     for role in FOCUS_AREAS
+     for level in EXPERIENCE_LEVELS
+     for company_type in COMPANY_TYPES]
+)
 
-Return ONLY the question, nothing else."""
-    
-    response = model.generate_content(prompt)
-    return response.text.strip()
-
-def generate_followup_question(role: str, experience_level: str, company_type: str, 
-                               conversation_history: List[dict], question_number: int,
-                               resume_summary: str = "") -> str:
-    """Generate a follow-up question based on conversation history"""
-    model = get_gemini_model()
-    
-    focus = FOCUS_AREAS.get(role, "General professional competencies")
-    
+def build_followup_prompt(role: str, experience_level: str, company_type: str, 
+                          conversation_history: List[dict], question_number: int,
+                          resume_summary: str = "", conversation_summary: str = "") -> Prompt:
+    """Build the prompt for the next follow-up question"""
     # Build conversation context
     conversation_text = ""
     for turn in conversation_history[-3:]:  # Last 3 exchanges for context
         conversation_text += f"Alex: {turn['question']}\n"
         conversation_text += f"Candidate: {turn['answer']}\n\n"
     
-    resume_context_section = ""
-    if resume_summary:
-        resume_context_section = RESUME_CONTEXT_TEMPLATE.format(resume_summary=resume_summary)
+    # The rolling summary carries context from turns older than the recent window
+    summary_section = ""
+    if conversation_summary and len(conversation_history) > 3:
+        summary_section = f"INTERVIEW SO FAR (summary):\n{conversation_summary}\n\n"
     
-    system_prompt = INTERVIEWER_SYSTEM_PROMPT.format(
-        role=role,
-        experience_level=experience_level,
-        company_type=company_type,
-        focus_areas=focus,
-        question_number=question_number,
-        resume_context=resume_context_section
+    return context_cache.build(
+        "followup",
+        interviewer_prefix(role, experience_level, company_type, resume_summary),
+        followup_template.render(
+            summary_section=summary_section,
+            conversation=conversation_text,
+            question_number=question_number
+        )
     )
+
+async def generate_followup_question(role: str, experience_level: str, company_type: str, 
+                                     conversation_history: List[dict], question_number: int,
+                                     resume_summary: str = "", conversation_summary: str = "") -> str:
+    """Generate a follow-up question based on conversation history"""
+    prompt = build_followup_prompt(role, experience_level, company_type,
+                                   conversation_history, question_number, resume_summary,
+                                   conversation_summary)
+    response = await llm.generate(prompt.text, hedge=True)
+    return response.strip()
+
+def build_topic_advance_prompt(session: dict) -> Prompt:
+    """Build a prompt for a next question that doesn't depend on the pending answer"""
+    asked = ""
+    for turn in session["conversation_history"]:
+        asked += f"- {turn['question']}\n"
+    asked += f"- {session['current_question']}\n"
     
-    prompt = f"""{system_prompt}
+    return context_cache.build(
+        "topic_advance",
+        interviewer_prefix(session["role"], session["experience_level"], session["company_type"],
+                           session.get("resume_summary", "")),
+        topic_advance_template.render(asked=asked)
+    )
 
-RECENT CONVERSATION:
-{conversation_text}
+# Rolling conversation summary, updated in the background after each turn
+memory = ConversationMemory(llm, sessions)
 
-Based on their last answer, generate your next question. Consider:
-- What they just said - any interesting points to explore?
-- What haven't you asked about yet from the focus areas?
-- Should you dig deeper or move to a new topic?
-- If they were vague, can you ask for a specific example?
-- Around question {question_number}, consider gradually increasing depth
+# Per-answer scoring in the background, so ending the interview only aggregates
+evaluator = EvaluationQueue(llm, sessions)
 
-Your response should feel natural, like you're genuinely interested in their answer.
+def fully_evaluated(session: dict) -> bool:
+    """Whether every answer of a session was scored in the background"""
+    history = session["conversation_history"]
+    evaluations = session.get("turn_evaluations", [])
+    return len(evaluations) >= len(history) and all(evaluations[:len(history)])
 
-Return ONLY your next question (1-3 sentences), nothing else."""
+def apply_synthesis(feedback: dict, synthesis: FeedbackSynthesis) -> None:
+    """Replace aggregated strengths/improvements with the synthesized ones"""
+    for field in ("strengths", "areas_to_improve"):
+        if getattr(synthesis, field):
+            feedback[field] = getattr(synthesis, field)
+
+async def build_feedback(session: dict) -> dict:
+    """Aggregate background evaluations into feedback, or fall back to a single full call"""
+    history = session["conversation_history"]
+    evaluations = session.get("turn_evaluations", [])
+    if not fully_evaluated(session):
+        # Some answers weren't scored in the background
+        return await generate_feedback(
+            session["role"],
+            session["experience_level"],
+            history,
+            session.get("resume_summary", ""),
+            session.get("conversation_summary", ""),
+            session.get("turn_digests", [])
+        )
     
-    response = model.generate_content(prompt)
-    return response.text.strip()
+    evaluations = evaluations[:len(history)]
+    feedback = aggregate_feedback(history, evaluations)
+    if FEEDBACK_SYNTHESIS:
+        try:
+            synthesis = validate(parse_json_response(await llm.generate(build_synthesis_prompt(
+                session["role"],
+                session["experience_level"],
+                history,
+                evaluations,
+                session.get("conversation_summary", "")
+            ))), FeedbackSynthesis)
+            apply_synthesis(feedback, synthesis)
+        except Exception as e:
+            print(f"Error synthesizing feedback: {e}")
+    return feedback
 
-def generate_feedback(role: str, experience_level: str, conversation_history: List[dict], resume_summary: str = "") -> dict:
-    """Generate comprehensive interview feedback"""
-    model = get_gemini_model()
+def feedback_error(error: Exception) -> HTTPException:
+    """The HTTP error reported for a failed feedback generation"""
+    if isinstance(error, HTTPException):
+        return error
+    print(f"Feedback generation failed: {error}")
+    if isinstance(error, StructuredOutputError):
+        return HTTPException(status_code=502, detail="Could not generate feedback - please try again")
+    if isinstance(error, LLMUnavailableError):
+        return HTTPException(status_code=503, detail="The AI service is temporarily unavailable - please try again shortly")
+    return HTTPException(status_code=500, detail="Could not generate feedback")
+
+async def store_feedback(session_id: str, feedback: dict) -> dict:
+    """Save feedback on the latest copy of a session"""
+    event = {"type": "feedback", "feedback": feedback}
+    if await sessions.update(session_id, lambda latest: apply_event(latest, event) is not None):
+        await transcript.append(session_id, event)
+    evaluator.discard(session_id)
+    return feedback
+
+async def finish_interviews(session_ids: List[str]) -> Dict[str, object]:
+    """Build and store feedback for a batch of ended interviews
+
+    Sessions whose answers were all scored in the background are grouped by
+    role and level, and each group shares synthesis calls with the rubric
+    written once. The rest get their own feedback call. Returns feedback or
+    an HTTPException per session.
+    """
+    semaphore = asyncio.Semaphore(FEEDBACK_BATCH_CONCURRENCY)
+    results: Dict[str, object] = {}
+    
+    async def prepare(session_id: str) -> dict:
+        async with semaphore:
+            bind_usage("unattributed", session_id, "end-interview")
+            speculator.discard(session_id)
+            await memory.wait(session_id)
+            await evaluator.wait(session_id)
+            session = await sessions.get(session_id)
+            if session is None:
+                raise HTTPException(status_code=404, detail="Session not found")
+            if not session["conversation_history"]:
+                raise HTTPException(status_code=400, detail="No answers to evaluate")
+            return session
     
-    # Build full transcript
+    async def finish_one(session_id: str, session: dict) -> None:
+        async with semaphore:
+            bind_usage("unattributed", session_id, "end-interview")
+            try:
+                with stage("feedback"):
+                    feedback = await build_feedback(session)
+            except Exception as e:
+                results[session_id] = feedback_error(e)
+                return
+        results[session_id] = await store_feedback(session_id, feedback)
+    
+    async def finish_group(role: str, experience_level: str, group: Dict[str, dict]) -> None:
+        labels = {f"C{i}": session_id for i, session_id in enumerate(group, 1)}
+        feedbacks = {
+            session_id: aggregate_feedback(
+                session["conversation_history"],
+                session["turn_evaluations"][:len(session["conversation_history"])]
+            )
+            for session_id, session in group.items()
+        }
+        async with semaphore:
+            # One call on behalf of the whole group, so its cost is split between the sessions
+            bind_shared_usage(list(group), "end-interview")
+            with stage("feedback", batch_size=len(group)):
+                try:
+                    syntheses = parse_batch_synthesis(await llm.generate(build_batch_synthesis_prompt(
+                        role, experience_level, {label: group[session_id] for label, session_id in labels.items()}
+                    )))
+                    feedback_batcher.shared_synthesis_calls += 1
+                    feedback_batcher.synthesis_calls_saved += len(group) - 1
+                except Exception as e:
+                    print(f"Error synthesizing batch feedback: {e}")
+                    syntheses = {}
+        for label, session_id in labels.items():
+            if label in syntheses:
+                apply_synthesis(feedbacks[session_id], syntheses[label])
+            results[session_id] = await store_feedback(session_id, feedbacks[session_id])
+    
+    prepared = await asyncio.gather(*(prepare(session_id) for session_id in session_ids), return_exceptions=True)
+    groups: Dict[tuple, Dict[str, dict]] = {}
+    jobs = []
+    for session_id, session in zip(session_ids, prepared):
+        if isinstance(session, Exception):
+            results[session_id] = feedback_error(session)
+        elif FEEDBACK_SYNTHESIS and fully_evaluated(session):
+            groups.setdefault((session["role"], session["experience_level"]), {})[session_id] = session
+        else:
+            jobs.append(finish_one(session_id, session))
+    for (role, experience_level), group in groups.items():
+        members = list(group.items())
+        for start in range(0, len(members), FEEDBACK_BATCH_SYNTHESIS_SIZE):
+            chunk = dict(members[start:start + FEEDBACK_BATCH_SYNTHESIS_SIZE])
+            if len(chunk) == 1:
+                (session_id, session), = chunk.items()
+                jobs.append(finish_one(session_id, session))
+            else:
+                jobs.append(finish_group(role, experience_level, chunk))
+    await asyncio.gather(*jobs)
+    return results
+
+# Concurrent end-interview requests are coalesced into batches
+feedback_batcher = FeedbackBatcher(finish_interviews)
+
+# Speculative follow-ups: generate the next question while the candidate is still answering
+speculator = SpeculationManager()
+
+def start_topic_advance(session_id: str, session: dict) -> None:
+    """Speculatively generate a topic-advance question for the question just shown"""
+    if session.get("speculative"):
+        speculator.start(session_id, TOPIC_ADVANCE, session["question_count"] + 1,
+                         llm.generate(build_topic_advance_prompt(session).text))
+
+async def take_speculative_question(session_id: str, session: dict, answer: str) -> Optional[tuple]:
+    """Reuse a speculative (question, kind) that fits the submitted answer"""
+    if not session.get("speculative"):
+        return None
+    # Alternate digging deeper with moving on: never advance the topic twice in a row
+    return await speculator.take(
+        session_id,
+        session["question_count"] + 1,
+        answer,
+        allow_topic_advance=session.get("last_question_kind") != TOPIC_ADVANCE
+    )
+
+# Follow-ups the model wrote for earlier answers, reused when a new answer is similar
+question_bank = QuestionBank(FOCUS_AREAS)
+
+def candidate_text(history: List[dict], conversation_summary: str = "") -> str:
+    """Everything the candidate said in these turns, plus the summary built from it"""
+    return "\n".join([turn["answer"] for turn in history] + [conversation_summary])
+
+def banked_question(session: dict, turn: dict, question_number: int) -> Optional[str]:
+    """A banked follow-up that fits this answer; resume-tailored interviews always ask the model"""
+    if session.get("resume_summary"):
+        return None
+    return question_bank.find(session["role"], session["experience_level"], question_number,
+                              turn["answer"], asked_questions(session),
+                              candidate_text(session["conversation_history"], session.get("conversation_summary", "")))
+
+def sse_event(data: dict, event: Optional[str] = None) -> str:
+    """Format a Server-Sent Events message"""
+    message = f"event: {event}\n" if event else ""
+    return message + f"data: {json.dumps(data)}\n\n"
+
+async def generate_feedback(role: str, experience_level: str, conversation_history: List[dict], resume_summary: str = "",
+                            conversation_summary: str = "", turn_digests: Optional[List[str]] = None) -> dict:
+    """Generate comprehensive interview feedback"""
+    # Build full transcript, with very long answers replaced by their digest
     transcript = ""
-    for i, turn in enumerate(conversation_history, 1):
+    if conversation_summary:
+        transcript += f"Interview summary: {conversation_summary}\n\n"
+    for i, turn in enumerate(digest_history(conversation_history, turn_digests or []), 1):
         transcript += f"Question {i}: {turn['question']}\n"
         transcript += f"Answer {i}: {turn['answer']}\n\n"
     
@@ -334,42 +723,66 @@ def generate_feedback(role: str, experience_level: str, conversation_history: Li
     if resume_summary:
         resume_note = f"Note: Candidate provided a resume. Consider whether they effectively referenced their background."
     
-    prompt = FEEDBACK_SYSTEM_PROMPT.format(
-        role=role,
-        experience_level=experience_level,
-        transcript=transcript,
-        resume_note=resume_note
+    prompt = context_cache.build(
+        "feedback",
+        feedback_template.render(role=role, experience_level=experience_level),
+        feedback_transcript_template.render(resume_note=resume_note, transcript=transcript)
     )
     
-    response = model.generate_content(prompt)
-    
-    # Parse JSON response
+    # Streamed and parsed incrementally; only broken fields are re-requested
+    feedback = await generate_structured(llm, prompt.text, Feedback)
+    return feedback.model_dump()
+
+async def admit(request: Request, endpoint: str, session_id: Optional[str] = None, units: int = 1) -> None:
+    """Apply rate limits and quota for the calling tenant, or raise 429 with Retry-After"""
+    client_host = request.client.host if request.client else None
     try:
-        response_text = response.text.strip()
-        if response_text.startswith("```json"):
-            response_text = response_text[7:]
-        if response_text.endswith("```"):
-            response_text = response_text[:-3]
-        response_text = response_text.strip()
-        
-        feedback = json.loads(response_text)
-        return feedback
-    except json.JSONDecodeError as e:
-        print(f"JSON parsing error: {e}")
-        print(f"Response text: {response_text}")
-        # Fallback
-        return {
-            "overall_score": 7,
-            "dimension_scores": {
-                "communication_clarity": 7,
-                "confidence_structure": 7,
-                "technical_knowledge": 7,
-                "role_specific_skills": 7
-            },
-            "strengths": ["Completed the interview and provided thoughtful responses"],
-            "areas_to_improve": ["Unable to generate detailed feedback - please try again"],
-            "improved_answers": []
-        }
+        await admission.admit(tenant_id(request.headers.get("X-API-Key"), client_host), endpoint,
+                              session_id, units)
+    except RateLimitExceeded as e:
+        raise HTTPException(status_code=429, detail=f"{e.reason} - please retry shortly",
+                            headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))})
+
+async def load_session(session_id: str) -> dict:
+    """Fetch a session or raise 404"""
+    session = await sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return session
+
+# Root span and latency metrics for every request
+app.add_middleware(TraceMiddleware)
+
+@app.on_event("startup")
+async def startup():
+    """Recover the transcript log and start background warm-up work"""
+    await transcript.open()
+    evaluator.start()
+    if QUESTION_POOL_WARM_ON_STARTUP:
+        asyncio.create_task(question_pool.warm())
+
+async def drain_background_work(timeout: float) -> None:
+    """Let queued scoring, summary updates and in-flight model calls finish, up to a timeout"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    await evaluator.drain(timeout)
+    await memory.drain(max(0.0, deadline - loop.time()))
+    await llm.drain(max(0.0, deadline - loop.time()))
+    if llm.in_flight:
+        print(f"Shutting down with {llm.in_flight} model call(s) still in flight")
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Drain background work, then release background resources"""
+    # Requests have finished by now; speculative work isn't worth waiting for
+    question_pool.close()
+    speculator.close()
+    await drain_background_work(LLM_DRAIN_SECONDS)
+    feedback_batcher.close()
+    memory.close()
+    evaluator.close()
+    shutdown_executor()
+    await transcript.close()
 
 # Routes
 @app.get("/", response_class=HTMLResponse)
@@ -380,20 +793,19 @@ async def home(request: Request):
 @app.get("/interview/{session_id}", response_class=HTMLResponse)
 async def interview_page(request: Request, session_id: str):
     """Render interview page"""
-    if session_id not in sessions:
-        raise HTTPException(status_code=404, detail="Session not found")
+    session = await load_session(session_id)
     return templates.TemplateResponse("interview.html", {
         "request": request,
-        "session_id": session_id
+        "session_id": session_id,
+        "role": session["role"],
+        "experience_level": session["experience_level"],
+        "speculative": session.get("speculative", False)
     })
 
 @app.get("/feedback/{session_id}", response_class=HTMLResponse)
 async def feedback_page(request: Request, session_id: str):
     """Render feedback page"""
-    if session_id not in sessions:
-        raise HTTPException(status_code=404, detail="Session not found")
-    
-    session = sessions[session_id]
+    session = await load_session(session_id)
     if not session.get("feedback"):
         raise HTTPException(status_code=400, detail="Interview not completed")
     
@@ -405,6 +817,7 @@ async def feedback_page(request: Request, session_id: str):
 
 @app.post("/api/start-interview")
 async def start_interview(
+    request: Request,
     role: str = Form(...),
     experience_level: str = Form(...),
     company_type: str = Form("general"),
@@ -412,29 +825,50 @@ async def start_interview(
 ):
     """Start a new interview session"""
     session_id = str(uuid.uuid4())
+    await admit(request, "start-interview", session_id)
     
     # Process resume if uploaded
     resume_text = ""
     resume_summary = ""
     if resume:
         try:
-            content = await resume.read()
-            resume_text = extract_resume_text(content, resume.filename)
+            # Read one byte past the cap, so an oversized upload is rejected before it's buffered or hashed
+            content = await resume.read(RESUME_MAX_BYTES + 1)
+            if len(content) > RESUME_MAX_BYTES:
+                raise HTTPException(status_code=413, detail=f"Resume is larger than {RESUME_MAX_BYTES} bytes")
+            resume_text = await cancel_on_disconnect(
+                request, extract_resume_text(content, resume.filename, resume.content_type or "")
+            )
             if resume_text:
-                resume_summary = analyze_resume_for_interview(resume_text, role)
+                resume_summary = await cancel_on_disconnect(
+                    request, analyze_resume_for_interview(resume_text, role)
+                )
+        except HTTPException:
+            raise
         except Exception as e:
             print(f"Error processing resume: {e}")
     
-    # Generate first question
-    first_question = generate_initial_question(
-        role,
-        experience_level,
-        company_type,
-        resume_summary
-    )
+    # Generate first question (served from the pre-generated pool when there's no resume)
+    with stage("first_question") as span:
+        first_question = None
+        if not resume_summary:
+            first_question = question_pool.take(role, experience_level, company_type)
+        span.set(source="pool" if first_question else "llm")
+        if first_question is None:
+            try:
+                first_question = await cancel_on_disconnect(request, generate_initial_question(
+                    role,
+                    experience_level,
+                    company_type,
+                    resume_summary
+                ))
+            except LLMUnavailableError as e:
+                print(f"Serving a degraded opening question: {e}")
+                span.set(source="degraded")
+                first_question = degraded_question(role, [])
     
     # Create session
-    sessions[session_id] = {
+    session = {
         "role": role,
         "experience_level": experience_level,
         "company_type": company_type,
@@ -443,80 +877,419 @@ async def start_interview(
         "conversation_history": [],
         "current_question": first_question,
         "question_count": 1,
-        "feedback": None
+        "feedback": None,
+        "speculative": SPECULATIVE_FOLLOWUPS,
+        "last_question_kind": None
     }
+    await sessions.set(session_id, session)
+    await transcript.append(session_id, {"type": "start", "session": session})
+    start_topic_advance(session_id, session)
     
     return {
         "session_id": session_id,
         "question": first_question
     }
 
+def asked_questions(session: dict) -> List[str]:
+    """Every question shown so far in a session"""
+    return [turn["question"] for turn in session["conversation_history"]] + [session["current_question"]]
+
+def replayed_turn(session: dict, idempotency_key: Optional[str], route: str) -> Optional[dict]:
+    """The response already given for a retried answer, if its idempotency key was seen"""
+    question_number = session.get("idempotency_keys", {}).get(idempotency_key) if idempotency_key else None
+    if question_number is None:
+        return None
+    telemetry.IDEMPOTENT_REPLAYS.inc(route=route)
+    if question_number == session["question_count"]:
+        question = session["current_question"]
+    else:
+        question = session["conversation_history"][question_number - 1]["question"]
+    return {
+        "question": question,
+        "question_number": question_number
+    }
+
+async def commit_turn(session_id: str, turn: dict, question_number: int, next_question: str,
+                      kind: str, idempotency_key: Optional[str] = None) -> Optional[dict]:
+    """Record an answered turn and the next question on the latest copy of the session
+
+    Background tasks (memory, evaluations) and other workers may have updated
+    the session while the question was generated, so the turn is applied
+    atomically to the stored copy. Returns None if another request already
+    advanced the session. The turn is acknowledged only once it is in the
+    transcript log.
+    """
+    event = {
+        "type": "turn",
+        "question_number": question_number,
+        "turn": turn,
+        "next_question": next_question,
+        "kind": kind,
+        "idempotency_key": idempotency_key
+    }
+    
+    def apply_turn(latest: dict) -> bool:
+        if latest["question_count"] != question_number - 1:
+            return False
+        apply_event(latest, event)
+        return True
+    
+    latest = await sessions.update(session_id, apply_turn)
+    if latest is None:
+        return None
+    
+    # Questions tailored to a resume could carry the candidate's details into other interviews
+    if kind == "followup" and not latest.get("resume_summary"):
+        # The prompt carried earlier answers and the summary too, so their specifics count as echoes
+        earlier = candidate_text(latest["conversation_history"][:-1], latest.get("conversation_summary", ""))
+        question_bank.add(latest["role"], latest["experience_level"], question_number,
+                          turn["question"], turn["answer"], next_question, earlier)
+    start_topic_advance(session_id, latest)
+    memory.schedule(session_id)
+    evaluator.enqueue(session_id, len(latest["conversation_history"]) - 1, latest)
+    await transcript.append(session_id, event)
+    return latest
+
 @app.post("/api/submit-answer")
-async def submit_answer(request: AnswerRequest):
+async def submit_answer(request: AnswerRequest, http_request: Request):
     """Submit an answer and get next question"""
-    if request.session_id not in sessions:
-        raise HTTPException(status_code=404, detail="Session not found")
-    
-    session = sessions[request.session_id]
+    session = await load_session(request.session_id)
+    # Clients resend the same Idempotency-Key when retrying an answer
+    idempotency_key = http_request.headers.get("Idempotency-Key")
+    replay = replayed_turn(session, idempotency_key, "submit-answer")
+    if replay:
+        return replay
+    await admit(http_request, "submit-answer", request.session_id)
+    speculative = await take_speculative_question(request.session_id, session, request.answer)
     
-    # Store the Q&A pair
-    session["conversation_history"].append({
+    # The Q&A pair is stored together with the next question
+    turn = {
         "question": session["current_question"],
         "answer": request.answer
-    })
+    }
+    question_number = session["question_count"] + 1
     
     # Generate next question
-    session["question_count"] += 1
-    next_question = generate_followup_question(
-        session["role"],
-        session["experience_level"],
-        session["company_type"],
-        session["conversation_history"],
-        session["question_count"],
-        session.get("resume_summary", "")
-    )
+    banked = None if speculative else banked_question(session, turn, question_number)
+    with stage("followup") as span:
+        if speculative:
+            next_question, kind = speculative
+        elif banked:
+            next_question, kind = banked, "bank"
+        else:
+            try:
+                next_question = await cancel_on_disconnect(http_request, generate_followup_question(
+                    session["role"],
+                    session["experience_level"],
+                    session["company_type"],
+                    session["conversation_history"] + [turn],
+                    question_number,
+                    session.get("resume_summary", ""),
+                    session.get("conversation_summary", "")
+                ))
+                kind = "followup"
+            except LLMUnavailableError as e:
+                print(f"Serving a degraded follow-up question: {e}")
+                next_question = degraded_question(session["role"], asked_questions(session))
+                kind = "degraded"
+        span.set(kind=kind)
     
-    session["current_question"] = next_question
+    if await commit_turn(request.session_id, turn, question_number, next_question, kind, idempotency_key) is None:
+        # A concurrent retry of the same answer may have committed first
+        replay = replayed_turn(await load_session(request.session_id), idempotency_key, "submit-answer")
+        if replay:
+            return replay
+        raise HTTPException(status_code=409, detail="Session changed while generating the next question")
     
     return {
         "question": next_question,
-        "question_number": session["question_count"]
+        "question_number": question_number
     }
 
-@app.post("/api/end-interview")
-async def end_interview(request: EndInterviewRequest):
-    """End interview and generate feedback"""
-    if request.session_id not in sessions:
-        raise HTTPException(status_code=404, detail="Session not found")
+@app.post("/api/submit-answer/stream")
+async def submit_answer_stream(request: AnswerRequest, http_request: Request):
+    """Submit an answer and stream the next question as Server-Sent Events"""
+    session = await load_session(request.session_id)
+    idempotency_key = http_request.headers.get("Idempotency-Key")
+    replay = replayed_turn(session, idempotency_key, "submit-answer/stream")
+    if replay:
+        return StreamingResponse(iter([sse_event({"token": replay["question"]}), sse_event(replay, event="done")]),
+                                 media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+    await admit(http_request, "submit-answer", request.session_id)
+    turn = {
+        "question": session["current_question"],
+        "answer": request.answer
+    }
+    question_number = session["question_count"] + 1
+    prompt = build_followup_prompt(
+        session["role"],
+        session["experience_level"],
+        session["company_type"],
+        session["conversation_history"] + [turn],
+        question_number,
+        session.get("resume_summary", ""),
+        session.get("conversation_summary", "")
+    )
+    speculative = await take_speculative_question(request.session_id, session, request.answer)
+    banked = None if speculative else banked_question(session, turn, question_number)
     
-    session = sessions[request.session_id]
+    async def event_stream():
+        chunks = []
+        kind = "followup"
+        # The body is iterated outside the route's context, so this span isn't made current
+        span = child_span("stage.followup", streamed=True)
+        try:
+            if speculative:
+                question, kind = speculative
+                chunks.append(question)
+                yield sse_event({"token": question})
+            elif banked:
+                kind = "bank"
+                chunks.append(banked)
+                yield sse_event({"token": banked})
+            else:
+                async for chunk in llm.stream(prompt.text):
+                    chunks.append(chunk)
+                    yield sse_event({"token": chunk})
+        except LLMUnavailableError as e:
+            if chunks:
+                print(f"Error streaming question: {e}")
+                yield sse_event({"detail": "Failed to generate the next question"}, event="error")
+                return
+            print(f"Serving a degraded follow-up question: {e}")
+            kind = "degraded"
+            question = degraded_question(session["role"], asked_questions(session))
+            chunks.append(question)
+            yield sse_event({"token": question})
+        except Exception as e:
+            print(f"Error streaming question: {e}")
+            telemetry.STAGE_ERRORS.inc(stage="followup")
+            finish_span(span, e)
+            yield sse_event({"detail": "Failed to generate the next question"}, event="error")
+            return
+        span.set(kind=kind)
+        STAGE_SECONDS.observe(finish_span(span), stage="followup")
+        
+        # Commit the turn only once the whole question has arrived, so a
+        # dropped stream leaves the session untouched and the answer can be resent
+        next_question = "".join(chunks).strip()
+        if await commit_turn(request.session_id, turn, question_number, next_question, kind,
+                             idempotency_key) is None:
+            replay = replayed_turn(await sessions.get(request.session_id) or {}, idempotency_key,
+                                   "submit-answer/stream")
+            if replay:
+                yield sse_event(replay, event="done")
+            else:
+                yield sse_event({"detail": "Session changed while streaming"}, event="error")
+            return
+        
+        yield sse_event({
+            "question": next_question,
+            "question_number": question_number
+        }, event="done")
     
-    if not session["conversation_history"]:
-        raise HTTPException(status_code=400, detail="No answers to evaluate")
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+
+@app.post("/api/partial-answer")
+async def partial_answer(request: PartialAnswerRequest, http_request: Request):
+    """Speculatively generate the next question from the answer typed so far"""
+    session = await load_session(request.session_id)
+    if not session.get("speculative"):
+        raise HTTPException(status_code=400, detail="Speculative mode is not enabled")
+    # Speculation is optional work: skip it rather than queue when over the limits
+    try:
+        await admit(http_request, "partial-answer", request.session_id)
+    except HTTPException:
+        return {"started": False}
     
-    # Generate feedback
-    feedback = generate_feedback(
+    turn = {
+        "question": session["current_question"],
+        "answer": request.partial_answer
+    }
+    prompt = build_followup_prompt(
         session["role"],
         session["experience_level"],
-        session["conversation_history"],
-        session.get("resume_summary", "")
+        session["company_type"],
+        session["conversation_history"] + [turn],
+        session["question_count"] + 1,
+        session.get("resume_summary", ""),
+        session.get("conversation_summary", "")
     )
+    started = speculator.start(request.session_id, PARTIAL_ANSWER, session["question_count"] + 1,
+                               llm.generate(prompt.text), basis=request.partial_answer)
     
-    session["feedback"] = feedback
+    return {"started": started}
+
+@app.post("/api/end-interview")
+async def end_interview(request: EndInterviewRequest, http_request: Request):
+    """End interview and generate feedback"""
+    await admit(http_request, "end-interview", request.session_id)
+    
+    # Generate feedback (mostly aggregation of the per-answer evaluations),
+    # batched with any other interviews ending at the same moment
+    feedback = await cancel_on_disconnect(http_request, feedback_batcher.submit(request.session_id))
     
     return {
         "feedback": feedback,
         "redirect_url": f"/feedback/{request.session_id}"
     }
 
+@app.post("/api/end-interviews")
+async def end_interviews(request: EndInterviewsRequest, http_request: Request):
+    """End many interviews at once, streaming each session's feedback as Server-Sent Events"""
+    session_ids = list(dict.fromkeys(request.session_ids))
+    if not session_ids:
+        raise HTTPException(status_code=400, detail="No sessions given")
+    if len(session_ids) > FEEDBACK_BATCH_MAX_SIZE:
+        raise HTTPException(status_code=400, detail=f"At most {FEEDBACK_BATCH_MAX_SIZE} sessions per request")
+    await admit(http_request, "end-interview", units=len(session_ids))
+    
+    async def finish(session_id: str) -> tuple:
+        try:
+            return session_id, await feedback_batcher.submit(session_id), None
+        except HTTPException as e:
+            return session_id, None, e
+    
+    async def event_stream():
+        # Results are sent in completion order, each tagged with its session
+        for next_result in asyncio.as_completed([finish(session_id) for session_id in session_ids]):
+            session_id, feedback, error = await next_result
+            if error is not None:
+                yield sse_event({"session_id": session_id, "status_code": error.status_code,
+                                 "detail": error.detail}, event="error")
+            else:
+                yield sse_event({"session_id": session_id, "feedback": feedback,
+                                 "redirect_url": f"/feedback/{session_id}"})
+        yield sse_event({"sessions": len(session_ids)}, event="done")
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+
 @app.get("/api/session/{session_id}")
-async def get_session(session_id: str):
-    """Get session data"""
-    if session_id not in sessions:
-        raise HTTPException(status_code=404, detail="Session not found")
+async def get_session(session_id: str, request: Request, fields: Optional[str] = None,
+                      since: Optional[int] = Query(None, ge=0)):
+    """Get session data, optionally only some `fields` and only the turns from index `since`
+
+    Answers 304 when If-None-Match still matches, and compresses large bodies.
+    """
+    try:
+        names = parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    session = await load_session(session_id)
+    body = encode_json(project_session(session, names, since))
+    etag = etag_for(body)
+    if etag_matches(request.headers.get("If-None-Match"), etag):
+        telemetry.SESSION_READS.inc(result="not_modified")
+        return Response(status_code=304, headers=response_headers(etag, None))
     
-    return sessions[session_id]
+    content, encoding = compress(body, request.headers.get("Accept-Encoding"))
+    telemetry.SESSION_READS.inc(result="ok")
+    telemetry.SESSION_READ_BYTES.inc(len(body), stage="raw")
+    telemetry.SESSION_READ_BYTES.inc(len(content), stage="sent")
+    return Response(content, media_type="application/json", headers=response_headers(etag, encoding))
+
+@app.get("/api/evaluation-status/{session_id}")
+async def evaluation_status(session_id: str):
+    """How many answers have been scored so far"""
+    session = await load_session(session_id)
+    return evaluator.status(session_id, session)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus metrics: stage latencies, model calls and tokens, sessions and queues"""
+    store_stats = await sessions.stats()
+    telemetry.ACTIVE_SESSIONS.set(store_stats["sessions"])
+    if "bytes_used" in store_stats:
+        telemetry.SESSION_STORE_BYTES.set(store_stats["bytes_used"])
+    telemetry.LLM_IN_FLIGHT.set(llm.in_flight)
+    telemetry.LLM_CIRCUIT_OPEN.set(1 if llm.breaker.state == "open" else 0)
+    telemetry.EVALUATION_QUEUE_DEPTH.set(evaluator.stats()["queued"])
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/traces")
+async def traces(limit: int = 20):
+    """The most recent request traces, with their stage and model-call spans"""
+    return recent_traces(min(limit, 200))
+
+@app.get("/api/usage/{session_id}")
+async def session_usage(session_id: str):
+    """Estimated and measured LLM tokens spent on a session"""
+    await load_session(session_id)
+    return token_ledger.session_usage(session_id) or {"estimated": 0, "actual": 0, "calls": 0}
+
+@app.get("/api/admission/stats")
+async def admission_stats():
+    """Rate-limit rejections, upstream queue depth and per-tenant token usage"""
+    return admission.stats()
+
+@app.get("/api/llm/stats")
+async def llm_stats():
+    """Circuit breaker state, retries, hedges and degraded responses"""
+    return llm.stats()
+
+@app.get("/api/prompts/stats")
+async def prompt_stats():
+    """Per-kind prompt token counts and how much of them were reused prefixes"""
+    return context_cache.stats()
+
+@app.get("/api/structured-output/stats")
+async def structured_output_stats():
+    """Counters for recovered, repaired and failed structured responses"""
+    return structured_output.stats.as_dict()
+
+@app.get("/api/feedback/stats")
+async def feedback_stats():
+    """Feedback batch sizes, shared synthesis calls and sessions finished per minute"""
+    return feedback_batcher.stats()
+
+@app.get("/api/evaluation/stats")
+async def evaluation_stats():
+    """Evaluation queue depth and outcome counters"""
+    return evaluator.stats()
+
+@app.get("/api/speculation/stats")
+async def speculation_stats():
+    """Speculative follow-up hit rate and latency saved"""
+    return speculator.stats()
+
+@app.get("/api/question-bank/stats")
+async def question_bank_stats():
+    """Semantic question bank hit rate, banked questions per role and hits per focus area"""
+    return question_bank.stats()
+
+@app.get("/api/question-pool/stats")
+async def question_pool_stats():
+    """Opening-question pool hit rate and fill level"""
+    return question_pool.stats()
+
+@app.get("/api/cache/stats")
+async def cache_stats():
+    """Resume cache hit/miss counters"""
+    return {
+        "resume_text": resume_text_cache.stats(),
+        "resume_summary": resume_summary_cache.stats()
+    }
+
+@app.get("/healthz")
+async def healthz():
+    """Liveness check for load balancers, with the serving worker's pid"""
+    return {
+        "status": "ok",
+        "pid": os.getpid(),
+        "llm_in_flight": llm.in_flight
+    }
+
+@app.get("/api/session-store/stats")
+async def session_store_stats():
+    """Session store size and eviction counters"""
+    return await sessions.stats()
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="localhost", port=8000)
\ No newline at end of file
+    from server import main
+    main()
\ No newline at end of file
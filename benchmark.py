@@ -0,0 +1,294 @@
+"""Load test for the interview API against the deterministic fake LLM
+
+Drives the real FastAPI routes in-process (start with and without a resume,
+repeated answers, end) with many concurrent simulated candidates, and reports
+throughput, per-endpoint latency percentiles, event-loop lag and memory per
+session. Results can be saved as a baseline and later runs compared to it.
+
+    python benchmark.py --sessions 200 --concurrency 50
+    python benchmark.py --save-baseline benchmarks/baseline.json
+    python benchmark.py --compare benchmarks/baseline.json
+
+Requires httpx (pip install -r requirements-dev.txt).
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import platform
+from typing import Dict, List, Optional
+
+ENDPOINTS = ["start-interview", "start-interview+resume", "submit-answer", "end-interview"]
+
+ANSWER_SNIPPETS = [
+    "In my last role I owned the reporting pipeline end to end.",
+    "We measured success by the reduction in manual work, which dropped by about a third.",
+    "I started by talking to the people who used the output every day.",
+    "The hardest part was agreeing on definitions across three teams.",
+    "Looking back, I would have written the migration plan down earlier.",
+    "I usually break the problem down and check the riskiest assumption first.",
+]
+
+
+def configure_environment(args: argparse.Namespace) -> None:
+    """Point the app at the fake LLM and switch off limits that would skew the run"""
+    os.environ["LLM_BACKEND"] = "fake"
+    os.environ["FAKE_LLM_LATENCY_MS"] = str(args.latency_ms)
+    os.environ["FAKE_LLM_JITTER_MS"] = str(args.jitter_ms)
+    os.environ["FAKE_LLM_LATENCY_DIST"] = args.distribution
+    os.environ["FAKE_LLM_SEED"] = str(args.seed)
+    os.environ.setdefault("SESSION_STORE", "memory")
+    for name in ("RATE_LIMIT_START_PER_MINUTE", "RATE_LIMIT_ANSWER_PER_MINUTE",
+                 "RATE_LIMIT_PARTIAL_PER_MINUTE", "RATE_LIMIT_END_PER_MINUTE"):
+        os.environ[name] = "0"
+
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+def summarize(values: List[float]) -> Dict[str, Optional[float]]:
+    """Count and p50/p95/p99/max in milliseconds"""
+    def ms(value):
+        return round(value * 1000, 2) if value is not None else None
+    return {
+        "count": len(values),
+        "p50_ms": ms(percentile(values, 0.50)),
+        "p95_ms": ms(percentile(values, 0.95)),
+        "p99_ms": ms(percentile(values, 0.99)),
+        "max_ms": ms(max(values) if values else None),
+    }
+
+
+def rss_bytes() -> Optional[int]:
+    """Current resident set size (Linux), or None"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes a sleeping task"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - started - self.interval))
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {endpoint: [] for endpoint in ENDPOINTS}
+        self.errors: Dict[str, int] = {endpoint: 0 for endpoint in ENDPOINTS}
+
+    async def call(self, endpoint: str, request) -> Optional[dict]:
+        started = time.perf_counter()
+        try:
+            response = await request
+        except Exception as e:
+            print(f"{endpoint} failed: {e}")
+            self.errors[endpoint] += 1
+            return None
+        self.latencies[endpoint].append(time.perf_counter() - started)
+        if response.status_code != 200:
+            self.errors[endpoint] += 1
+            return None
+        return response.json()
+
+
+async def run_interview(client, recorder: Recorder, index: int, args: argparse.Namespace) -> bool:
+    """One simulated candidate: start, answer, end"""
+    rng = random.Random(args.seed * 100003 + index)
+    form = {
+        "role": rng.choice(["Software Engineer / SDE", "Data Analyst / Data Scientist",
+                            "Sales / Business Development", "Retail Associate / Customer Support"]),
+        "experience_level": rng.choice(["Fresher", "Junior", "Mid", "Senior"]),
+        "company_type": "general",
+    }
+    if rng.random() < args.resume_ratio:
+        # Unique per candidate, so the resume caches don't turn every start into a hit
+        resume = f"Candidate {index}\nExperience: {rng.randint(1, 15)} years\n" + "\n".join(ANSWER_SNIPPETS)
+        started = await recorder.call("start-interview+resume", client.post(
+            "/api/start-interview", data=form, files={"resume": ("resume.txt", resume.encode(), "text/plain")}))
+    else:
+        started = await recorder.call("start-interview", client.post("/api/start-interview", data=form))
+    if started is None:
+        return False
+    session_id = started["session_id"]
+
+    for _ in range(args.answers):
+        await asyncio.sleep(rng.uniform(0, args.think_ms) / 1000.0)
+        answer = " ".join(rng.sample(ANSWER_SNIPPETS, 3))
+        if await recorder.call("submit-answer", client.post(
+                "/api/submit-answer", json={"session_id": session_id, "answer": answer})) is None:
+            return False
+
+    return await recorder.call("end-interview", client.post(
+        "/api/end-interview", json={"session_id": session_id})) is not None
+
+
+async def run(args: argparse.Namespace) -> dict:
+    configure_environment(args)
+    try:
+        import httpx
+    except ImportError:
+        sys.exit("benchmark.py needs httpx: pip install -r requirements-dev.txt")
+    import app as interview_app
+
+    await interview_app.startup()
+    sessions_before = (await interview_app.sessions.stats())["sessions"]
+    rss_before = rss_bytes()
+    recorder = Recorder()
+    monitor = LoopLagMonitor()
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def candidate(index: int) -> bool:
+        async with semaphore:
+            return await run_interview(client, recorder, index, args)
+
+    transport = httpx.ASGITransport(app=interview_app.app, client=("10.0.0.1", 50000))
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=120) as client:
+        monitor.start()
+        started = time.perf_counter()
+        outcomes = await asyncio.gather(*(candidate(i) for i in range(args.sessions)))
+        elapsed = time.perf_counter() - started
+        monitor.stop()
+
+    store = await interview_app.sessions.stats()
+    rss_after = rss_bytes()
+    new_sessions = max(1, store["sessions"] - sessions_before)
+    await interview_app.shutdown()
+
+    requests = sum(len(values) for values in recorder.latencies.values())
+    return {
+        "config": {
+            "sessions": args.sessions,
+            "concurrency": args.concurrency,
+            "answers": args.answers,
+            "resume_ratio": args.resume_ratio,
+            "latency_ms": args.latency_ms,
+            "jitter_ms": args.jitter_ms,
+            "distribution": args.distribution,
+            "think_ms": args.think_ms,
+            "seed": args.seed,
+        },
+        "environment": {"python": platform.python_version(), "platform": platform.platform()},
+        "elapsed_seconds": round(elapsed, 3),
+        "completed_interviews": sum(outcomes),
+        "interviews_per_second": round(sum(outcomes) / elapsed, 2),
+        "requests_per_second": round(requests / elapsed, 2),
+        "endpoints": {
+            endpoint: dict(summarize(values), errors=recorder.errors[endpoint])
+            for endpoint, values in recorder.latencies.items()
+        },
+        "event_loop_lag": summarize(monitor.samples),
+        "memory": {
+            "store_bytes_per_session": round(store["bytes_used"] / store["sessions"]) if store.get("bytes_used") and store["sessions"] else None,
+            "rss_delta_per_session": round((rss_after - rss_before) / new_sessions) if rss_before and rss_after else None,
+        },
+        "llm_calls": interview_app.llm.backend.calls,
+    }
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Regressions beyond `tolerance` (0.2 = 20%) relative to a saved baseline"""
+    regressions = []
+    if baseline.get("config") != result["config"]:
+        print("Warning: baseline was recorded with a different configuration")
+    old, new = baseline["interviews_per_second"], result["interviews_per_second"]
+    if new < old * (1 - tolerance):
+        regressions.append(f"throughput {new}/s vs baseline {old}/s")
+    for endpoint, stats in result["endpoints"].items():
+        before = baseline["endpoints"].get(endpoint, {})
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            if stats.get(key) is None or before.get(key) is None:
+                continue
+            if stats[key] > before[key] * (1 + tolerance):
+                regressions.append(f"{endpoint} {key} {stats[key]} vs baseline {before[key]}")
+        if stats["errors"] > before.get("errors", 0):
+            regressions.append(f"{endpoint} errors {stats['errors']} vs baseline {before.get('errors', 0)}")
+    lag, lag_before = result["event_loop_lag"]["p99_ms"], baseline["event_loop_lag"].get("p99_ms")
+    if lag is not None and lag_before is not None and lag > max(lag_before * (1 + tolerance), lag_before + 5):
+        regressions.append(f"event loop lag p99 {lag}ms vs baseline {lag_before}ms")
+    return regressions
+
+
+def print_report(result: dict) -> None:
+    print(f"{result['completed_interviews']}/{result['config']['sessions']} interviews in "
+          f"{result['elapsed_seconds']}s ({result['interviews_per_second']} interviews/s, "
+          f"{result['requests_per_second']} requests/s, {result['llm_calls']} LLM calls)")
+    print(f"{'endpoint':<24}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}{'errors':>8}")
+    for endpoint, stats in result["endpoints"].items():
+        print(f"{endpoint:<24}{stats['count']:>7}{stats['p50_ms'] or '-':>10}{stats['p95_ms'] or '-':>10}"
+              f"{stats['p99_ms'] or '-':>10}{stats['max_ms'] or '-':>10}{stats['errors']:>8}")
+    lag = result["event_loop_lag"]
+    print(f"event loop lag: p50 {lag['p50_ms']}ms, p99 {lag['p99_ms']}ms, max {lag['max_ms']}ms")
+    memory = result["memory"]
+    print(f"memory per session: {memory['store_bytes_per_session']} bytes in store, "
+          f"{memory['rss_delta_per_session']} bytes RSS")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=100, help="Interviews to run")
+    parser.add_argument("--concurrency", type=int, default=25, help="Interviews in progress at once")
+    parser.add_argument("--answers", type=int, default=4, help="Answers per interview")
+    parser.add_argument("--resume-ratio", type=float, default=0.3, help="Share of starts that upload a resume")
+    parser.add_argument("--think-ms", type=float, default=0, help="Max random pause before each answer")
+    parser.add_argument("--latency-ms", type=float, default=200, help="Fake LLM median latency")
+    parser.add_argument("--jitter-ms", type=float, default=50, help="Fake LLM jitter (uniform distribution)")
+    parser.add_argument("--distribution", choices=["uniform", "lognormal"], default="uniform")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print the full result as JSON")
+    parser.add_argument("--save-baseline", metavar="PATH", help="Write the result as a baseline")
+    parser.add_argument("--compare", metavar="PATH", help="Compare against a saved baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed regression (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print_report(result)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.save_baseline) or ".", exist_ok=True)
+        with open(args.save_baseline, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"Baseline saved to {args.save_baseline}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(result, json.load(f), args.tolerance)
+        if regressions:
+            print("REGRESSIONS:")
+            for regression in regressions:
+                print(f"  - {regression}")
+            sys.exit(1)
+        print("No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+import os
+import time
+import hashlib
+import asyncio
+from collections import OrderedDict
+from typing import Dict, Optional
+
+RESUME_CACHE_MAX_ENTRIES = int(os.getenv("RESUME_CACHE_MAX_ENTRIES", "1000"))
+RESUME_CACHE_MAX_MB = float(os.getenv("RESUME_CACHE_MAX_MB", "64"))
+# Set to a directory to keep cached results across restarts and workers
+RESUME_CACHE_DIR = os.getenv("RESUME_CACHE_DIR", "")
+# The disk tier holds resume text (personal data), so it is bounded and expires
+RESUME_CACHE_DISK_MAX_MB = float(os.getenv("RESUME_CACHE_DISK_MAX_MB", "256"))
+RESUME_CACHE_DISK_MAX_ENTRIES = int(os.getenv("RESUME_CACHE_DISK_MAX_ENTRIES", "10000"))
+RESUME_CACHE_TTL_SECONDS = int(os.getenv("RESUME_CACHE_TTL_SECONDS", str(7 * 24 * 60 * 60)))
+# How often the disk tier is scanned for expired entries and over-cap usage
+RESUME_CACHE_SWEEP_SECONDS = float(os.getenv("RESUME_CACHE_SWEEP_SECONDS", "60"))
+
+
+def content_key(*parts) -> str:
+    """SHA-256 over the given bytes/str parts, separated so ("ab", "c") != ("a", "bc")"""
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode("utf-8")
+        digest.update(len(part).to_bytes(8, "big"))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+class TextCache:
+    """Size-bounded LRU cache of strings with an optional on-disk tier
+
+    The disk tier is shared by workers, so it is bounded by scanning the
+    directory: entries older than the TTL are deleted, then the least
+    recently used files (by mtime, refreshed on every disk hit) until it
+    is back under its entry and byte caps.
+    """
+
+    def __init__(self, namespace: str, max_entries: int = RESUME_CACHE_MAX_ENTRIES,
+                 max_mb: float = RESUME_CACHE_MAX_MB, cache_dir: str = RESUME_CACHE_DIR,
+                 disk_max_entries: int = RESUME_CACHE_DISK_MAX_ENTRIES,
+                 disk_max_mb: float = RESUME_CACHE_DISK_MAX_MB, ttl: int = RESUME_CACHE_TTL_SECONDS,
+                 sweep_seconds: float = RESUME_CACHE_SWEEP_SECONDS):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.bytes_used = 0
+        self.disk_max_entries = disk_max_entries
+        self.disk_max_bytes = int(disk_max_mb * 1024 * 1024)
+        self.ttl = ttl
+        self.sweep_seconds = sweep_seconds
+        self.disk_dir = os.path.join(cache_dir, namespace) if cache_dir else ""
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_entries = 0
+        self.disk_bytes = 0
+        self.disk_evictions = 0
+        self.disk_expired = 0
+        self._last_sweep = 0.0
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            self._sweep()
+
+    def _put_memory(self, key: str, value: str) -> None:
+        if key in self._entries:
+            self.bytes_used -= len(self._entries.pop(key))
+        self._entries[key] = value
+        self.bytes_used += len(value)
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_entries or self.bytes_used > self.max_bytes
+        ):
+            _, evicted = self._entries.popitem(last=False)
+            self.bytes_used -= len(evicted)
+            self.evictions += 1
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key + ".txt")
+
+    def _read_disk(self, key: str) -> Optional[str]:
+        path = self._disk_path(key)
+        try:
+            if time.time() - os.stat(path).st_mtime > self.ttl:
+                os.remove(path)
+                self.disk_expired += 1
+                return None
+            with open(path, "r", encoding="utf-8") as f:
+                value = f.read()
+            # Refresh the mtime so eviction drops the least recently used files first
+            os.utime(path)
+            return value
+        except FileNotFoundError:
+            return None
+
+    def _write_disk(self, key: str, value: str) -> None:
+        # Write then rename so concurrent readers never see a partial file
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(value)
+        os.replace(tmp_path, path)
+        self.disk_entries += 1
+        self.disk_bytes += os.path.getsize(path)
+        if time.monotonic() - self._last_sweep >= self.sweep_seconds or \
+                self.disk_entries > self.disk_max_entries or self.disk_bytes > self.disk_max_bytes:
+            self._sweep()
+
+    def _sweep(self) -> None:
+        """Delete expired files, then the oldest ones until the disk tier is within its caps"""
+        self._last_sweep = time.monotonic()
+        now = time.time()
+        files = []
+        with os.scandir(self.disk_dir) as entries:
+            for entry in entries:
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                # Leftover temp files from a crashed write expire like entries
+                if now - stat.st_mtime > self.ttl:
+                    self._remove(entry.path)
+                    if entry.name.endswith(".txt"):
+                        self.disk_expired += 1
+                elif entry.name.endswith(".txt"):
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+        files.sort()
+        count, size = len(files), sum(file_size for _, file_size, _ in files)
+        for _, file_size, path in files:
+            if count <= self.disk_max_entries and size <= self.disk_max_bytes:
+                break
+            self._remove(path)
+            count -= 1
+            size -= file_size
+            self.disk_evictions += 1
+        self.disk_entries, self.disk_bytes = count, size
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            # Another worker's sweep got there first
+            pass
+
+    async def get(self, key: str) -> Optional[str]:
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+        if self.disk_dir:
+            value = await asyncio.to_thread(self._read_disk, key)
+            if value is not None:
+                self._put_memory(key, value)
+                self.disk_hits += 1
+                return value
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: str) -> None:
+        self._put_memory(key, value)
+        if self.disk_dir:
+            try:
+                await asyncio.to_thread(self._write_disk, key, value)
+            except OSError as e:
+                print(f"Error writing {self.namespace} cache: {e}")
+
+    def stats(self) -> Dict[str, object]:
+        """Hit/miss counters and current size"""
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes_used": self.bytes_used,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "disk_entries": self.disk_entries,
+            "disk_bytes": self.disk_bytes,
+            "disk_evictions": self.disk_evictions,
+            "disk_expired": self.disk_expired,
+            "hit_rate": round((self.hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+        }
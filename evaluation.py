@@ -0,0 +1,359 @@
+import os
+import random
+import asyncio
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set
+
+from admission import bind_usage
+from prompts import PromptTemplate, context_cache
+from structured_output import AnswerEvaluation, FeedbackSynthesis, parse_json_response, validate
+
+EVAL_WORKERS = int(os.getenv("EVAL_WORKERS", "4"))
+EVAL_MAX_ATTEMPTS = int(os.getenv("EVAL_MAX_ATTEMPTS", "3"))
+EVAL_RETRY_BASE_SECONDS = float(os.getenv("EVAL_RETRY_BASE_SECONDS", "1.0"))
+# How long end-interview waits for outstanding evaluations before falling back
+EVAL_WAIT_SECONDS = float(os.getenv("EVAL_WAIT_SECONDS", "3"))
+# Optional short call that rewrites the per-answer notes into polished lists
+FEEDBACK_SYNTHESIS = os.getenv("FEEDBACK_SYNTHESIS", "true").lower() == "true"
+
+MAX_TRACKED_SESSIONS = 10000
+
+DIMENSIONS = [
+    "communication_clarity",
+    "confidence_structure",
+    "technical_knowledge",
+    "role_specific_skills",
+]
+
+# Instructions first and the answer last, so the prefix is shared by every
+# answer scored for the same role and level
+EVALUATION_PROMPT = """You are Sarah, an expert interview coach, scoring ONE answer from a {role} interview for a {experience_level} candidate.
+
+Return ONLY JSON in this format:
+{{
+    "dimension_scores": {{
+        "communication_clarity": <1-10, how clearly they expressed ideas>,
+        "confidence_structure": <1-10, answer organization and delivery confidence>,
+        "technical_knowledge": <1-10, depth of expertise for the role>,
+        "role_specific_skills": <1-10, skills unique to this position>
+    }},
+    "strength": "One specific strength of this answer, referencing what they actually said",
+    "weakness": "One specific, actionable improvement for this answer",
+    "improved_answer": "A better version of the answer with more structure/detail/clarity"
+}}
+
+Score relative to the {experience_level} level expected. Be honest but encouraging.
+"""
+
+EVALUATION_ANSWER_PROMPT = """
+Question: {question}
+Answer: {answer}"""
+
+SYNTHESIS_PROMPT = """You are Sarah, an expert interview coach, writing the final feedback for a {role} interview ({experience_level} level).
+{summary}
+Notes on individual answers:
+{notes}
+
+Turn these notes into final feedback. Return ONLY JSON in this format:
+{{
+    "strengths": ["2-4 specific strengths with concrete examples from the answers"],
+    "areas_to_improve": ["2-4 specific improvements with actionable advice"]
+}}"""
+
+# Several interviews for the same role and level in one call; the rubric is
+# written once and the per-candidate notes follow
+BATCH_SYNTHESIS_PROMPT = """You are Sarah, an expert interview coach, writing the final feedback for several {role} interviews ({experience_level} level).
+Each candidate below is a different person: never mix up their answers.
+
+For every candidate, turn the notes into final feedback. Return ONLY JSON in this format:
+{{
+    "candidates": {{
+        "<candidate label>": {{
+            "strengths": ["2-4 specific strengths with concrete examples from the answers"],
+            "areas_to_improve": ["2-4 specific improvements with actionable advice"]
+        }}
+    }}
+}}
+"""
+
+BATCH_SYNTHESIS_CANDIDATE = """
+CANDIDATE {label}
+{summary}Notes on individual answers:
+{notes}
+"""
+
+
+evaluation_template = PromptTemplate(EVALUATION_PROMPT)
+evaluation_answer_template = PromptTemplate(EVALUATION_ANSWER_PROMPT)
+batch_synthesis_template = PromptTemplate(BATCH_SYNTHESIS_PROMPT)
+batch_synthesis_candidate_template = PromptTemplate(BATCH_SYNTHESIS_CANDIDATE)
+
+
+def build_evaluation_prompt(role: str, experience_level: str, question: str, answer: str) -> str:
+    """Prompt scoring a single answer"""
+    return context_cache.build(
+        "evaluation",
+        evaluation_template.render(role=role, experience_level=experience_level),
+        evaluation_answer_template.render(question=question, answer=answer)
+    ).text
+
+
+def answer_score(evaluation: dict) -> float:
+    """Mean of an evaluation's dimension scores"""
+    scores = evaluation["dimension_scores"]
+    return sum(scores[dimension] for dimension in DIMENSIONS) / len(DIMENSIONS)
+
+
+def truncate_words(text: str, limit: int = 100) -> str:
+    words = text.split()
+    return text if len(words) <= limit else " ".join(words[:limit]) + "..."
+
+
+def aggregate_feedback(conversation_history: List[dict], evaluations: List[dict]) -> dict:
+    """Combine per-answer evaluations into the feedback object used by feedback.html"""
+    dimension_scores = {
+        dimension: round(sum(e["dimension_scores"][dimension] for e in evaluations) / len(evaluations))
+        for dimension in DIMENSIONS
+    }
+    overall_score = round(sum(answer_score(e) for e in evaluations) / len(evaluations))
+
+    ranked = sorted(range(len(evaluations)), key=lambda i: answer_score(evaluations[i]))
+    strengths = [evaluations[i]["strength"] for i in reversed(ranked) if evaluations[i]["strength"]][:4]
+    areas_to_improve = [evaluations[i]["weakness"] for i in ranked if evaluations[i]["weakness"]][:4]
+    improved_answers = [
+        {
+            "original_question": conversation_history[i]["question"],
+            "their_answer": truncate_words(conversation_history[i]["answer"]),
+            "improved_answer": evaluations[i]["improved_answer"],
+        }
+        for i in ranked[:2] if evaluations[i]["improved_answer"]
+    ]
+
+    return {
+        "overall_score": overall_score,
+        "dimension_scores": dimension_scores,
+        "strengths": strengths,
+        "areas_to_improve": areas_to_improve,
+        "improved_answers": improved_answers,
+    }
+
+
+def synthesis_notes(conversation_history: List[dict], evaluations: List[dict]) -> str:
+    """One line of score plus strength/weakness per answer"""
+    notes = ""
+    for i, (turn, evaluation) in enumerate(zip(conversation_history, evaluations), 1):
+        notes += f"Answer {i} (question: {turn['question']}, score {answer_score(evaluation):.1f}/10)\n"
+        notes += f"  + {evaluation['strength']}\n  - {evaluation['weakness']}\n"
+    return notes.strip()
+
+
+def build_synthesis_prompt(role: str, experience_level: str, conversation_history: List[dict],
+                           evaluations: List[dict], conversation_summary: str = "") -> str:
+    """Short prompt that polishes the per-answer notes into strengths/improvements"""
+    summary = f"\nInterview summary: {conversation_summary}\n" if conversation_summary else ""
+    return SYNTHESIS_PROMPT.format(role=role, experience_level=experience_level,
+                                   summary=summary, notes=synthesis_notes(conversation_history, evaluations))
+
+
+def build_batch_synthesis_prompt(role: str, experience_level: str, sessions: Dict[str, dict]) -> str:
+    """One synthesis prompt for several sessions of the same role and level, keyed by label"""
+    tail = ""
+    for label, session in sessions.items():
+        history = session["conversation_history"]
+        summary = session.get("conversation_summary", "")
+        tail += batch_synthesis_candidate_template.render(
+            label=label,
+            summary=f"Interview summary: {summary}\n" if summary else "",
+            notes=synthesis_notes(history, session["turn_evaluations"][:len(history)])
+        )
+    return context_cache.build(
+        "feedback_batch",
+        batch_synthesis_template.render(role=role, experience_level=experience_level),
+        tail
+    ).text
+
+
+def parse_batch_synthesis(response: str) -> Dict[str, FeedbackSynthesis]:
+    """Per-label syntheses from a batch response; malformed entries are left out"""
+    data = parse_json_response(response)
+    candidates = data.get("candidates", {}) if isinstance(data, dict) else {}
+    results = {}
+    for label, entry in candidates.items():
+        try:
+            results[label] = validate(entry, FeedbackSynthesis)
+        except Exception as e:
+            print(f"Invalid batch synthesis for candidate {label}: {e}")
+    return results
+
+
+class EvaluationJob:
+    """Scoring of a single answer"""
+
+    def __init__(self, session_id: str, index: int, role: str, experience_level: str,
+                 question: str, answer: str):
+        self.session_id = session_id
+        self.index = index
+        self.role = role
+        self.experience_level = experience_level
+        self.question = question
+        self.answer = answer
+        self.attempts = 0
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+
+class EvaluationQueue:
+    """Background queue scoring each answer as soon as it's submitted
+
+    A fixed number of workers pull jobs; failed jobs are retried with
+    exponential backoff. Results are merged into the session's
+    `turn_evaluations` list. A job waiting out its backoff is held by a
+    retry task until it is back on the queue, so drain() can wait for it.
+    """
+
+    def __init__(self, llm, sessions, workers: int = EVAL_WORKERS,
+                 max_attempts: int = EVAL_MAX_ATTEMPTS):
+        self.llm = llm
+        self.sessions = sessions
+        self.worker_count = workers
+        self.max_attempts = max_attempts
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._retrying: Set[asyncio.Task] = set()
+        self._jobs: "OrderedDict[str, Dict[int, EvaluationJob]]" = OrderedDict()
+        self.completed = 0
+        self.failed = 0
+        self.retries = 0
+
+    def start(self) -> None:
+        """Start the worker tasks"""
+        if self._queue is not None:
+            return
+        self._queue = asyncio.Queue()
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.worker_count)]
+
+    def close(self) -> None:
+        """Stop the workers"""
+        for task in self._workers + list(self._retrying):
+            task.cancel()
+        self._workers = []
+        self._retrying = set()
+        self._queue = None
+
+    def enqueue(self, session_id: str, index: int, session: dict) -> None:
+        """Queue scoring of answer `index` of a session"""
+        self.start()
+        turn = session["conversation_history"][index]
+        job = EvaluationJob(session_id, index, session["role"], session["experience_level"],
+                            turn["question"], turn["answer"])
+        jobs = self._jobs.setdefault(session_id, {})
+        self._jobs.move_to_end(session_id)
+        jobs[index] = job
+        while len(self._jobs) > MAX_TRACKED_SESSIONS:
+            self._jobs.popitem(last=False)
+        self._queue.put_nowait(job)
+
+    async def _worker(self) -> None:
+        queue = self._queue
+        while True:
+            job = await queue.get()
+            try:
+                await self._run(job)
+            finally:
+                queue.task_done()
+
+    async def _run(self, job: EvaluationJob) -> None:
+        job.attempts += 1
+        # Scoring is part of the cost of the answer that triggered it
+        bind_usage("unattributed", job.session_id, "submit-answer")
+        try:
+            response = await self.llm.generate(build_evaluation_prompt(
+                job.role, job.experience_level, job.question, job.answer
+            ))
+            evaluation = validate(parse_json_response(response), AnswerEvaluation).model_dump()
+            await self._store(job, evaluation)
+        except Exception as e:
+            if job.attempts < self.max_attempts:
+                self.retries += 1
+                delay = EVAL_RETRY_BASE_SECONDS * 2 ** (job.attempts - 1) * random.uniform(0.5, 1.5)
+                task = asyncio.create_task(self._retry(self._queue, job, delay))
+                self._retrying.add(task)
+                task.add_done_callback(self._retrying.discard)
+                return
+            print(f"Error evaluating answer {job.index + 1} of {job.session_id}: {e}")
+            self.failed += 1
+            if not job.future.done():
+                job.future.set_result(None)
+            return
+        self.completed += 1
+        if not job.future.done():
+            job.future.set_result(evaluation)
+
+    @staticmethod
+    async def _retry(queue: asyncio.Queue, job: EvaluationJob, delay: float) -> None:
+        await asyncio.sleep(delay)
+        queue.put_nowait(job)
+
+    async def _store(self, job: EvaluationJob, evaluation: dict) -> None:
+        def merge(session: dict) -> bool:
+            evaluations = session.get("turn_evaluations", [])
+            evaluations += [None] * (len(session["conversation_history"]) - len(evaluations))
+            if job.index < len(evaluations):
+                evaluations[job.index] = evaluation
+            session["turn_evaluations"] = evaluations
+            return True
+        
+        await self.sessions.update(job.session_id, merge)
+
+    async def wait(self, session_id: str, timeout: float = EVAL_WAIT_SECONDS) -> None:
+        """Wait for a session's outstanding evaluations, up to a timeout"""
+        futures = [job.future for job in self._jobs.get(session_id, {}).values()]
+        if futures:
+            await asyncio.wait(futures, timeout=timeout)
+
+    def status(self, session_id: str, session: dict) -> Dict[str, object]:
+        """Scoring progress for a session"""
+        total = len(session["conversation_history"])
+        evaluations = session.get("turn_evaluations", [])
+        completed = sum(1 for evaluation in evaluations if evaluation)
+        jobs = self._jobs.get(session_id, {}).values()
+        failed = sum(1 for job in jobs if job.future.done() and job.future.result() is None)
+        return {
+            "total": total,
+            "completed": completed,
+            "failed": failed,
+            "pending": max(0, total - completed - failed),
+        }
+
+    async def drain(self, timeout: float) -> None:
+        """Wait for queued jobs and pending retries to finish, up to a timeout"""
+        if self._queue is None:
+            return
+        settled = asyncio.ensure_future(self._settle(self._queue))
+        try:
+            await asyncio.wait([settled], timeout=timeout)
+        finally:
+            settled.cancel()
+
+    async def _settle(self, queue: asyncio.Queue) -> None:
+        # A retry puts its job back before finishing, so once no retries are
+        # pending an empty queue means every job has an outcome
+        while True:
+            await queue.join()
+            if not self._retrying:
+                return
+            await asyncio.wait(list(self._retrying))
+
+    def discard(self, session_id: str) -> None:
+        """Forget job tracking for a finished session"""
+        self._jobs.pop(session_id, None)
+
+    def stats(self) -> Dict[str, object]:
+        """Queue depth and outcome counters"""
+        return {
+            "workers": len(self._workers),
+            "queued": self._queue.qsize() if self._queue else 0,
+            "retrying": len(self._retrying),
+            "completed": self.completed,
+            "failed": self.failed,
+            "retries": self.retries,
+        }
@@ -0,0 +1,119 @@
+import os
+import time
+import asyncio
+import contextvars
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from telemetry import finish_span, start_span
+
+# How long the first end-interview request waits for others to join its batch
+FEEDBACK_BATCH_WINDOW_MS = float(os.getenv("FEEDBACK_BATCH_WINDOW_MS", "50"))
+FEEDBACK_BATCH_MAX_SIZE = int(os.getenv("FEEDBACK_BATCH_MAX_SIZE", "32"))
+# Sessions of one batch worked on at the same time
+FEEDBACK_BATCH_CONCURRENCY = int(os.getenv("FEEDBACK_BATCH_CONCURRENCY", "8"))
+# Sessions sharing one synthesis call
+FEEDBACK_BATCH_SYNTHESIS_SIZE = int(os.getenv("FEEDBACK_BATCH_SYNTHESIS_SIZE", "8"))
+
+# Called with the session ids of a batch; returns feedback or an exception per id
+BatchProcessor = Callable[[List[str]], Awaitable[Dict[str, Any]]]
+
+
+class FeedbackBatcher:
+    """Coalesces concurrent end-interview requests into batches
+
+    The first request opens a short window; everything that arrives within it
+    (or until the batch is full) is processed together, so sessions with the
+    same role and level can share one synthesis call. Each caller still awaits
+    only its own result.
+    """
+
+    def __init__(self, process: BatchProcessor, window_ms: float = FEEDBACK_BATCH_WINDOW_MS,
+                 max_size: int = FEEDBACK_BATCH_MAX_SIZE):
+        self.process = process
+        self.window = window_ms / 1000.0
+        self.max_size = max_size
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._running: Set[asyncio.Task] = set()
+        self._completed_at: deque = deque()
+        self.sessions = 0
+        self.batches = 0
+        self.largest_batch = 0
+        self.failed = 0
+        self.shared_synthesis_calls = 0
+        self.synthesis_calls_saved = 0
+
+    async def submit(self, session_id: str) -> dict:
+        """Queue a session for the next batch and wait for its feedback"""
+        future = self._pending.get(session_id)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            # Callers that went away never read their result; don't warn about it
+            future.add_done_callback(lambda done: done.cancelled() or done.exception())
+            self._pending[session_id] = future
+            if len(self._pending) >= self.max_size or self.window <= 0:
+                self._flush()
+            elif self._timer is None:
+                self._timer = asyncio.get_running_loop().call_later(self.window, self._flush,
+                                                                    context=contextvars.Context())
+        # A disconnecting caller mustn't cancel work shared with the rest of the batch
+        return await asyncio.shield(future)
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, {}
+        # Batch work belongs to every caller, not the one whose request filled the batch
+        task = asyncio.create_task(self._run(batch), context=contextvars.Context())
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: Dict[str, asyncio.Future]) -> None:
+        self.batches += 1
+        self.largest_batch = max(self.largest_batch, len(batch))
+        # Root span of its own trace, shared by every request in the batch
+        span = start_span("feedback.batch", batch_size=len(batch), sessions=list(batch))
+        try:
+            results = await self.process(list(batch))
+            finish_span(span)
+        except Exception as e:
+            results = {session_id: e for session_id in batch}
+            finish_span(span, e)
+        now = time.monotonic()
+        for session_id, future in batch.items():
+            result = results.get(session_id, RuntimeError("No result for session"))
+            self.sessions += 1
+            self._completed_at.append(now)
+            if isinstance(result, BaseException):
+                self.failed += 1
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def close(self) -> None:
+        """Cancel batches that are still running"""
+        if self._timer is not None:
+            self._timer.cancel()
+        for task in self._running:
+            task.cancel()
+
+    def stats(self) -> Dict[str, object]:
+        """Batch sizes, shared synthesis calls and sessions finished per minute"""
+        cutoff = time.monotonic() - 60
+        while self._completed_at and self._completed_at[0] < cutoff:
+            self._completed_at.popleft()
+        return {
+            "window_ms": self.window * 1000,
+            "sessions": self.sessions,
+            "failed": self.failed,
+            "batches": self.batches,
+            "avg_batch_size": round(self.sessions / self.batches, 2) if self.batches else 0.0,
+            "largest_batch": self.largest_batch,
+            "shared_synthesis_calls": self.shared_synthesis_calls,
+            "synthesis_calls_saved": self.synthesis_calls_saved,
+            "sessions_last_minute": len(self._completed_at),
+        }
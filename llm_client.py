@@ -0,0 +1,298 @@
+import os
+import re
+import asyncio
+import random
+import hashlib
+import json
+from typing import AsyncIterator, List, Optional, Union
+
+from fastapi import Request, HTTPException
+
+# Prompt contents accepted by the backends: a plain prompt string, or a list of
+# parts (strings and {"mime_type": ..., "data": ...} blobs) for multimodal calls
+Contents = Union[str, List[Union[str, dict]]]
+
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini")
+LLM_MODEL_NAME = os.getenv("LLM_MODEL_NAME", "gemini-2.5-flash")
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+FAKE_LLM_LATENCY_MS = float(os.getenv("FAKE_LLM_LATENCY_MS", "200"))
+FAKE_LLM_JITTER_MS = float(os.getenv("FAKE_LLM_JITTER_MS", "50"))
+# "uniform" (latency ± jitter) or "lognormal" (median latency, long right tail)
+FAKE_LLM_LATENCY_DIST = os.getenv("FAKE_LLM_LATENCY_DIST", "uniform")
+FAKE_LLM_LOGNORMAL_SIGMA = float(os.getenv("FAKE_LLM_LOGNORMAL_SIGMA", "0.5"))
+FAKE_LLM_SEED = int(os.getenv("FAKE_LLM_SEED", "0"))
+# Fault injection for resilience testing: share of calls that fail, and share
+# that take FAKE_LLM_SLOW_MS instead of the normal latency
+FAKE_LLM_ERROR_RATE = float(os.getenv("FAKE_LLM_ERROR_RATE", "0"))
+FAKE_LLM_SLOW_RATE = float(os.getenv("FAKE_LLM_SLOW_RATE", "0"))
+FAKE_LLM_SLOW_MS = float(os.getenv("FAKE_LLM_SLOW_MS", "5000"))
+
+
+def contents_text(contents: Contents) -> str:
+    """The text parts of a prompt"""
+    if isinstance(contents, list):
+        return "\n".join(part for part in contents if isinstance(part, str))
+    return contents
+
+
+class LLMBackend:
+    """Base class for text generation backends"""
+
+    name = "base"
+
+    async def generate(self, contents: Contents) -> str:
+        raise NotImplementedError
+
+    async def stream(self, contents: Contents) -> AsyncIterator[str]:
+        """Yield the response in chunks (defaults to a single chunk)"""
+        yield await self.generate(contents)
+
+
+class GeminiBackend(LLMBackend):
+    """Google Gemini backend using the native async API
+
+    The SDK is imported on the first call rather than at startup, which
+    keeps worker boot fast; the model object is then reused for every call.
+    """
+
+    name = "gemini"
+
+    def __init__(self, api_key: str, model_name: str = LLM_MODEL_NAME):
+        self.api_key = api_key
+        self.model_name = model_name
+        self._model = None
+
+    @property
+    def model(self):
+        if self._model is None:
+            import google.generativeai as genai
+
+            genai.configure(api_key=self.api_key)
+            self._model = genai.GenerativeModel(self.model_name)
+        return self._model
+
+    async def generate(self, contents: Contents) -> str:
+        response = await self.model.generate_content_async(contents)
+        return response.text
+
+    async def stream(self, contents: Contents) -> AsyncIterator[str]:
+        response = await self.model.generate_content_async(contents, stream=True)
+        async for chunk in response:
+            if chunk.text:
+                yield chunk.text
+
+
+FAKE_QUESTIONS = [
+    "Thanks for joining me today. Could you walk me through your journey so far and what drew you to this role?",
+    "That's interesting. Can you tell me about a project you're particularly proud of and the part you played in it?",
+    "I see. What was the hardest problem you ran into there, and how did you work through it?",
+    "Got it. How do you usually handle disagreements with teammates about the right approach?",
+    "Makes sense. If you could redo that situation, what would you do differently?",
+    "Let's switch gears a little. How do you prioritize when several urgent things land at once?",
+    "Interesting approach. Can you give me a specific example where your work had a measurable impact?",
+    "Building on that, how do you keep your skills current in this field?",
+]
+
+FAKE_RESUME_TEXT = """Jordan Doe
+jordan@example.com
+
+EXPERIENCE
+Analyst, Example Corp (2021 - present)
+- Built weekly reporting dashboards used by 40 stakeholders
+
+EDUCATION
+B.Sc. Computer Science, Example University
+
+SKILLS
+Python, SQL, communication"""
+
+FAKE_RESUME_SUMMARY = """- 3 years of relevant experience at Example Corp
+- Skills: Python, SQL, dashboarding
+- Notable: reporting dashboards used by 40 stakeholders
+- Probe: depth of ownership on the dashboard project"""
+
+FAKE_FEEDBACK = {
+    "overall_score": 7,
+    "dimension_scores": {
+        "communication_clarity": 7,
+        "confidence_structure": 6,
+        "technical_knowledge": 7,
+        "role_specific_skills": 7
+    },
+    "strengths": ["Gave concrete examples from past projects"],
+    "areas_to_improve": ["Structure answers with situation, action and result"],
+    "improved_answers": []
+}
+
+FAKE_EVALUATION = {
+    "dimension_scores": {
+        "communication_clarity": 7,
+        "confidence_structure": 6,
+        "technical_knowledge": 7,
+        "role_specific_skills": 8
+    },
+    "strength": "Used a concrete example from a past project",
+    "weakness": "Could quantify the outcome more clearly",
+    "improved_answer": "In my last role I led the reporting project, which cut manual work by 30%."
+}
+
+FAKE_SYNTHESIS = {
+    "strengths": ["Grounded answers in concrete past work"],
+    "areas_to_improve": ["Quantify outcomes and structure answers with STAR"]
+}
+
+
+class FakeBackendError(ConnectionError):
+    """Injected upstream failure"""
+
+
+class FakeBackend(LLMBackend):
+    """Deterministic offline backend for local development and load tests"""
+
+    name = "fake"
+
+    def __init__(self, latency_ms: float = FAKE_LLM_LATENCY_MS,
+                 jitter_ms: float = FAKE_LLM_JITTER_MS, seed: int = FAKE_LLM_SEED,
+                 error_rate: float = FAKE_LLM_ERROR_RATE, slow_rate: float = FAKE_LLM_SLOW_RATE,
+                 slow_ms: float = FAKE_LLM_SLOW_MS, distribution: str = FAKE_LLM_LATENCY_DIST,
+                 sigma: float = FAKE_LLM_LOGNORMAL_SIGMA):
+        if distribution not in ("uniform", "lognormal"):
+            raise ValueError(f"Unknown fake latency distribution: {distribution}")
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.distribution = distribution
+        self.sigma = sigma
+        self.error_rate = error_rate
+        self.slow_rate = slow_rate
+        self.slow_ms = slow_ms
+        self.random = random.Random(seed)
+        self.calls = 0
+        self.injected_errors = 0
+
+    def _latency(self) -> float:
+        if self.slow_rate and self.random.random() < self.slow_rate:
+            return self.slow_ms / 1000.0
+        if self.distribution == "lognormal":
+            return self.latency_ms * self.random.lognormvariate(0.0, self.sigma) / 1000.0
+        jitter = self.random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+        return max(0.0, self.latency_ms + jitter) / 1000.0
+
+    def _maybe_fail(self) -> None:
+        if self.error_rate and self.random.random() < self.error_rate:
+            self.injected_errors += 1
+            raise FakeBackendError("Injected fake LLM failure")
+
+    def respond(self, contents: Contents) -> str:
+        """Pick a canned response based on what the prompt asks for"""
+        prompt = contents_text(contents)
+        if '"overall_score"' in prompt:
+            return "```json\n" + json.dumps(FAKE_FEEDBACK, indent=2) + "\n```"
+        if '"weakness"' in prompt:
+            return json.dumps(FAKE_EVALUATION)
+        if '"candidates"' in prompt:
+            labels = re.findall(r"^CANDIDATE (\w+)$", prompt, flags=re.MULTILINE)
+            return json.dumps({"candidates": {label: FAKE_SYNTHESIS for label in labels}})
+        if '"areas_to_improve"' in prompt:
+            return json.dumps(FAKE_SYNTHESIS)
+        if prompt.startswith("Extract all text"):
+            return FAKE_RESUME_TEXT
+        if prompt.startswith("Analyze this resume"):
+            return FAKE_RESUME_SUMMARY
+        if prompt.startswith("Update the running summary"):
+            turns = re.findall(r"^Turn (\d+)$", prompt, flags=re.MULTILINE)
+            facts = "".join(f"\n\nTURN {n} FACTS:\n- Candidate described relevant experience" for n in turns)
+            return f"SUMMARY:\nThe candidate has answered {len(turns)} more question(s) with concrete examples.{facts}"
+        digest = hashlib.sha1(prompt.encode("utf-8")).digest()
+        return FAKE_QUESTIONS[digest[0] % len(FAKE_QUESTIONS)]
+
+    async def generate(self, contents: Contents) -> str:
+        self.calls += 1
+        await asyncio.sleep(self._latency())
+        self._maybe_fail()
+        return self.respond(contents)
+
+    async def stream(self, contents: Contents) -> AsyncIterator[str]:
+        self.calls += 1
+        words = self.respond(contents).split(" ")
+        # Spread the total latency over the chunks, front-loading the first one
+        delay = self._latency()
+        await asyncio.sleep(delay / 2)
+        self._maybe_fail()
+        for i, word in enumerate(words):
+            if i:
+                await asyncio.sleep(delay / 2 / len(words))
+            yield word if i == 0 else " " + word
+
+
+class LLMClient:
+    """Awaitable LLM client with bounded concurrency and per-call timeouts"""
+
+    def __init__(self, backend: LLMBackend, max_concurrency: int = LLM_MAX_CONCURRENCY,
+                 timeout: float = LLM_TIMEOUT_SECONDS):
+        self.backend = backend
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.in_flight = 0
+
+    async def generate(self, contents: Contents, timeout: Optional[float] = None) -> str:
+        """Generate a full response, waiting for a free slot first"""
+        async with self._semaphore:
+            self.in_flight += 1
+            try:
+                return await asyncio.wait_for(
+                    self.backend.generate(contents),
+                    timeout=timeout or self.timeout
+                )
+            finally:
+                self.in_flight -= 1
+
+    async def stream(self, contents: Contents, timeout: Optional[float] = None) -> AsyncIterator[str]:
+        """Stream response chunks; the timeout applies to the whole stream"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + (timeout or self.timeout)
+        async with self._semaphore:
+            self.in_flight += 1
+            try:
+                chunks = self.backend.stream(contents).__aiter__()
+                while True:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        raise asyncio.TimeoutError()
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), timeout=remaining)
+                    except StopAsyncIteration:
+                        break
+                    yield chunk
+            finally:
+                self.in_flight -= 1
+
+
+def create_backend(name: str = LLM_BACKEND) -> LLMBackend:
+    """Build the backend selected by LLM_BACKEND"""
+    if name == "fake":
+        return FakeBackend()
+    if name == "gemini":
+        api_key = os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            raise ValueError("GEMINI_API_KEY environment variable not set")
+        return GeminiBackend(api_key)
+    raise ValueError(f"Unknown LLM_BACKEND: {name}")
+
+
+async def cancel_on_disconnect(request: Request, awaitable, poll_interval: float = 0.25):
+    """Run an awaitable, cancelling it if the HTTP client goes away"""
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                task.cancel()
+                # 499 mirrors nginx's "client closed request"
+                raise HTTPException(status_code=499, detail="Client disconnected")
+    finally:
+        if not task.done():
+            task.cancel()
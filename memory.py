@@ -0,0 +1,153 @@
+import os
+import re
+import asyncio
+from typing import Dict, List, Optional, Tuple
+
+ROLLING_SUMMARY = os.getenv("ROLLING_SUMMARY", "true").lower() == "true"
+SUMMARY_MAX_WORDS = int(os.getenv("SUMMARY_MAX_WORDS", "200"))
+# Answers longer than this are replaced by their key-facts digest in long prompts
+DIGEST_ANSWER_CHARS = int(os.getenv("DIGEST_ANSWER_CHARS", "1200"))
+
+MEMORY_PROMPT = """Update the running summary of a job interview and extract key facts from the newest turns.
+
+CURRENT SUMMARY:
+{summary}
+
+NEW TURNS:
+{turns}
+
+Respond in exactly this format:
+
+SUMMARY:
+<updated summary of the whole interview so far, at most {max_words} words: topics covered, what the candidate claimed, strengths and gaps noticed, topics not yet covered>
+
+{fact_sections}"""
+
+
+def build_memory_prompt(summary: str, turns: List[Tuple[int, dict]],
+                        max_words: int = SUMMARY_MAX_WORDS) -> str:
+    """Prompt folding new (index, turn) pairs into the running summary"""
+    turns_text = ""
+    fact_sections = ""
+    for index, turn in turns:
+        turns_text += f"Turn {index + 1}\nQuestion: {turn['question']}\nAnswer: {turn['answer']}\n\n"
+        fact_sections += f"TURN {index + 1} FACTS:\n- <2-4 short bullet points: concrete facts, numbers, tools, projects and claims from this answer>\n\n"
+    return MEMORY_PROMPT.format(
+        summary=summary or "(interview just started)",
+        turns=turns_text.strip(),
+        max_words=max_words,
+        fact_sections=fact_sections.strip()
+    )
+
+
+def parse_memory_response(text: str) -> Tuple[str, Dict[int, str]]:
+    """Split a memory response into the summary and per-turn facts (keyed by 0-based index)"""
+    sections = re.split(r"^\s*(SUMMARY:|TURN \d+ FACTS:)\s*$", text, flags=re.MULTILINE)
+    summary = ""
+    facts: Dict[int, str] = {}
+    for header, body in zip(sections[1::2], sections[2::2]):
+        if header == "SUMMARY:":
+            summary = body.strip()
+        else:
+            index = int(re.search(r"\d+", header).group()) - 1
+            facts[index] = body.strip()
+    if not summary and not facts:
+        # Model ignored the format; keep what it wrote as the summary
+        summary = text.strip()
+    return summary, facts
+
+
+def digest_history(conversation_history: List[dict], turn_digests: List[str],
+                   max_answer_chars: int = DIGEST_ANSWER_CHARS) -> List[dict]:
+    """Replace long answers with their key-facts digest to bound prompt size"""
+    compact = []
+    for i, turn in enumerate(conversation_history):
+        digest = turn_digests[i] if i < len(turn_digests) else ""
+        if digest and len(turn["answer"]) > max_answer_chars:
+            turn = {"question": turn["question"], "answer": f"(summarized) {digest}"}
+        compact.append(turn)
+    return compact
+
+
+class ConversationMemory:
+    """Keeps a compact rolling summary and per-turn digests on each session
+
+    Updates run in the background after each turn. They are serialized per
+    session, and each one folds in every turn not yet covered, so a failed or
+    overwritten update is caught up on the next turn.
+    """
+
+    def __init__(self, llm, sessions, enabled: bool = ROLLING_SUMMARY):
+        self.llm = llm
+        self.sessions = sessions
+        self.enabled = enabled
+        self._chains: Dict[str, asyncio.Task] = {}
+        self.updates = 0
+        self.errors = 0
+
+    def schedule(self, session_id: str) -> None:
+        """Queue a background update behind any update already running for the session"""
+        if not self.enabled:
+            return
+        previous = self._chains.get(session_id)
+        task = asyncio.create_task(self._run_after(previous, session_id))
+        self._chains[session_id] = task
+        task.add_done_callback(lambda done: self._forget(session_id, done))
+
+    def _forget(self, session_id: str, task: asyncio.Task) -> None:
+        if self._chains.get(session_id) is task:
+            del self._chains[session_id]
+
+    async def _run_after(self, previous: Optional[asyncio.Task], session_id: str) -> None:
+        if previous is not None:
+            await asyncio.gather(previous, return_exceptions=True)
+        try:
+            await self.update(session_id)
+        except Exception as e:
+            self.errors += 1
+            print(f"Error updating conversation summary: {e}")
+
+    async def update(self, session_id: str) -> None:
+        """Fold all uncovered turns of a session into its summary"""
+        session = await self.sessions.get(session_id)
+        if session is None:
+            return
+        history = session["conversation_history"]
+        covered = session.get("summary_turns", 0)
+        if covered >= len(history):
+            return
+
+        new_turns = list(enumerate(history))[covered:]
+        response = await self.llm.generate(build_memory_prompt(session.get("conversation_summary", ""), new_turns))
+        summary, facts = parse_memory_response(response)
+
+        # Merge into the latest copy, the session may have moved on meanwhile
+        def merge(latest: dict) -> bool:
+            digests = latest.get("turn_digests", [])
+            digests += [""] * (len(history) - len(digests))
+            for index, text in facts.items():
+                if 0 <= index < len(digests):
+                    digests[index] = text
+            latest["turn_digests"] = digests
+            latest["conversation_summary"] = summary
+            latest["summary_turns"] = len(history)
+            return True
+
+        if await self.sessions.update(session_id, merge) is not None:
+            self.updates += 1
+
+    async def wait(self, session_id: str) -> None:
+        """Wait for any pending update for a session to finish"""
+        task = self._chains.get(session_id)
+        if task is not None:
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def drain(self, timeout: float) -> None:
+        """Wait for all pending updates to finish, up to a timeout"""
+        if self._chains:
+            await asyncio.wait(list(self._chains.values()), timeout=timeout)
+
+    def close(self) -> None:
+        """Cancel pending updates"""
+        for task in self._chains.values():
+            task.cancel()
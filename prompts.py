@@ -0,0 +1,132 @@
+import os
+import math
+import hashlib
+from collections import OrderedDict
+from string import Formatter
+from typing import Dict, List, Optional, Tuple
+
+PROMPT_CONTEXT_CACHE_SIZE = int(os.getenv("PROMPT_CONTEXT_CACHE_SIZE", "2048"))
+# Rough characters-per-token ratio for English prompts
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap local token estimate (no API round-trip)"""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+class PromptTemplate:
+    """A str.format-style template parsed once, so rendering is a plain join
+
+    Rendering fails fast on missing fields rather than producing a prompt
+    with a literal "{field}" in it.
+    """
+
+    def __init__(self, template: str):
+        self.template = template
+        # Alternating literal text and field names, e.g. ["Hi ", "name", "!"]
+        self._parts: List[Tuple[str, Optional[str]]] = []
+        for literal, field, spec, conversion in Formatter().parse(template):
+            if spec or conversion:
+                raise ValueError(f"Format specs aren't supported in prompt templates: {field}")
+            self._parts.append((literal, field))
+        self.fields = {field for _, field in self._parts if field is not None}
+
+    def render(self, **values) -> str:
+        missing = self.fields - values.keys()
+        if missing:
+            raise KeyError(f"Missing prompt fields: {', '.join(sorted(missing))}")
+        out = []
+        for literal, field in self._parts:
+            out.append(literal)
+            if field is not None:
+                out.append(str(values[field]))
+        return "".join(out)
+
+
+class ContextHandle:
+    """A reusable prompt prefix; provider-side caching keys off its exact bytes"""
+
+    def __init__(self, key: str, tokens: int):
+        self.key = key
+        self.tokens = tokens
+        self.uses = 0
+
+
+class Prompt:
+    """A prompt split into a stable prefix and a volatile tail
+
+    The prefix (persona, role, focus areas, resume) is byte-identical for
+    every call in a session, so providers can reuse their cached context for it.
+    Everything that changes per turn lives in the tail.
+    """
+
+    def __init__(self, kind: str, prefix: str, tail: str, context: ContextHandle):
+        self.kind = kind
+        self.prefix = prefix
+        self.tail = tail
+        self.context = context
+
+    @property
+    def text(self) -> str:
+        return self.prefix + self.tail
+
+    @property
+    def tokens(self) -> int:
+        return self.context.tokens + estimate_tokens(self.tail)
+
+
+class ContextCache:
+    """Tracks prompt prefixes as reusable context handles, with per-kind token counts"""
+
+    def __init__(self, cache_size: int = PROMPT_CONTEXT_CACHE_SIZE):
+        self.cache_size = cache_size
+        self._contexts: "OrderedDict[str, ContextHandle]" = OrderedDict()
+        self._kinds: Dict[str, Dict[str, int]] = {}
+
+    def context_for(self, prefix: str) -> ContextHandle:
+        """Return the handle for a prefix, reusing it across turns and sessions"""
+        key = hashlib.sha256(prefix.encode("utf-8")).hexdigest()
+        handle = self._contexts.get(key)
+        if handle is None:
+            handle = ContextHandle(key, estimate_tokens(prefix))
+            self._contexts[key] = handle
+            while len(self._contexts) > self.cache_size:
+                self._contexts.popitem(last=False)
+        else:
+            self._contexts.move_to_end(key)
+        return handle
+
+    def build(self, kind: str, prefix: str, tail: str) -> Prompt:
+        """Assemble a prompt and record its token counts"""
+        context = self.context_for(prefix)
+        prompt = Prompt(kind, prefix, tail, context)
+        counts = self._kinds.setdefault(kind, {
+            "prompts": 0,
+            "tokens": 0,
+            "prefix_tokens": 0,
+            "reused_prefix_tokens": 0,
+            "prefix_reuses": 0,
+        })
+        counts["prompts"] += 1
+        counts["tokens"] += prompt.tokens
+        counts["prefix_tokens"] += context.tokens
+        if context.uses:
+            counts["prefix_reuses"] += 1
+            counts["reused_prefix_tokens"] += context.tokens
+        context.uses += 1
+        return prompt
+
+    def stats(self) -> Dict[str, object]:
+        """Token totals per prompt kind and how much of them were reusable prefixes"""
+        return {
+            "contexts": len(self._contexts),
+            "kinds": {
+                kind: dict(counts, avg_tokens=round(counts["tokens"] / counts["prompts"]))
+                for kind, counts in self._kinds.items()
+            },
+        }
+
+
+# Shared by every module that builds prompts
+context_cache = ContextCache()
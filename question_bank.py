@@ -0,0 +1,219 @@
+import os
+import re
+import math
+import hashlib
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+QUESTION_BANK = os.getenv("QUESTION_BANK", "false").lower() == "true"
+# How similar (cosine) an answer must be to the one a banked follow-up was written for.
+# Unrelated answers to the same question score up to about 0.2, close paraphrases 0.45+
+QUESTION_BANK_MIN_SIMILARITY = float(os.getenv("QUESTION_BANK_MIN_SIMILARITY", "0.35"))
+# Shorter answers (in content words) always go to the model, which can ask for specifics
+QUESTION_BANK_MIN_ANSWER_WORDS = int(os.getenv("QUESTION_BANK_MIN_ANSWER_WORDS", "8"))
+# A banked question at least this similar to one already asked counts as a repeat
+QUESTION_BANK_REPEAT_SIMILARITY = float(os.getenv("QUESTION_BANK_REPEAT_SIMILARITY", "0.75"))
+QUESTION_BANK_MAX_PER_ROLE = int(os.getenv("QUESTION_BANK_MAX_PER_ROLE", "500"))
+
+EMBEDDING_DIMENSIONS = 4096
+
+# Words too common in interviews to say anything about what an answer is about
+STOPWORDS = frozenset("""
+a about after all also am an and any are as at be because been before being but by can could did do does
+doing for from had has have having he her here him his how i if in into is it its just me more most my no
+not of on or our out over so some such than that the their them then there these they this those through
+to too up very was we were what when where which while who why will with would you your yes really think
+time next way thing things lot example situation experience tell describe walk role
+""".split())
+
+Vector = Dict[int, float]
+BankKey = Tuple[str, str]
+
+
+def content_words(text: str) -> List[str]:
+    return [word for word in re.findall(r"[a-z0-9']+", text.lower()) if word not in STOPWORDS]
+
+
+def _features(text: str) -> List[Tuple[str, float]]:
+    words = content_words(text)
+    features = [(word, 1.0) for word in words]
+    features += [(f"{first} {second}", 1.0) for first, second in zip(words, words[1:])]
+    # Character trigrams match inflections ("negotiate" / "negotiating")
+    for word in words:
+        padded = f"<{word}>"
+        features += [(padded[i:i + 3], 0.3) for i in range(len(padded) - 2)]
+    return features
+
+
+def normalize(vector: Vector) -> Vector:
+    norm = math.sqrt(sum(value * value for value in vector.values()))
+    return {index: value / norm for index, value in vector.items() if value} if norm else {}
+
+
+def embed(text: str) -> Vector:
+    """Hashed word, bigram and character-trigram embedding, L2-normalized
+
+    Uses a stable hash so vectors agree across workers and restarts.
+    """
+    vector: Vector = {}
+    for feature, weight in _features(text):
+        digest = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+        index = digest % EMBEDDING_DIMENSIONS
+        # A hash-derived sign keeps collisions from adding up systematically
+        vector[index] = vector.get(index, 0.0) + (weight if digest >> 63 else -weight)
+    return normalize(vector)
+
+
+def cosine(a: Vector, b: Vector) -> float:
+    """Cosine similarity of two normalized vectors"""
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(value * b.get(index, 0.0) for index, value in a.items())
+
+
+def interview_stage(question_number: int) -> str:
+    """Coarse stage of the interview, so an opening-style follow-up isn't reused near the end"""
+    if question_number <= 4:
+        return "early"
+    if question_number <= 7:
+        return "mid"
+    return "late"
+
+
+def echoed_words(next_question: str, question: str, answer: str, earlier: str = "") -> frozenset:
+    """Words a follow-up picked up from the candidate rather than from the interviewer
+
+    These are the candidate's specifics (tools, employers, names, numbers).
+    `earlier` is everything else the candidate said that the prompt carried:
+    earlier answers and the rolling summary. A word in the current question
+    only counts as the interviewer's if the candidate hadn't said it before.
+    """
+    earlier_words = set(content_words(earlier))
+    candidate_words = set(content_words(answer)) | earlier_words
+    interviewer_words = set(content_words(question)) - earlier_words
+    return frozenset(set(content_words(next_question)) & candidate_words - interviewer_words)
+
+
+def focus_labels(focus_areas: str) -> List[Tuple[str, Vector]]:
+    """(label, embedding) for each "- Label: description" line of a FOCUS_AREAS entry"""
+    labels = []
+    for line in focus_areas.strip().splitlines():
+        label, _, description = line.strip().lstrip("- ").partition(":")
+        if label:
+            labels.append((label.strip(), embed(f"{label} {description}")))
+    return labels
+
+
+class BankedQuestion:
+    def __init__(self, question: str, context: Vector, echoed: frozenset, stage: str, focus_area: str):
+        self.question = question
+        self.vector = embed(question)
+        self.context = context
+        self.echoed = echoed
+        self.stage = stage
+        self.focus_area = focus_area
+        self.uses = 0
+
+
+class QuestionBank:
+    """Generated follow-ups per role and level, reused for similar answers
+
+    Every follow-up the model writes is banked under an embedding of the
+    answer it followed, tagged with the closest focus area for the role.
+    When a later answer is similar enough, a banked question the session
+    hasn't been asked (or asked a near-copy of) is served instead of calling
+    the model. A question that echoes words the candidate said (in this or an
+    earlier answer) is only served if the new candidate said them too, so
+    it never repeats another candidate's specifics.
+    """
+
+    def __init__(self, focus_areas: Dict[str, str], enabled: bool = QUESTION_BANK,
+                 min_similarity: float = QUESTION_BANK_MIN_SIMILARITY,
+                 repeat_similarity: float = QUESTION_BANK_REPEAT_SIMILARITY,
+                 max_per_role: int = QUESTION_BANK_MAX_PER_ROLE,
+                 min_answer_words: int = QUESTION_BANK_MIN_ANSWER_WORDS):
+        self.enabled = enabled
+        self.min_answer_words = min_answer_words
+        self.min_similarity = min_similarity
+        self.repeat_similarity = repeat_similarity
+        self.max_per_role = max_per_role
+        self._focus = {role: focus_labels(areas) for role, areas in focus_areas.items()}
+        self._banks: Dict[BankKey, Deque[BankedQuestion]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.banked = 0
+        self.skipped = 0
+        self.focus_hits: Dict[str, int] = {}
+
+    def find(self, role: str, experience_level: str, question_number: int, answer: str,
+             asked: List[str], earlier: str = "") -> Optional[str]:
+        """The best banked follow-up for this answer that the session hasn't seen, if any
+
+        `earlier` holds the candidate's earlier answers and summary; a banked
+        question's echoed words must all appear in it or in the answer.
+        """
+        if not self.enabled or role not in self._focus:
+            return None
+        if len(content_words(answer)) < self.min_answer_words:
+            self.misses += 1
+            return None
+        context = embed(answer)
+        candidate_words = set(content_words(answer)) | set(content_words(earlier))
+        stage = interview_stage(question_number)
+        asked_vectors = None
+        best, best_score = None, self.min_similarity
+        for entry in self._banks.get((role, experience_level), ()):
+            if entry.stage != stage or not entry.echoed <= candidate_words:
+                continue
+            score = cosine(context, entry.context)
+            if score < best_score:
+                continue
+            if asked_vectors is None:
+                asked_vectors = [embed(text) for text in asked]
+            if any(cosine(entry.vector, vector) >= self.repeat_similarity for vector in asked_vectors):
+                continue
+            best, best_score = entry, score
+        if best is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        best.uses += 1
+        self.focus_hits[best.focus_area] = self.focus_hits.get(best.focus_area, 0) + 1
+        return best.question
+
+    def add(self, role: str, experience_level: str, question_number: int, question: str,
+            answer: str, next_question: str, earlier: str = "") -> None:
+        """Bank a follow-up the model generated for this question and answer"""
+        if not self.enabled or role not in self._focus or not next_question:
+            return
+        entry_vector = embed(next_question)
+        focus_area = max(self._focus[role], key=lambda item: cosine(entry_vector, item[1]),
+                         default=("general", {}))[0]
+        bank = self._banks.setdefault((role, experience_level), deque(maxlen=self.max_per_role))
+        entry = BankedQuestion(next_question, embed(answer), echoed_words(next_question, question, answer, earlier),
+                               interview_stage(question_number), focus_area)
+        # A near-copy for a near-identical answer would never be served on its own
+        for existing in bank:
+            if existing.stage == entry.stage and cosine(existing.vector, entry.vector) >= self.repeat_similarity \
+                    and cosine(existing.context, entry.context) >= self.min_similarity:
+                self.skipped += 1
+                return
+        bank.append(entry)
+        self.banked += 1
+
+    def stats(self) -> Dict[str, object]:
+        """Hit rate, banked questions per role and hits per focus area"""
+        lookups = self.hits + self.misses
+        per_role: Dict[str, int] = {}
+        for (role, _), bank in self._banks.items():
+            per_role[role] = per_role.get(role, 0) + len(bank)
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "banked": self.banked,
+            "skipped": self.skipped,
+            "questions_per_role": per_role,
+            "hits_per_focus_area": dict(self.focus_hits),
+        }
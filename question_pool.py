@@ -0,0 +1,129 @@
+import os
+import random
+import asyncio
+import contextvars
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from telemetry import finish_span, start_span
+
+QUESTION_POOL_SIZE = int(os.getenv("QUESTION_POOL_SIZE", "4"))
+QUESTION_POOL_LOW_WATER = int(os.getenv("QUESTION_POOL_LOW_WATER", "1"))
+QUESTION_POOL_REFILL_CONCURRENCY = int(os.getenv("QUESTION_POOL_REFILL_CONCURRENCY", "2"))
+QUESTION_POOL_WARM_ON_STARTUP = os.getenv("QUESTION_POOL_WARM_ON_STARTUP", "false").lower() == "true"
+
+PoolKey = Tuple[str, str, str]
+
+
+class QuestionPool:
+    """Pre-generated opening questions per (role, experience_level, company_type)
+
+    Each question is served once. When a pool drops to the low-water mark it
+    is topped up in the background, with refill calls bounded by a semaphore.
+    `generate(role, experience_level, company_type, avoid=[...])` is given
+    the questions already pooled, so each call asks for a new one.
+    """
+
+    def __init__(self, generate: Callable[..., Awaitable[str]],
+                 allowed_keys: Iterable[PoolKey], size: int = QUESTION_POOL_SIZE,
+                 low_water: int = QUESTION_POOL_LOW_WATER,
+                 refill_concurrency: int = QUESTION_POOL_REFILL_CONCURRENCY):
+        self.generate = generate
+        self.allowed_keys: Set[PoolKey] = set(allowed_keys)
+        self.size = size
+        self.low_water = low_water
+        self._pools: Dict[PoolKey, List[str]] = {}
+        self._refilling: Set[PoolKey] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self._semaphore = asyncio.Semaphore(refill_concurrency)
+        self.hits = 0
+        self.misses = 0
+        self.generated = 0
+        self.duplicates = 0
+        self.errors = 0
+
+    def take(self, role: str, experience_level: str, company_type: str) -> Optional[str]:
+        """Pop a random pooled question, scheduling a refill when running low"""
+        key = (role, experience_level, company_type)
+        if key not in self.allowed_keys or self.size <= 0:
+            return None
+
+        pool = self._pools.setdefault(key, [])
+        question = None
+        if pool:
+            question = pool.pop(random.randrange(len(pool)))
+            self.hits += 1
+        else:
+            self.misses += 1
+
+        if len(pool) <= self.low_water:
+            self.schedule_refill(key)
+        return question
+
+    def schedule_refill(self, key: PoolKey) -> None:
+        """Start a background refill for a key unless one is already running"""
+        if key in self._refilling:
+            return
+        self._refilling.add(key)
+        # A fresh context, so the refill isn't billed to (or traced under) the request that triggered it
+        task = asyncio.create_task(self._refill(key), context=contextvars.Context())
+        # Keep a reference so the task isn't garbage collected mid-flight
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _refill(self, key: PoolKey) -> None:
+        # Root span of its own trace: the refill outlives the request that triggered it
+        role, experience_level, company_type = key
+        span = start_span("question_pool.refill", role=role, experience_level=experience_level,
+                          company_type=company_type)
+        error = None
+        pool = self._pools.setdefault(key, [])
+        attempts = 0
+        try:
+            while len(pool) < self.size:
+                attempts += 1
+                async with self._semaphore:
+                    try:
+                        question = await self.generate(*key, avoid=list(pool))
+                    except Exception as e:
+                        self.errors += 1
+                        error = e
+                        print(f"Error refilling question pool for {key}: {e}")
+                        return
+                self.generated += 1
+                if not question or question in pool:
+                    # The model has run out of new questions for now; retrying would repeat it
+                    self.duplicates += 1
+                    return
+                pool.append(question)
+        finally:
+            self._refilling.discard(key)
+            span.set(attempts=attempts, pool_size=len(pool))
+            finish_span(span, error)
+
+    async def warm(self, keys: Optional[Iterable[PoolKey]] = None) -> None:
+        """Fill the pools for the given keys (all allowed keys by default)"""
+        for key in keys if keys is not None else self.allowed_keys:
+            if key in self.allowed_keys:
+                self.schedule_refill(key)
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def close(self) -> None:
+        """Cancel in-flight refills"""
+        for task in self._tasks:
+            task.cancel()
+
+    def stats(self) -> Dict[str, object]:
+        """Pool hit/miss counters and current fill level"""
+        requests = self.hits + self.misses
+        return {
+            "pools": len(self._pools),
+            "pooled_questions": sum(len(pool) for pool in self._pools.values()),
+            "refilling": len(self._refilling),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / requests, 3) if requests else 0.0,
+            "generated": self.generated,
+            "duplicates": self.duplicates,
+            "errors": self.errors,
+        }
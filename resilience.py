@@ -0,0 +1,342 @@
+import os
+import time
+import random
+import asyncio
+from collections import deque
+from typing import AsyncIterator, Dict, Optional
+
+from llm_client import Contents, LLMClient, contents_text
+from prompts import estimate_tokens
+from telemetry import LLM_CALLS, LLM_SECONDS, LLM_TOKENS, Span, child_span, finish_span, start_span
+
+# Overall budget for one logical call, retries included
+LLM_DEADLINE_SECONDS = float(os.getenv("LLM_DEADLINE_SECONDS", "45"))
+# Budget for a single attempt
+LLM_ATTEMPT_TIMEOUT_SECONDS = float(os.getenv("LLM_ATTEMPT_TIMEOUT_SECONDS", "20"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_RETRY_BASE_SECONDS = float(os.getenv("LLM_RETRY_BASE_SECONDS", "0.5"))
+LLM_RETRY_MAX_SECONDS = float(os.getenv("LLM_RETRY_MAX_SECONDS", "4"))
+# Consecutive retryable failures that open the circuit, and how long it stays open
+LLM_BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", "5"))
+LLM_BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+# Send a second copy of slow question-generation calls after the observed p95
+LLM_HEDGING = os.getenv("LLM_HEDGING", "false").lower() == "true"
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+# On shutdown, how long in-flight calls and queued background work get to finish
+LLM_DRAIN_SECONDS = float(os.getenv("LLM_DRAIN_SECONDS", "20"))
+
+# google.api_core exception names worth retrying (matched by name so the
+# SDK doesn't have to be imported here)
+RETRYABLE_ERROR_NAMES = {
+    "ServiceUnavailable",
+    "TooManyRequests",
+    "ResourceExhausted",
+    "InternalServerError",
+    "DeadlineExceeded",
+    "GatewayTimeout",
+    "Aborted",
+}
+
+
+class LLMUnavailableError(Exception):
+    """Raised when the model can't be reached within the retry budget, or the circuit is open"""
+
+
+def call_outcome(error: Optional[BaseException]) -> str:
+    """Metric label for how a model call ended"""
+    if error is None:
+        return "ok"
+    if isinstance(error, LLMUnavailableError):
+        return "unavailable"
+    if isinstance(error, (asyncio.CancelledError, GeneratorExit)):
+        return "cancelled"
+    return "error"
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether an upstream error is transient (timeouts, 429s, 5xx, dropped connections)"""
+    return isinstance(error, (asyncio.TimeoutError, ConnectionError)) or \
+        type(error).__name__ in RETRYABLE_ERROR_NAMES
+
+
+class CircuitBreaker:
+    """Fails fast after repeated upstream failures, probing again after a cool-down
+
+    Closed: calls go through. Open: calls fail immediately. Half-open: a single
+    probe call is let through; its outcome closes or re-opens the circuit.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = LLM_BREAKER_THRESHOLD,
+                 reset_seconds: float = LLM_BREAKER_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._probing = False
+
+    def allow(self) -> bool:
+        """Whether a call may be attempted now"""
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_seconds:
+            self.state = self.HALF_OPEN
+            self._probing = False
+        if self.state == self.OPEN:
+            return False
+        if self.state == self.HALF_OPEN:
+            if self._probing:
+                return False
+            self._probing = True
+        return True
+
+    def record_success(self) -> None:
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.times_opened += 1
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+        self._probing = False
+
+    def release(self) -> None:
+        """Give back a half-open probe slot whose call was cancelled"""
+        self._probing = False
+
+
+class LatencyTracker:
+    """Sliding window of recent call latencies"""
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, p: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+class ResilientLLMClient:
+    """Deadlines, jittered retries, a circuit breaker and optional hedging around an LLMClient
+
+    Exposes the same generate/stream interface, so callers don't change.
+    Exhausted retries, an expired deadline and an open circuit all surface
+    as LLMUnavailableError, which routes turn into degraded responses.
+    """
+
+    def __init__(self, client: LLMClient, deadline: float = LLM_DEADLINE_SECONDS,
+                 attempt_timeout: float = LLM_ATTEMPT_TIMEOUT_SECONDS,
+                 max_retries: int = LLM_MAX_RETRIES, hedging: bool = LLM_HEDGING,
+                 breaker: Optional[CircuitBreaker] = None, ledger=None):
+        self.client = client
+        # Optional TokenLedger recording the size of every completed call
+        self.ledger = ledger
+        self.deadline = deadline
+        self.attempt_timeout = attempt_timeout
+        self.max_retries = max_retries
+        self.hedging = hedging
+        self.breaker = breaker or CircuitBreaker()
+        self.latency = LatencyTracker()
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+        self.fast_failures = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.degraded_responses = 0
+
+    @property
+    def backend(self):
+        return self.client.backend
+
+    @property
+    def in_flight(self) -> int:
+        return self.client.in_flight
+
+    def _backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff"""
+        return random.uniform(0, min(LLM_RETRY_MAX_SECONDS, LLM_RETRY_BASE_SECONDS * 2 ** attempt))
+
+    def _admit(self) -> None:
+        if not self.breaker.allow():
+            self.fast_failures += 1
+            raise LLMUnavailableError("LLM circuit is open")
+
+    async def _hedged(self, contents: Contents, timeout: float) -> str:
+        """Run one attempt, racing a second copy if the first is slower than the p95"""
+        primary = asyncio.ensure_future(self.client.generate(contents, timeout=timeout))
+        hedge_after = self.latency.percentile(0.95) if len(self.latency) >= LLM_HEDGE_MIN_SAMPLES else None
+        if hedge_after is None or hedge_after >= timeout:
+            return await primary
+
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+            if not done:
+                self.hedges += 1
+                tasks.add(asyncio.ensure_future(self.client.generate(contents, timeout=timeout - hedge_after)))
+            error = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def _completed(self, contents: Contents, response: str) -> None:
+        prompt = contents_text(contents)
+        LLM_TOKENS.inc(estimate_tokens(prompt), direction="prompt")
+        LLM_TOKENS.inc(estimate_tokens(response), direction="completion")
+        if self.ledger is not None:
+            self.ledger.record(prompt, response)
+
+    async def generate(self, contents: Contents, timeout: Optional[float] = None,
+                       hedge: bool = False) -> str:
+        """Generate a full response with retries; `hedge` marks latency-critical calls"""
+        span = start_span("llm.generate", hedge=hedge)
+        try:
+            response = await self._generate(contents, timeout, hedge, span)
+        except BaseException as e:
+            LLM_CALLS.inc(operation="generate", outcome=call_outcome(e))
+            LLM_SECONDS.observe(finish_span(span, e), operation="generate")
+            raise
+        LLM_CALLS.inc(operation="generate", outcome="ok")
+        LLM_SECONDS.observe(finish_span(span), operation="generate")
+        return response
+
+    async def _generate(self, contents: Contents, timeout: Optional[float], hedge: bool, span: Span) -> str:
+        self.calls += 1
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + (timeout or self.deadline)
+        attempt = 0
+        while True:
+            span.set(attempts=attempt + 1)
+            self._admit()
+            remaining = deadline - loop.time()
+            started = loop.time()
+            try:
+                if hedge and self.hedging:
+                    response = await self._hedged(contents, min(self.attempt_timeout, remaining))
+                else:
+                    response = await self.client.generate(contents, timeout=min(self.attempt_timeout, remaining))
+            except asyncio.CancelledError:
+                self.breaker.release()
+                raise
+            except Exception as e:
+                if not is_retryable(e):
+                    # The upstream answered, it just rejected this request
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                delay = self._backoff(attempt)
+                attempt += 1
+                if attempt > self.max_retries or self.breaker.state == CircuitBreaker.OPEN \
+                        or loop.time() + delay >= deadline:
+                    self.failures += 1
+                    raise LLMUnavailableError(f"LLM call failed after {attempt} attempt(s): {e!r}") from e
+                self.retries += 1
+                await asyncio.sleep(delay)
+                continue
+            self.breaker.record_success()
+            if hedge:
+                self.latency.record(loop.time() - started)
+            self._completed(contents, response)
+            return response
+
+    async def stream(self, contents: Contents, timeout: Optional[float] = None) -> AsyncIterator[str]:
+        """Stream a response, retrying only until the first chunk has been yielded"""
+        span = child_span("llm.stream")
+        error = None
+        try:
+            async for chunk in self._stream(contents, timeout, span):
+                yield chunk
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            LLM_CALLS.inc(operation="stream", outcome=call_outcome(error))
+            LLM_SECONDS.observe(finish_span(span, error), operation="stream")
+
+    async def _stream(self, contents: Contents, timeout: Optional[float], span: Span) -> AsyncIterator[str]:
+        self.calls += 1
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + (timeout or self.deadline)
+        attempt = 0
+        while True:
+            span.set(attempts=attempt + 1)
+            self._admit()
+            yielded = False
+            received = []
+            try:
+                async for chunk in self.client.stream(contents, timeout=deadline - loop.time()):
+                    yielded = True
+                    received.append(chunk)
+                    yield chunk
+            except (asyncio.CancelledError, GeneratorExit):
+                self.breaker.release()
+                raise
+            except Exception as e:
+                if not is_retryable(e):
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                delay = self._backoff(attempt)
+                attempt += 1
+                if yielded or attempt > self.max_retries or self.breaker.state == CircuitBreaker.OPEN \
+                        or loop.time() + delay >= deadline:
+                    self.failures += 1
+                    raise LLMUnavailableError(f"LLM stream failed after {attempt} attempt(s): {e!r}") from e
+                self.retries += 1
+                await asyncio.sleep(delay)
+                continue
+            self.breaker.record_success()
+            self._completed(contents, "".join(received))
+            return
+
+    async def drain(self, timeout: float) -> None:
+        """Wait until no call is in flight, up to a timeout"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while self.in_flight and loop.time() < deadline:
+            await asyncio.sleep(0.05)
+
+    def stats(self) -> Dict[str, object]:
+        """Breaker state, retry/hedge counters and recent latency percentiles"""
+        p50 = self.latency.percentile(0.5)
+        p95 = self.latency.percentile(0.95)
+        return {
+            "circuit": self.breaker.state,
+            "circuit_opened": self.breaker.times_opened,
+            "calls": self.calls,
+            "retries": self.retries,
+            "failures": self.failures,
+            "fast_failures": self.fast_failures,
+            "hedging": self.hedging,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "degraded_responses": self.degraded_responses,
+            "question_latency_p50": round(p50, 3) if p50 is not None else None,
+            "question_latency_p95": round(p95, 3) if p95 is not None else None,
+            "in_flight": self.in_flight,
+        }
@@ -0,0 +1,136 @@
+import io
+import os
+import re
+import asyncio
+import zipfile
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+from xml.etree import ElementTree
+
+RESUME_MAX_BYTES = int(os.getenv("RESUME_MAX_BYTES", str(5 * 1024 * 1024)))
+RESUME_MAX_PAGES = int(os.getenv("RESUME_MAX_PAGES", "10"))
+RESUME_MAX_CHARS = int(os.getenv("RESUME_MAX_CHARS", "30000"))
+# PDFs yielding less text than this are treated as scanned and sent to the LLM
+RESUME_MIN_TEXT_CHARS = int(os.getenv("RESUME_MIN_TEXT_CHARS", "200"))
+# "process" keeps CPU-bound PDF parsing off the GIL; "thread" avoids the fork
+RESUME_PARSER_POOL = os.getenv("RESUME_PARSER_POOL", "process")
+RESUME_PARSER_WORKERS = int(os.getenv("RESUME_PARSER_WORKERS", "2"))
+
+WORD_NAMESPACE = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+
+class ResumeTooLargeError(ValueError):
+    """Raised when an upload exceeds RESUME_MAX_BYTES"""
+
+
+def _clean_text(text: str) -> str:
+    """Collapse runs of blank lines and trailing whitespace"""
+    text = re.sub(r"[ \t]+\n", "\n", text)
+    text = re.sub(r"\n{3,}", "\n\n", text)
+    return text.strip()[:RESUME_MAX_CHARS]
+
+
+def extract_pdf_text(content: bytes, max_pages: int = RESUME_MAX_PAGES) -> str:
+    """Extract text from a PDF page by page, stopping at the page or character cap"""
+    from PyPDF2 import PdfReader
+
+    reader = PdfReader(io.BytesIO(content))
+    pages = []
+    total = 0
+    for i, page in enumerate(reader.pages):
+        if i >= max_pages or total >= RESUME_MAX_CHARS:
+            break
+        text = page.extract_text() or ""
+        pages.append(text)
+        total += len(text)
+    return _clean_text("\n\n".join(pages))
+
+
+def extract_docx_text(content: bytes) -> str:
+    """Extract paragraph text from a DOCX file without extra dependencies"""
+    with zipfile.ZipFile(io.BytesIO(content)) as archive:
+        document = archive.read("word/document.xml")
+
+    paragraphs = []
+    total = 0
+    # iterparse keeps memory flat for long documents
+    for _, element in ElementTree.iterparse(io.BytesIO(document)):
+        if element.tag != WORD_NAMESPACE + "p":
+            continue
+        text = "".join(node.text or "" for node in element.iter(WORD_NAMESPACE + "t"))
+        element.clear()
+        if text:
+            paragraphs.append(text)
+            total += len(text)
+            if total >= RESUME_MAX_CHARS:
+                break
+    return _clean_text("\n".join(paragraphs))
+
+
+def extract_plain_text(content: bytes) -> str:
+    """Decode a plain-text resume"""
+    try:
+        text = content.decode("utf-8")
+    except UnicodeDecodeError:
+        text = content.decode("latin-1")
+    return _clean_text(text)
+
+
+def is_plain_text(filename: str, content_type: str = "") -> bool:
+    """Whether an upload is a plain-text resume (.txt or a text/* content type)"""
+    return filename.lower().endswith(".txt") or content_type.lower().startswith("text/")
+
+
+def parse_resume(content: bytes, filename: str, content_type: str = "") -> str:
+    """Extract resume text locally based on the file extension
+
+    Returns an empty string for formats that can't be parsed locally.
+    """
+    name = filename.lower()
+    if name.endswith(".pdf"):
+        return extract_pdf_text(content)
+    if name.endswith(".docx"):
+        return extract_docx_text(content)
+    if name.endswith(".doc"):
+        # Legacy binary Word files aren't supported
+        return ""
+    if is_plain_text(name, content_type):
+        return extract_plain_text(content)
+    # Images, archives and other binary formats would decode to garbage
+    return ""
+
+
+_executor: Optional[Executor] = None
+
+
+def get_executor() -> Executor:
+    """Lazily create the worker pool used for parsing"""
+    global _executor
+    if _executor is None:
+        if RESUME_PARSER_POOL == "process":
+            _executor = ProcessPoolExecutor(max_workers=RESUME_PARSER_WORKERS)
+        else:
+            _executor = ThreadPoolExecutor(max_workers=RESUME_PARSER_WORKERS,
+                                           thread_name_prefix="resume-parser")
+    return _executor
+
+
+async def parse_resume_async(content: bytes, filename: str, content_type: str = "") -> str:
+    """Parse a resume in the worker pool so large files don't block the event loop"""
+    if len(content) > RESUME_MAX_BYTES:
+        raise ResumeTooLargeError(f"Resume is larger than {RESUME_MAX_BYTES} bytes")
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), parse_resume, content, filename, content_type)
+
+
+def needs_llm_fallback(text: str, filename: str) -> bool:
+    """Scanned or image-only PDFs yield little or no text"""
+    return filename.lower().endswith(".pdf") and len(text) < RESUME_MIN_TEXT_CHARS
+
+
+def shutdown_executor() -> None:
+    """Stop the worker pool"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -0,0 +1,69 @@
+"""Server entry point with a configurable number of worker processes
+
+Usage:
+    python server.py                                   # one worker on localhost:8000
+    python server.py --host 0.0.0.0 --workers 4        # needs SESSION_STORE=sqlite or redis
+    WORKERS=4 SESSION_STORE=redis HOST=0.0.0.0 python server.py
+
+Workers don't share memory, so with more than one worker every request of
+an interview must be able to find its session in a shared store. Several
+hosts behind a load balancer work the same way with SESSION_STORE=redis.
+No session affinity is needed.
+"""
+import os
+import sys
+import argparse
+from typing import Optional
+
+from session_store import SESSION_STORE
+from transcript_log import TRANSCRIPT_LOG_DIR
+
+HOST = os.getenv("HOST", "localhost")
+PORT = int(os.getenv("PORT", "8000"))
+WORKERS = int(os.getenv("WORKERS", "1"))
+# How long a stopping worker lets in-flight requests finish before closing them
+GRACEFUL_SHUTDOWN_SECONDS = float(os.getenv("GRACEFUL_SHUTDOWN_SECONDS", "30"))
+
+
+def deployment_problem(workers: int, session_store: str = SESSION_STORE,
+                       transcript_log_dir: str = TRANSCRIPT_LOG_DIR) -> Optional[str]:
+    """Why this configuration can't run with `workers` processes, if it can't"""
+    if workers <= 1:
+        return None
+    if session_store == "memory":
+        return ("SESSION_STORE=memory keeps sessions inside one process; "
+                "use SESSION_STORE=sqlite (one host) or SESSION_STORE=redis (several hosts) with WORKERS > 1")
+    if transcript_log_dir:
+        return ("TRANSCRIPT_LOG_DIR needs a single process; "
+                "with WORKERS > 1 the shared session store already keeps sessions across restarts")
+    return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the interview practice server")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--graceful-shutdown", type=float, default=GRACEFUL_SHUTDOWN_SECONDS,
+                        help="seconds in-flight requests get to finish on shutdown")
+    args = parser.parse_args()
+
+    problem = deployment_problem(args.workers)
+    if problem:
+        print(f"Can't start {args.workers} workers: {problem}")
+        sys.exit(2)
+
+    import uvicorn
+
+    # An import string lets uvicorn start each worker with its own copy of the app
+    uvicorn.run(
+        "app:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        timeout_graceful_shutdown=args.graceful_shutdown,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,371 @@
+import os
+import json
+import time
+import zlib
+import asyncio
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+SESSION_STORE = os.getenv("SESSION_STORE", "memory")
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", str(2 * 60 * 60)))
+SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", "10000"))
+SESSION_MEMORY_CAP_MB = float(os.getenv("SESSION_MEMORY_CAP_MB", "256"))
+SESSION_SQLITE_PATH = os.getenv("SESSION_SQLITE_PATH", "sessions.db")
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+# Counting Redis sessions scans the keyspace, so the count is reused for this long
+REDIS_SIZE_CACHE_SECONDS = float(os.getenv("REDIS_SIZE_CACHE_SECONDS", "30"))
+
+# Payloads above this size are zlib-compressed (resume text compresses well)
+COMPRESS_THRESHOLD = 512
+
+# Changes a session in place; returns False to leave it unsaved
+SessionMutation = Callable[[dict], bool]
+
+
+def serialize_session(session: dict) -> bytes:
+    """Encode a session as compact JSON, compressed when large"""
+    raw = json.dumps(session, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    if len(raw) > COMPRESS_THRESHOLD:
+        return b"z" + zlib.compress(raw, 6)
+    return b"j" + raw
+
+
+def deserialize_session(data: bytes) -> dict:
+    """Decode a session produced by serialize_session"""
+    if data[:1] == b"z":
+        return json.loads(zlib.decompress(data[1:]))
+    return json.loads(data[1:])
+
+
+class SessionStore:
+    """Base class for session storage backends
+
+    Sessions are returned as fresh dicts, so callers must `set` them again
+    after mutating. Every access refreshes the session's TTL.
+    """
+
+    name = "base"
+
+    def __init__(self, ttl: int = SESSION_TTL_SECONDS):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+
+    async def get(self, session_id: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    async def set(self, session_id: str, session: dict) -> None:
+        raise NotImplementedError
+
+    async def delete(self, session_id: str) -> None:
+        raise NotImplementedError
+
+    async def update(self, session_id: str, mutate: SessionMutation) -> Optional[dict]:
+        """Apply `mutate` to the latest copy of a session and save it, atomically
+
+        Several workers (and background tasks) write the same sessions, so
+        read-modify-write has to happen as one step. Returns the saved
+        session, or None if it doesn't exist or `mutate` declined.
+        """
+        # Atomic for the memory store: nothing awaits between the read and the write
+        session = await self.get(session_id)
+        if session is None or not mutate(session):
+            return None
+        await self.set(session_id, session)
+        return session
+
+    async def size(self) -> int:
+        raise NotImplementedError
+
+    async def stats(self) -> Dict[str, object]:
+        """Hit/miss and eviction counters for this process"""
+        return {
+            "backend": self.name,
+            "sessions": await self.size(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
+
+
+class MemorySessionStore(SessionStore):
+    """In-process LRU store with TTL expiry and a memory cap (single worker only)"""
+
+    name = "memory"
+
+    def __init__(self, ttl: int = SESSION_TTL_SECONDS, max_entries: int = SESSION_MAX_ENTRIES,
+                 memory_cap_mb: float = SESSION_MEMORY_CAP_MB):
+        super().__init__(ttl)
+        self.max_entries = max_entries
+        self.memory_cap = int(memory_cap_mb * 1024 * 1024)
+        self.bytes_used = 0
+        # session_id -> (expires_at, serialized session), least recently used first
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def _remove(self, session_id: str) -> None:
+        _, data = self._entries.pop(session_id)
+        self.bytes_used -= len(data)
+
+    def _purge_expired(self) -> None:
+        now = time.monotonic()
+        # Entries are kept in access order, so expired ones sit at the front
+        while self._entries:
+            session_id, (expires_at, _) = next(iter(self._entries.items()))
+            if expires_at > now:
+                break
+            self._remove(session_id)
+            self.expired += 1
+
+    async def get(self, session_id: str) -> Optional[dict]:
+        entry = self._entries.get(session_id)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                self._remove(session_id)
+                self.expired += 1
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries[session_id] = (time.monotonic() + self.ttl, entry[1])
+        self._entries.move_to_end(session_id)
+        return deserialize_session(entry[1])
+
+    async def set(self, session_id: str, session: dict) -> None:
+        data = serialize_session(session)
+        if session_id in self._entries:
+            self._remove(session_id)
+        self._entries[session_id] = (time.monotonic() + self.ttl, data)
+        self.bytes_used += len(data)
+        self._purge_expired()
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_entries or self.bytes_used > self.memory_cap
+        ):
+            self._remove(next(iter(self._entries)))
+            self.evicted += 1
+
+    async def delete(self, session_id: str) -> None:
+        if session_id in self._entries:
+            self._remove(session_id)
+
+    async def size(self) -> int:
+        return len(self._entries)
+
+    async def stats(self) -> Dict[str, object]:
+        stats = await super().stats()
+        stats["bytes_used"] = self.bytes_used
+        stats["memory_cap"] = self.memory_cap
+        return stats
+
+
+class SQLiteSessionStore(SessionStore):
+    """On-disk store shared by all workers on one host"""
+
+    name = "sqlite"
+
+    # Expired rows are swept after this many writes
+    PURGE_EVERY = 100
+
+    def __init__(self, path: str = SESSION_SQLITE_PATH, ttl: int = SESSION_TTL_SECONDS):
+        super().__init__(ttl)
+        self.path = path
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        # WAL lets several uvicorn workers read while one writes
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "id TEXT PRIMARY KEY, data BLOB NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS sessions_expires ON sessions (expires_at)")
+
+    def _get(self, session_id: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data, expires_at FROM sessions WHERE id = ?", (session_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= time.time():
+                self._conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+                self.expired += 1
+                return None
+            self._conn.execute(
+                "UPDATE sessions SET expires_at = ? WHERE id = ?", (time.time() + self.ttl, session_id)
+            )
+            return row[0]
+
+    def _set(self, session_id: str, data: bytes) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sessions (id, data, expires_at) VALUES (?, ?, ?)",
+                (session_id, data, time.time() + self.ttl)
+            )
+            self._writes += 1
+            if self._writes % self.PURGE_EVERY == 0:
+                cursor = self._conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (time.time(),))
+                self.expired += cursor.rowcount
+
+    def _delete(self, session_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    def _update(self, session_id: str, mutate: SessionMutation) -> Optional[dict]:
+        with self._lock:
+            # IMMEDIATE takes the write lock up front, so other workers wait instead of racing
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT data, expires_at FROM sessions WHERE id = ?", (session_id,)
+                ).fetchone()
+                if row is None or row[1] <= time.time():
+                    self._conn.execute("ROLLBACK")
+                    self.misses += 1
+                    return None
+                self.hits += 1
+                session = deserialize_session(row[0])
+                if not mutate(session):
+                    self._conn.execute("ROLLBACK")
+                    return None
+                self._conn.execute(
+                    "UPDATE sessions SET data = ?, expires_at = ? WHERE id = ?",
+                    (serialize_session(session), time.time() + self.ttl, session_id)
+                )
+                self._conn.execute("COMMIT")
+                return session
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _size(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM sessions WHERE expires_at > ?", (time.time(),)
+            ).fetchone()[0]
+
+    async def get(self, session_id: str) -> Optional[dict]:
+        data = await asyncio.to_thread(self._get, session_id)
+        if data is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return deserialize_session(data)
+
+    async def set(self, session_id: str, session: dict) -> None:
+        await asyncio.to_thread(self._set, session_id, serialize_session(session))
+
+    async def delete(self, session_id: str) -> None:
+        await asyncio.to_thread(self._delete, session_id)
+
+    async def update(self, session_id: str, mutate: SessionMutation) -> Optional[dict]:
+        return await asyncio.to_thread(self._update, session_id, mutate)
+
+    async def size(self) -> int:
+        return await asyncio.to_thread(self._size)
+
+
+class RedisSessionStore(SessionStore):
+    """Redis (or any Redis-protocol server) store shared across hosts
+
+    Expiry and memory-cap eviction are handled by the server, so the
+    `expired`/`evicted` counters come from its INFO stats.
+    """
+
+    name = "redis"
+
+    KEY_PREFIX = "preppal:session:"
+
+    def __init__(self, url: str = REDIS_URL, ttl: int = SESSION_TTL_SECONDS,
+                 size_cache_seconds: float = REDIS_SIZE_CACHE_SECONDS):
+        super().__init__(ttl)
+        self.size_cache_seconds = size_cache_seconds
+        self._size: Optional[int] = None
+        self._size_counted_at = 0.0
+        self._size_scan: Optional[asyncio.Task] = None
+        try:
+            import redis.asyncio as redis
+            from redis.exceptions import WatchError
+        except ImportError:
+            raise ValueError("SESSION_STORE=redis requires the 'redis' package (pip install redis)")
+        self._redis = redis.from_url(url)
+        self._watch_error = WatchError
+
+    async def get(self, session_id: str) -> Optional[dict]:
+        # GETEX refreshes the TTL in the same round-trip
+        data = await self._redis.getex(self.KEY_PREFIX + session_id, ex=self.ttl)
+        if data is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return deserialize_session(data)
+
+    async def set(self, session_id: str, session: dict) -> None:
+        await self._redis.set(self.KEY_PREFIX + session_id, serialize_session(session), ex=self.ttl)
+
+    async def delete(self, session_id: str) -> None:
+        await self._redis.delete(self.KEY_PREFIX + session_id)
+
+    async def update(self, session_id: str, mutate: SessionMutation) -> Optional[dict]:
+        key = self.KEY_PREFIX + session_id
+        async with self._redis.pipeline(transaction=True) as pipe:
+            # Optimistic: retry if another writer changed the key after WATCH
+            while True:
+                try:
+                    await pipe.watch(key)
+                    data = await pipe.get(key)
+                    if data is None:
+                        self.misses += 1
+                        return None
+                    self.hits += 1
+                    session = deserialize_session(data)
+                    if not mutate(session):
+                        return None
+                    pipe.multi()
+                    pipe.set(key, serialize_session(session), ex=self.ttl)
+                    await pipe.execute()
+                    return session
+                except self._watch_error:
+                    continue
+
+    async def _count(self) -> int:
+        count = 0
+        async for _ in self._redis.scan_iter(match=self.KEY_PREFIX + "*", count=1000):
+            count += 1
+        self._size = count
+        self._size_counted_at = time.monotonic()
+        return count
+
+    async def size(self) -> int:
+        """Session count, rescanned at most every `size_cache_seconds`
+
+        Stats requests and metrics scrapes arriving together share one scan.
+        """
+        if self._size is not None and time.monotonic() - self._size_counted_at < self.size_cache_seconds:
+            return self._size
+        if self._size_scan is None or self._size_scan.done():
+            self._size_scan = asyncio.create_task(self._count())
+        return await asyncio.shield(self._size_scan)
+
+    async def stats(self) -> Dict[str, object]:
+        stats = await super().stats()
+        info = await self._redis.info("stats")
+        stats["expired"] = info.get("expired_keys", 0)
+        stats["evicted"] = info.get("evicted_keys", 0)
+        return stats
+
+
+def create_session_store(name: str = SESSION_STORE) -> SessionStore:
+    """Build the store selected by SESSION_STORE"""
+    if name == "memory":
+        return MemorySessionStore()
+    if name == "sqlite":
+        return SQLiteSessionStore()
+    if name == "redis":
+        return RedisSessionStore()
+    raise ValueError(f"Unknown SESSION_STORE: {name}")
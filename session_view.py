@@ -0,0 +1,130 @@
+import os
+import gzip
+import json
+import hashlib
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Responses smaller than this are sent uncompressed
+RESPONSE_COMPRESS_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESS_MIN_BYTES", "1024"))
+
+# Fields a client may request from GET /api/session/{id}
+SESSION_FIELDS = (
+    "role",
+    "experience_level",
+    "company_type",
+    "resume_text",
+    "resume_summary",
+    "conversation_history",
+    "current_question",
+    "question_count",
+    "feedback",
+    "speculative",
+    "last_question_kind",
+    "conversation_summary",
+    "turn_evaluations",
+    "turn_digests",
+)
+
+# Served when no `fields` are given; the resume fields hold personal data
+# and are only returned when explicitly requested
+PRIVATE_SESSION_FIELDS = ("resume_text", "resume_summary")
+DEFAULT_SESSION_FIELDS = tuple(name for name in SESSION_FIELDS if name not in PRIVATE_SESSION_FIELDS)
+
+# Per-turn lists that `since` trims to the turns a client hasn't seen
+TURN_FIELDS = ("conversation_history", "turn_evaluations", "turn_digests")
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Requested field names from a comma-separated `fields` parameter
+
+    Raises ValueError naming any unknown field.
+    """
+    if not fields:
+        return None
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in SESSION_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown session fields: {', '.join(unknown)}")
+    return names
+
+
+def project_session(session: dict, fields: Optional[List[str]] = None, since: Optional[int] = None) -> dict:
+    """The requested view of a session
+
+    Without `fields` the default fields are returned, leaving out the
+    resume; internal bookkeeping (idempotency keys, summary progress) never
+    is. With `since`, per-turn
+    lists only hold turns from that index on, and `history_length` gives the
+    full count so the client knows where to continue.
+    """
+    view = {name: session.get(name) for name in (fields or DEFAULT_SESSION_FIELDS) if name in session}
+    if since is not None:
+        for name in TURN_FIELDS:
+            if name in view:
+                view[name] = (view[name] or [])[since:]
+        view["since"] = since
+        view["history_length"] = len(session.get("conversation_history", []))
+    return view
+
+
+def encode_json(view: dict) -> bytes:
+    return json.dumps(view, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def etag_for(body: bytes) -> str:
+    """Weak ETag for a JSON body; weak so it holds across content encodings"""
+    return 'W/"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header covers this ETag (weak comparison)"""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or any(tag.removeprefix("W/") == etag.removeprefix("W/") for tag in candidates)
+
+
+def preferred_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """The best supported encoding the client accepts: br if available, then gzip"""
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.strip().lower()] = quality
+    for encoding in ("br", "gzip"):
+        if encoding == "br" and brotli is None:
+            continue
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+def compress(body: bytes, accept_encoding: Optional[str],
+             min_bytes: int = RESPONSE_COMPRESS_MIN_BYTES) -> Tuple[bytes, Optional[str]]:
+    """Compress a body for the client when it is large enough; returns (body, encoding)"""
+    if len(body) < min_bytes:
+        return body, None
+    encoding = preferred_encoding(accept_encoding)
+    if encoding == "br":
+        return brotli.compress(body, quality=5), encoding
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=6), encoding
+    return body, None
+
+
+def response_headers(etag: str, encoding: Optional[str]) -> Dict[str, str]:
+    headers = {"ETag": etag, "Vary": "Accept-Encoding", "Cache-Control": "private, no-cache"}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return headers
@@ -0,0 +1,192 @@
+import os
+import re
+import time
+import asyncio
+from collections import OrderedDict
+from typing import Coroutine, Dict, List, Optional, Tuple
+
+from session_store import SESSION_TTL_SECONDS
+
+SPECULATIVE_FOLLOWUPS = os.getenv("SPECULATIVE_FOLLOWUPS", "false").lower() == "true"
+# Extra LLM calls a single session may spend on speculation
+SPECULATION_MAX_PER_SESSION = int(os.getenv("SPECULATION_MAX_PER_SESSION", "20"))
+# A partial answer must cover this share of the final answer to be reused
+SPECULATION_MIN_COVERAGE = float(os.getenv("SPECULATION_MIN_COVERAGE", "0.8"))
+# A new partial answer only replaces the previous one after growing this much
+SPECULATION_MIN_PARTIAL_GROWTH = float(os.getenv("SPECULATION_MIN_PARTIAL_GROWTH", "0.25"))
+
+TOPIC_ADVANCE = "topic_advance"
+PARTIAL_ANSWER = "partial_answer"
+
+# Bound on sessions tracked for budgets, so abandoned sessions don't pile up
+MAX_TRACKED_SESSIONS = 10000
+
+
+def normalize_answer(text: str) -> str:
+    """Lowercase and collapse whitespace for prefix comparison"""
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+class Speculation:
+    """A follow-up question being generated ahead of the candidate's submit"""
+
+    def __init__(self, kind: str, question_number: int, task: asyncio.Task, basis: str = ""):
+        self.kind = kind
+        self.question_number = question_number
+        self.task = task
+        self.basis = basis
+        self.started_at = time.monotonic()
+        self.finished_at: Optional[float] = None
+        task.add_done_callback(self._finished)
+
+    def _finished(self, _task: asyncio.Task) -> None:
+        self.finished_at = time.monotonic()
+
+    def covers(self, answer: str) -> bool:
+        """Whether a partial-answer speculation still fits the final answer"""
+        final = normalize_answer(answer)
+        return bool(final) and final.startswith(self.basis) and \
+            len(self.basis) >= SPECULATION_MIN_COVERAGE * len(final)
+
+
+class SpeculationManager:
+    """Per-session speculative follow-up generation with a spend cap"""
+
+    def __init__(self, max_per_session: int = SPECULATION_MAX_PER_SESSION, ttl: int = SESSION_TTL_SECONDS):
+        self.max_per_session = max_per_session
+        self.ttl = ttl
+        self._pending: Dict[str, List[Speculation]] = {}
+        self._spent: "OrderedDict[str, int]" = OrderedDict()
+        # Last speculation per session, oldest first, so abandoned sessions expire with the session TTL
+        self._last_active: "OrderedDict[str, float]" = OrderedDict()
+        self.started = 0
+        self.hits = 0
+        self.hits_by_kind: Dict[str, int] = {TOPIC_ADVANCE: 0, PARTIAL_ANSWER: 0}
+        self.misses = 0
+        self.wasted = 0
+        self.budget_exhausted = 0
+        self.latency_saved = 0.0
+
+    def _charge(self, session_id: str) -> bool:
+        spent = self._spent.pop(session_id, 0)
+        if spent >= self.max_per_session:
+            self._spent[session_id] = spent
+            self.budget_exhausted += 1
+            return False
+        self._spent[session_id] = spent + 1
+        while len(self._spent) > MAX_TRACKED_SESSIONS:
+            self._spent.popitem(last=False)
+        return True
+
+    def _touch(self, session_id: str) -> None:
+        now = time.monotonic()
+        self._last_active.pop(session_id, None)
+        self._last_active[session_id] = now
+        while self._last_active:
+            oldest, last_active = next(iter(self._last_active.items()))
+            if now - last_active < self.ttl:
+                break
+            self.discard(oldest)
+
+    def _cancel(self, spec: Speculation) -> None:
+        if not spec.task.done():
+            spec.task.cancel()
+        self.wasted += 1
+
+    def start(self, session_id: str, kind: str, question_number: int,
+              generate: Coroutine, basis: str = "") -> bool:
+        """Begin generating a speculative question for the given question number"""
+        self._touch(session_id)
+        pending = self._pending.setdefault(session_id, [])
+        basis = normalize_answer(basis)
+
+        for spec in list(pending):
+            if spec.kind != kind or spec.question_number != question_number:
+                continue
+            # Keep the existing speculation unless the partial answer has grown enough
+            if kind == TOPIC_ADVANCE or len(basis) < len(spec.basis) * (1 + SPECULATION_MIN_PARTIAL_GROWTH) \
+                    or not spec.task.done():
+                generate.close()
+                return False
+            pending.remove(spec)
+            self._cancel(spec)
+
+        if not self._charge(session_id):
+            generate.close()
+            return False
+
+        pending.append(Speculation(kind, question_number, asyncio.create_task(generate), basis))
+        self.started += 1
+        return True
+
+    async def take(self, session_id: str, question_number: int, answer: str,
+                   allow_topic_advance: bool = True) -> Optional[Tuple[str, str]]:
+        """Return (question, kind) from a speculation that fits the submitted answer
+
+        Everything that doesn't fit is cancelled.
+        """
+        pending = self._pending.pop(session_id, [])
+        chosen = None
+        for spec in pending:
+            if spec.question_number != question_number:
+                continue
+            if spec.kind == PARTIAL_ANSWER and spec.covers(answer):
+                chosen = spec
+                break
+            if spec.kind == TOPIC_ADVANCE and allow_topic_advance and chosen is None:
+                chosen = spec
+
+        for spec in pending:
+            if spec is not chosen:
+                self._cancel(spec)
+        if chosen is None:
+            self.misses += 1
+            return None
+
+        submitted_at = time.monotonic()
+        try:
+            question = (await chosen.task).strip()
+        except Exception as e:
+            print(f"Speculative question failed: {e}")
+            self.misses += 1
+            return None
+        if not question:
+            self.misses += 1
+            return None
+
+        # Time saved is however long generation had already been running at submit
+        # The done callback may not have run yet if the task finished just before submit
+        generation_time = (chosen.finished_at or time.monotonic()) - chosen.started_at
+        self.latency_saved += min(generation_time, submitted_at - chosen.started_at)
+        self.hits += 1
+        self.hits_by_kind[chosen.kind] += 1
+        return question, chosen.kind
+
+    def discard(self, session_id: str) -> None:
+        """Cancel all speculation for a session (e.g. when the interview ends)"""
+        for spec in self._pending.pop(session_id, []):
+            self._cancel(spec)
+        self._spent.pop(session_id, None)
+        self._last_active.pop(session_id, None)
+
+    def close(self) -> None:
+        """Cancel all in-flight speculation"""
+        for session_id in list(self._pending):
+            self.discard(session_id)
+
+    def stats(self) -> Dict[str, object]:
+        """Hit rate, wasted calls and total latency saved"""
+        submits = self.hits + self.misses
+        return {
+            "enabled": SPECULATIVE_FOLLOWUPS,
+            "started": self.started,
+            "hits": self.hits,
+            "hits_by_kind": dict(self.hits_by_kind),
+            "misses": self.misses,
+            "hit_rate": round(self.hits / submits, 3) if submits else 0.0,
+            "wasted": self.wasted,
+            "budget_exhausted": self.budget_exhausted,
+            "latency_saved_seconds": round(self.latency_saved, 3),
+            "in_flight": sum(1 for specs in self._pending.values() for spec in specs if not spec.task.done()),
+            "tracked_sessions": len(self._last_active),
+        }
@@ -25,7 +25,9 @@ function initializeVoice() {
 
         recognition.onresult = (event) => {
             const transcript = event.results[0][0].transcript;
-            document.getElementById('answerInput').value = transcript;
+            const answerInput = document.getElementById('answerInput');
+            answerInput.value = transcript;
+            answerInput.dispatchEvent(new Event('input'));
             
             const voiceStatus = document.getElementById('voiceStatus');
             voiceStatus.textContent = 'Got it!';
@@ -106,6 +108,68 @@ function speakText(text) {
     speechSynthesis.speak(utterance);
 }
 
+// Queue text behind any speech already in progress (used while streaming)
+function queueSpeech(text) {
+    if (!text.trim()) return;
+
+    const utterance = new SpeechSynthesisUtterance(text);
+    utterance.lang = 'en-US';
+    utterance.rate = 1.0;
+    utterance.pitch = 1.0;
+
+    const voices = speechSynthesis.getVoices();
+    const englishVoice = voices.find(voice => voice.lang.startsWith('en'));
+    if (englishVoice) {
+        utterance.voice = englishVoice;
+    }
+
+    speechSynthesis.speak(utterance);
+}
+
+// Speaks a streamed question sentence by sentence as the tokens arrive
+class StreamingSpeaker {
+    constructor() {
+        this.spokenUpTo = 0;
+        if (speechSynthesis) {
+            speechSynthesis.cancel();
+        }
+    }
+
+    // Speak every complete sentence that hasn't been spoken yet
+    update(text) {
+        if (!speechSynthesis) return;
+
+        const pending = text.slice(this.spokenUpTo);
+        const boundary = /[.!?](\s|$)/g;
+        let end = -1;
+        let match;
+        while ((match = boundary.exec(pending)) !== null) {
+            // Only treat end-of-text as a boundary once the stream is finished
+            if (match[1] === '') break;
+            end = match.index + 1;
+        }
+        if (end > 0) {
+            queueSpeech(pending.slice(0, end));
+            this.spokenUpTo += end;
+        }
+    }
+
+    // Speak whatever is left once the stream completes
+    finish(text) {
+        if (!speechSynthesis) return;
+
+        queueSpeech(text.slice(this.spokenUpTo));
+        this.spokenUpTo = text.length;
+    }
+
+    // Stop speaking a question that turned out not to be recorded
+    cancel() {
+        if (speechSynthesis) {
+            speechSynthesis.cancel();
+        }
+    }
+}
+
 // Load voices (they load asynchronously)
 if (speechSynthesis) {
     speechSynthesis.onvoiceschanged = () => {
@@ -0,0 +1,288 @@
+import os
+import json
+from typing import Annotated, Any, Dict, List, Optional, Tuple, Type, get_args, get_origin
+
+from pydantic import BaseModel, BeforeValidator, TypeAdapter, ValidationError
+
+# Re-prompts for missing fields before giving up on a feedback response
+STRUCTURED_REPAIR_ATTEMPTS = int(os.getenv("STRUCTURED_REPAIR_ATTEMPTS", "2"))
+
+
+def clamp_score(value: Any) -> int:
+    """Coerce a model-produced score ("7", 7.5, 11) to an int in 1-10"""
+    return max(1, min(10, int(round(float(value)))))
+
+
+Score = Annotated[int, BeforeValidator(clamp_score)]
+
+
+class DimensionScores(BaseModel):
+    communication_clarity: Score
+    confidence_structure: Score
+    technical_knowledge: Score
+    role_specific_skills: Score
+
+
+class ImprovedAnswer(BaseModel):
+    original_question: str
+    their_answer: str
+    improved_answer: str
+
+
+class Feedback(BaseModel):
+    overall_score: Score
+    dimension_scores: DimensionScores
+    strengths: List[str]
+    areas_to_improve: List[str]
+    improved_answers: List[ImprovedAnswer] = []
+
+
+class AnswerEvaluation(BaseModel):
+    dimension_scores: DimensionScores
+    strength: str = ""
+    weakness: str = ""
+    improved_answer: str = ""
+
+
+class FeedbackSynthesis(BaseModel):
+    strengths: List[str] = []
+    areas_to_improve: List[str] = []
+
+
+class StructuredOutputError(ValueError):
+    """Raised when a response can't be turned into the expected schema"""
+
+
+class ParserStats:
+    """Counters for how often model output needed recovery"""
+
+    def __init__(self):
+        self.parsed = 0
+        self.recovered = 0
+        self.parse_failures = 0
+        self.repair_prompts = 0
+        self.repaired = 0
+        self.unrecoverable = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return dict(vars(self))
+
+
+stats = ParserStats()
+
+
+def _closers(stack: List[str]) -> str:
+    return "".join("}" if opener == "{" else "]" for opener in reversed(stack))
+
+
+def recover_json(text: str) -> Any:
+    """Parse JSON from model output, tolerating fences, prose and truncation
+
+    Truncated output is cut back to the last complete value and any open
+    strings, arrays and objects are closed.
+    """
+    start = min((i for i in (text.find("{"), text.find("[")) if i != -1), default=-1)
+    if start == -1:
+        raise StructuredOutputError("No JSON found in response")
+    text = text[start:]
+
+    # One pass recording where the text could be cut and how to close it
+    stack: List[str] = []
+    cut_points: List[Tuple[int, str]] = []
+    in_string = False
+    escaped = False
+    end = None
+    for i, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+            continue
+        if char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append(char)
+            cut_points.append((i + 1, _closers(stack)))
+        elif char in "}]":
+            if stack:
+                stack.pop()
+            if not stack:
+                end = i + 1
+                break
+            cut_points.append((i + 1, _closers(stack)))
+        elif char == ",":
+            cut_points.append((i, _closers(stack)))
+
+    if end is not None:
+        return json.loads(text[:end])
+
+    # Truncated: cut back to the last complete value, closing a half-written
+    # string only as a last resort
+    candidates = [text + _closers(stack)]
+    candidates += [text[:cut] + closers for cut, closers in reversed(cut_points)]
+    if in_string:
+        candidates.append(text + '"' + _closers(stack))
+    for candidate in candidates:
+        try:
+            return json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+    raise StructuredOutputError("Could not recover JSON from response")
+
+
+class IncrementalJSONParser:
+    """Accumulates streamed chunks and exposes the best-effort object so far"""
+
+    def __init__(self):
+        self.buffer = ""
+
+    def feed(self, chunk: str) -> None:
+        self.buffer += chunk
+
+    def snapshot(self) -> Optional[Any]:
+        """The object parsed from everything received so far, or None"""
+        try:
+            return recover_json(self.buffer)
+        except (StructuredOutputError, json.JSONDecodeError):
+            return None
+
+
+def parse_json_response(text: str) -> Any:
+    """Parse a JSON value from a model response, counting recoveries and failures"""
+    try:
+        value = json.loads(text.strip())
+        stats.parsed += 1
+        return value
+    except json.JSONDecodeError:
+        pass
+    try:
+        value = recover_json(text)
+    except (StructuredOutputError, json.JSONDecodeError) as e:
+        stats.parse_failures += 1
+        raise StructuredOutputError(str(e))
+    stats.recovered += 1
+    return value
+
+
+def prune_invalid_items(data: dict, model: Type[BaseModel]) -> None:
+    """Drop broken entries (e.g. a half-written last item) from list-of-object fields"""
+    for name, field in model.model_fields.items():
+        if get_origin(field.annotation) is not list or not isinstance(data.get(name), list):
+            continue
+        item_type = get_args(field.annotation)[0]
+        if not (isinstance(item_type, type) and issubclass(item_type, BaseModel)):
+            continue
+        valid = []
+        for item in data[name]:
+            try:
+                item_type.model_validate(item)
+                valid.append(item)
+            except ValidationError:
+                pass
+        data[name] = valid
+
+
+def invalid_fields(data: Any, model: Type[BaseModel]) -> List[str]:
+    """Top-level fields of `model` that are missing or invalid in `data`
+
+    Required list fields that came back empty count as missing.
+    """
+    if not isinstance(data, dict):
+        return list(model.model_fields)
+    invalid = []
+    for name, field in model.model_fields.items():
+        if name not in data:
+            if field.is_required():
+                invalid.append(name)
+            continue
+        try:
+            TypeAdapter(field.annotation).validate_python(data[name])
+        except ValidationError:
+            invalid.append(name)
+            continue
+        if field.is_required() and data[name] == []:
+            invalid.append(name)
+    return invalid
+
+
+def validate(data: Any, model: Type[BaseModel]) -> BaseModel:
+    """Validate parsed data against a schema, raising StructuredOutputError"""
+    try:
+        return model.model_validate(data)
+    except ValidationError as e:
+        raise StructuredOutputError(str(e))
+
+
+def field_schema(model: Type[BaseModel], fields: List[str]) -> str:
+    """JSON schema snippet describing only the given fields"""
+    schema = model.model_json_schema()
+    properties = {name: schema["properties"][name] for name in fields}
+    subset = {"type": "object", "properties": properties, "required": fields}
+    if "$defs" in schema:
+        subset["$defs"] = schema["$defs"]
+    return json.dumps(subset, indent=2)
+
+
+REPAIR_PROMPT = """{original_prompt}
+
+---
+Your previous response was incomplete: these fields were missing or invalid: {fields}.
+Return ONLY a JSON object containing just these fields, matching this schema:
+{schema}"""
+
+
+async def generate_structured(llm, prompt: str, model: Type[BaseModel],
+                              repair_attempts: int = STRUCTURED_REPAIR_ATTEMPTS) -> BaseModel:
+    """Generate and validate a structured response, re-prompting only for broken fields
+
+    The streamed response is parsed incrementally, so output cut off by a
+    timeout or dropped connection is kept rather than discarded.
+    """
+    parser = IncrementalJSONParser()
+    try:
+        async for chunk in llm.stream(prompt):
+            parser.feed(chunk)
+    except Exception as e:
+        if not parser.buffer:
+            raise
+        print(f"Structured response interrupted, keeping partial output: {e}")
+
+    try:
+        data = parse_json_response(parser.buffer)
+    except StructuredOutputError:
+        data = {}
+    if not isinstance(data, dict):
+        data = {}
+    prune_invalid_items(data, model)
+
+    missing = invalid_fields(data, model)
+    attempts = 0
+    while missing and attempts < repair_attempts:
+        attempts += 1
+        stats.repair_prompts += 1
+        try:
+            response = await llm.generate(REPAIR_PROMPT.format(
+                original_prompt=prompt,
+                fields=", ".join(missing),
+                schema=field_schema(model, missing)
+            ))
+            patch = parse_json_response(response)
+        except Exception as e:
+            print(f"Repair prompt failed: {e}")
+            continue
+        if isinstance(patch, dict):
+            prune_invalid_items(patch, model)
+            for name in missing:
+                if name in patch:
+                    data[name] = patch[name]
+        missing = invalid_fields(data, model)
+        if not missing:
+            stats.repaired += 1
+
+    if missing:
+        stats.unrecoverable += 1
+        raise StructuredOutputError(f"Missing or invalid fields: {', '.join(missing)}")
+    return validate(data, model)
@@ -0,0 +1,310 @@
+import os
+import time
+import uuid
+import random
+import contextvars
+from bisect import bisect_left
+from collections import deque
+from functools import wraps
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+TRACING = os.getenv("TRACING", "true").lower() == "true"
+# Finished spans kept in memory for /api/traces
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "2000"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    """Base class for metrics rendered in the Prometheus text format"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        registry.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        return "\n".join(lines + self.samples())
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.label_names, key)} {value}"
+                for key, value in self._values.items()]
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels) -> None:
+        self._values[self._key(labels)] = value
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.label_names, key)} {value}"
+                for key, value in self._values.items()]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+        # Per label set: [count per bucket (+Inf last), sum]
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        entry = self._values.get(key)
+        if entry is None:
+            entry = self._values[key] = ([0] * (len(self.buckets) + 1), [0.0])
+        entry[0][bisect_left(self.buckets, value)] += 1
+        entry[1][0] += value
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, (counts, total) in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                labels = _format_labels(self.label_names, key, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {total[0]}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {cumulative}")
+        return lines
+
+
+registry: List[Metric] = []
+
+
+def render_metrics() -> str:
+    """All registered metrics in the Prometheus text exposition format"""
+    return "\n".join(metric.render() for metric in registry) + "\n"
+
+
+STAGE_SECONDS = Histogram("interview_stage_seconds", "Latency of each interview stage", ["stage"])
+STAGE_ERRORS = Counter("interview_stage_errors_total", "Interview stages that raised", ["stage"])
+HTTP_SECONDS = Histogram("http_request_seconds", "HTTP request latency by route", ["method", "route"])
+HTTP_REQUESTS = Counter("http_requests_total", "HTTP requests by route and status", ["method", "route", "status"])
+LLM_SECONDS = Histogram("llm_call_seconds", "Latency of model calls, retries included", ["operation"])
+LLM_CALLS = Counter("llm_calls_total", "Model calls by outcome", ["operation", "outcome"])
+LLM_TOKENS = Counter("llm_tokens_total", "Estimated tokens sent to and received from the model", ["direction"])
+LLM_IN_FLIGHT = Gauge("llm_in_flight", "Model calls currently running")
+LLM_CIRCUIT_OPEN = Gauge("llm_circuit_open", "1 while the model circuit breaker is open")
+ACTIVE_SESSIONS = Gauge("sessions_active", "Sessions held by the session store")
+SESSION_STORE_BYTES = Gauge("session_store_bytes", "Approximate session store size, where the backend reports it")
+EVALUATION_QUEUE_DEPTH = Gauge("evaluation_queue_depth", "Answers waiting to be scored")
+SESSION_READS = Counter("session_reads_total", "Session API reads by result", ["result"])
+SESSION_READ_BYTES = Counter("session_read_bytes_total", "Session API body bytes before and after compression", ["stage"])
+IDEMPOTENT_REPLAYS = Counter("idempotent_replays_total", "Retried requests answered from the stored result", ["route"])
+
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+finished_spans: deque = deque(maxlen=TRACE_BUFFER_SIZE)
+
+
+class Span:
+    """A timed operation in a trace, OpenTelemetry-style (trace id, span id, parent)"""
+
+    def __init__(self, name: str, parent: Optional["Span"] = None, trace_id: Optional[str] = None,
+                 parent_id: Optional[str] = None, **attributes):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else (trace_id or uuid.uuid4().hex)
+        self.span_id = "%016x" % random.getrandbits(64)
+        self.parent_id = parent.span_id if parent else parent_id
+        self.attributes = attributes
+        self.start_time = time.time()
+        self._started = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.status = "ok"
+        self._token = None
+
+    def set(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+    def end(self, error: Optional[BaseException] = None) -> float:
+        if self.duration is None:
+            self.duration = time.perf_counter() - self._started
+            if error is not None:
+                self.status = "error"
+                self.attributes["error"] = type(error).__name__
+            if TRACING:
+                finished_spans.append(self)
+        return self.duration
+
+    @property
+    def traceparent(self) -> str:
+        """W3C traceparent header value for this span"""
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def as_dict(self) -> Dict[str, object]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start_time,
+            "duration_ms": round(self.duration * 1000, 3) if self.duration is not None else None,
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+def parse_traceparent(header: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """(trace_id, parent span id) from a W3C traceparent header, if valid"""
+    parts = (header or "").split("-")
+    if len(parts) == 4 and len(parts[1]) == 32 and len(parts[2]) == 16:
+        return parts[1], parts[2]
+    return None, None
+
+
+def start_span(name: str, trace_id: Optional[str] = None, parent_id: Optional[str] = None,
+               **attributes) -> Span:
+    """Start a span as a child of the current one, and make it current"""
+    span = Span(name, _current_span.get(), trace_id, parent_id, **attributes)
+    span._token = _current_span.set(span)
+    return span
+
+
+def child_span(name: str, **attributes) -> Span:
+    """Start a span under the current one without making it current (for generators)"""
+    return Span(name, _current_span.get(), **attributes)
+
+
+def finish_span(span: Span, error: Optional[BaseException] = None) -> float:
+    """End a span and restore its parent as the current span"""
+    if span._token is not None:
+        try:
+            _current_span.reset(span._token)
+        except ValueError:
+            # Ended from a different context (e.g. a streaming body); nothing to restore
+            pass
+    return span.end(error)
+
+
+class stage:
+    """Time an interview stage into STAGE_SECONDS and a span
+
+    Usable as `with stage("followup"):` or as a decorator on async functions.
+    """
+
+    def __init__(self, name: str, **attributes):
+        self.name = name
+        self.attributes = attributes
+        self.span: Optional[Span] = None
+
+    def __enter__(self) -> Span:
+        self.span = start_span(f"stage.{self.name}", **self.attributes)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        STAGE_SECONDS.observe(finish_span(self.span, exc), stage=self.name)
+        if exc is not None:
+            STAGE_ERRORS.inc(stage=self.name)
+
+    def __call__(self, func: Callable) -> Callable:
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            with stage(self.name, **self.attributes):
+                return await func(*args, **kwargs)
+        return wrapper
+
+
+class TraceMiddleware:
+    """Root span and latency metrics for every HTTP request
+
+    Plain ASGI, so requests and streamed bodies pass straight through
+    without an extra task or body wrapper. The span ends once the response
+    has been sent, so streamed responses are timed to their last event.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        traceparent = dict(scope["headers"]).get(b"traceparent")
+        trace_id, parent_id = parse_traceparent(traceparent.decode("latin-1") if traceparent else None)
+        method = scope["method"]
+        span = start_span("http.request", trace_id, parent_id, method=method, path=scope["path"])
+        status = 500
+        error: Optional[BaseException] = None
+
+        async def send_traced(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = [*message.get("headers", []), (b"traceparent", span.traceparent.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_traced)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            # Label by route template, not the raw path, to keep cardinality bounded
+            route = scope.get("route")
+            route = route.path if route is not None else "unmatched"
+            span.set(route=route, status=status)
+            if error is None and status >= 500:
+                error = RuntimeError(f"HTTP {status}")
+            duration = finish_span(span, error)
+            HTTP_SECONDS.observe(duration, method=method, route=route)
+            HTTP_REQUESTS.inc(method=method, route=route, status=str(status))
+
+
+def recent_traces(limit: int = 20) -> List[Dict[str, object]]:
+    """The most recent traces, each with its spans in start order"""
+    traces: Dict[str, List[Span]] = {}
+    for span in reversed(finished_spans):
+        if span.trace_id not in traces:
+            if len(traces) >= limit:
+                continue
+            traces[span.trace_id] = []
+        traces[span.trace_id].append(span)
+    return [
+        {"trace_id": trace_id, "spans": [span.as_dict() for span in sorted(spans, key=lambda s: s.start_time)]}
+        for trace_id, spans in traces.items()
+    ]
@@ -0,0 +1,38 @@
+import os
+import sys
+
+import pytest
+
+# Run against the offline fake model with in-process state, before app modules read their settings
+os.environ.setdefault("LLM_BACKEND", "fake")
+os.environ.setdefault("FAKE_LLM_LATENCY_MS", "5")
+os.environ.setdefault("FAKE_LLM_JITTER_MS", "0")
+os.environ.setdefault("SESSION_STORE", "memory")
+os.environ.setdefault("RESUME_PARSER_POOL", "thread")
+os.environ.setdefault("TRANSCRIPT_LOG_DIR", "")
+os.environ.setdefault("RESUME_CACHE_DIR", "")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def app_module():
+    import app
+    return app
+
+
+@pytest.fixture(scope="session")
+def client(app_module):
+    from fastapi.testclient import TestClient
+
+    with TestClient(app_module.app) as test_client:
+        yield test_client
+
+
+def start_interview(client, role: str = "Software Engineer / SDE", experience_level: str = "Junior",
+                    company_type: str = "general", **kwargs) -> str:
+    response = client.post("/api/start-interview", data={
+        "role": role, "experience_level": experience_level, "company_type": company_type
+    }, **kwargs)
+    assert response.status_code == 200, response.text
+    return response.json()["session_id"]
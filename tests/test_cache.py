@@ -0,0 +1,66 @@
+import asyncio
+import os
+import time
+
+from cache import TextCache
+
+
+def test_disk_tier_evicts_least_recently_used(tmp_path):
+    cache = TextCache("resume_text", cache_dir=str(tmp_path), disk_max_entries=2)
+
+    async def scenario():
+        await cache.set("a", "first")
+        await cache.set("b", "second")
+        # Age both files, then read "a" so "b" becomes the least recently used
+        for key in ("a", "b"):
+            os.utime(cache._disk_path(key), (time.time() - 60, time.time() - 60))
+        cache._entries.clear()
+        assert await cache.get("a") == "first"
+        await cache.set("c", "third")
+
+    asyncio.run(scenario())
+    assert sorted(os.listdir(tmp_path / "resume_text")) == ["a.txt", "c.txt"]
+    stats = cache.stats()
+    assert stats["disk_entries"] == 2
+    assert stats["disk_evictions"] == 1
+    assert stats["disk_bytes"] == len("first") + len("third")
+
+
+def test_disk_tier_respects_byte_cap(tmp_path):
+    cache = TextCache("resume_text", cache_dir=str(tmp_path), disk_max_mb=10 / (1024 * 1024))
+
+    async def scenario():
+        await cache.set("a", "x" * 6)
+        os.utime(cache._disk_path("a"), (time.time() - 60, time.time() - 60))
+        await cache.set("b", "y" * 6)
+
+    asyncio.run(scenario())
+    assert os.listdir(tmp_path / "resume_text") == ["b.txt"]
+    assert cache.stats()["disk_bytes"] == 6
+
+
+def test_expired_disk_entry_is_a_miss_and_deleted(tmp_path):
+    cache = TextCache("resume_text", cache_dir=str(tmp_path), ttl=60)
+
+    async def scenario():
+        await cache.set("a", "stale")
+        os.utime(cache._disk_path("a"), (time.time() - 120, time.time() - 120))
+        cache._entries.clear()
+        return await cache.get("a")
+
+    assert asyncio.run(scenario()) is None
+    assert not os.path.exists(cache._disk_path("a"))
+    assert cache.stats()["disk_expired"] == 1
+
+
+def test_startup_sweep_removes_expired_files(tmp_path):
+    directory = tmp_path / "resume_text"
+    directory.mkdir()
+    stale = directory / "old.txt"
+    stale.write_text("stale", encoding="utf-8")
+    os.utime(stale, (time.time() - 120, time.time() - 120))
+    (directory / "fresh.txt").write_text("fresh", encoding="utf-8")
+
+    cache = TextCache("resume_text", cache_dir=str(tmp_path), ttl=60)
+    assert os.listdir(directory) == ["fresh.txt"]
+    assert cache.stats()["disk_entries"] == 1
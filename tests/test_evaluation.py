@@ -0,0 +1,53 @@
+import asyncio
+
+import evaluation
+from evaluation import EvaluationQueue
+
+EVALUATION = """{"dimension_scores": {"communication_clarity": 7, "confidence_structure": 7,
+"technical_knowledge": 7, "role_specific_skills": 7}, "strength": "Clear", "weakness": "Short",
+"improved_answer": "Longer"}"""
+
+
+class FlakyLLM:
+    def __init__(self, failures: int):
+        self.failures = failures
+        self.calls = 0
+
+    async def generate(self, prompt: str) -> str:
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise RuntimeError("provider unavailable")
+        return EVALUATION
+
+
+class Sessions:
+    def __init__(self, session: dict):
+        self.session = session
+
+    async def update(self, session_id: str, fn) -> None:
+        fn(self.session)
+
+
+def test_drain_waits_for_pending_retries(monkeypatch):
+    monkeypatch.setattr(evaluation, "EVAL_RETRY_BASE_SECONDS", 0.1)
+    session = {
+        "role": "Software Engineer / SDE",
+        "experience_level": "Junior",
+        "conversation_history": [{"question": "Why this role?", "answer": "I like building things."}],
+    }
+
+    async def scenario():
+        queue = EvaluationQueue(FlakyLLM(failures=1), Sessions(session), workers=1)
+        queue.enqueue("s1", 0, session)
+        # Let the first attempt fail so the job is waiting out its backoff
+        while queue.retries == 0:
+            await asyncio.sleep(0.01)
+        await queue.drain(timeout=5)
+        stats = queue.stats()
+        queue.close()
+        return stats
+
+    stats = asyncio.run(scenario())
+    assert stats["completed"] == 1
+    assert stats["retrying"] == 0
+    assert session["turn_evaluations"][0]["strength"] == "Clear"
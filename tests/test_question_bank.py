@@ -0,0 +1,74 @@
+from question_bank import QuestionBank
+
+ROLE = "Software Engineer / SDE"
+LEVEL = "Junior"
+FOCUS = {ROLE: "- Technical Skills: coding and design\n- Teamwork: collaboration"}
+QUESTION = "Tell me about a time you had a conflict with a teammate. How did you handle it?"
+
+
+def make_bank() -> QuestionBank:
+    return QuestionBank(FOCUS, enabled=True)
+
+
+def test_similar_answer_reuses_follow_up():
+    bank = make_bank()
+    bank.add(ROLE, LEVEL, 2, QUESTION,
+             "My teammate and I disagreed about the database schema, so we wrote a small prototype of each "
+             "design and compared query performance before deciding",
+             "What would you do differently next time?")
+    found = bank.find(ROLE, LEVEL, 2,
+                      "I disagreed with a colleague on the database schema design; we prototyped both options "
+                      "and measured the query performance to decide", [])
+    assert found == "What would you do differently next time?"
+
+
+def test_unrelated_answers_to_the_same_question_do_not_match():
+    answers = [
+        "We argued about whether to use tabs or spaces and eventually let the linter decide for the whole team",
+        "My manager wanted a feature shipped by friday but I thought testing needed more time, so I proposed "
+        "a smaller release scope",
+        "A designer and I clashed over the onboarding flow; we ran a quick user test with five customers and "
+        "went with the results",
+        "My teammate wanted to denormalize the database for speed and I worried about consistency, so we "
+        "agreed on read replicas instead",
+        "I had a conflict with a teammate over code review comments that felt personal, and we agreed on a "
+        "review checklist",
+    ]
+    for source in answers:
+        for other in answers:
+            if other is source:
+                continue
+            bank = make_bank()
+            bank.add(ROLE, LEVEL, 2, QUESTION, source, "What would you do differently next time?")
+            assert bank.find(ROLE, LEVEL, 2, other, []) is None, (source, other)
+
+
+def test_specifics_from_an_earlier_answer_are_not_served_to_others():
+    earlier = "I worked at Walmart in Denver, and my manager Priya mentored me through my first launch"
+    answer = "I was nervous presenting the launch plan, so I rehearsed with my team and asked for feedback early"
+    leaky = "When you were at Walmart in Denver, how did your manager Priya support you while you prepared?"
+    bank = make_bank()
+    bank.add(ROLE, LEVEL, 3, "How do you prepare for presenting to stakeholders?", answer, leaky, earlier)
+
+    similar = "I was nervous presenting the launch plan, so I rehearsed it with my team and asked for early feedback"
+    assert bank.find(ROLE, LEVEL, 3, similar, []) is None
+    # A candidate who mentioned the same specifics themselves may get it
+    assert bank.find(ROLE, LEVEL, 3, similar, [], earlier) == leaky
+
+
+def test_specific_from_the_current_question_counts_as_the_candidates():
+    # The interviewer's question repeated an employer the candidate named earlier
+    earlier = "I spent two years at Walmart on the checkout team"
+    question = "At Walmart, how did you handle a release going wrong?"
+    answer = "A release broke payments, so I rolled it back, wrote the postmortem and added a migration check"
+    bank = make_bank()
+    bank.add(ROLE, LEVEL, 3, question, answer, "What did Walmart change after that postmortem?", earlier)
+    assert bank.find(ROLE, LEVEL, 3, answer, []) is None
+
+
+def test_already_asked_question_is_not_repeated():
+    answer = ("My teammate and I disagreed about the database schema, so we wrote a small prototype of each "
+              "design and compared query performance before deciding")
+    bank = make_bank()
+    bank.add(ROLE, LEVEL, 2, QUESTION, answer, "What would you do differently next time?")
+    assert bank.find(ROLE, LEVEL, 2, answer, ["What would you do differently next time?"]) is None
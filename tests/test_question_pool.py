@@ -0,0 +1,50 @@
+import asyncio
+
+from question_pool import QuestionPool
+
+KEY = ("Software Engineer / SDE", "Junior", "general")
+
+
+def refill(generate, size: int = 4) -> QuestionPool:
+    async def run():
+        pool = QuestionPool(generate, [KEY], size=size, low_water=1)
+        await pool.warm([KEY])
+        return pool
+    return asyncio.run(run())
+
+
+def test_refill_asks_for_questions_not_already_pooled():
+    calls = []
+
+    async def generate(role, experience_level, company_type, avoid=()):
+        calls.append(list(avoid))
+        return f"Question {len(avoid) + 1}?"
+
+    pool = refill(generate)
+    assert pool.stats()["pooled_questions"] == 4
+    assert len(calls) == 4
+    assert calls[-1] == ["Question 1?", "Question 2?", "Question 3?"]
+
+
+def test_refill_stops_at_the_first_duplicate():
+    calls = []
+
+    async def generate(role, experience_level, company_type, avoid=()):
+        calls.append(1)
+        return "Walk me through your background?"
+
+    pool = refill(generate)
+    assert len(calls) == 2
+    assert pool.stats()["pooled_questions"] == 1
+    assert pool.stats()["duplicates"] == 1
+
+
+def test_fake_backend_fills_a_pool_without_wasting_calls(client, app_module):
+    key = ("Data Analyst / Data Scientist", "Mid", "service-based")
+    pool = app_module.question_pool
+    generated = pool.generated
+    client.portal.call(pool.warm, [key])
+    pooled = len(pool._pools[key])
+    assert pooled > 1
+    # At most one wasted call: the duplicate that ends the refill
+    assert pool.generated - generated <= pooled + 1
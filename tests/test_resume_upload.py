@@ -0,0 +1,27 @@
+from conftest import start_interview
+
+FORM = {"role": "Software Engineer / SDE", "experience_level": "Junior"}
+
+
+def test_oversized_resume_is_rejected_before_hashing(client, app_module, monkeypatch):
+    monkeypatch.setattr(app_module, "RESUME_MAX_BYTES", 64)
+
+    def fail(*args):
+        raise AssertionError("oversized upload was hashed")
+
+    monkeypatch.setattr(app_module, "content_key", fail)
+    response = client.post("/api/start-interview", data=FORM,
+                           files={"resume": ("cv.txt", b"x" * 65, "text/plain")})
+    assert response.status_code == 413
+
+
+def test_resume_at_the_cap_is_accepted(client, app_module, monkeypatch):
+    monkeypatch.setattr(app_module, "RESUME_MAX_BYTES", 64)
+    session_id = start_interview(client, files={"resume": ("cv.txt", b"Python developer ".ljust(64, b"x"), "text/plain")})
+    session = client.portal.call(app_module.sessions.get, session_id)
+    assert session["resume_text"].startswith("Python developer")
+
+
+def test_binary_upload_is_ignored(client, app_module):
+    session_id = start_interview(client, files={"resume": ("cv.png", b"\x89PNG\r\n\x1a\n\x00binary", "image/png")})
+    assert client.portal.call(app_module.sessions.get, session_id)["resume_text"] == ""
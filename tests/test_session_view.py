@@ -0,0 +1,17 @@
+from conftest import start_interview
+
+
+def test_default_view_leaves_out_the_resume(client):
+    session_id = start_interview(client)
+
+    body = client.get(f"/api/session/{session_id}").json()
+    assert "current_question" in body
+    assert "resume_text" not in body
+    assert "resume_summary" not in body
+
+
+def test_resume_fields_are_served_when_requested(client):
+    session_id = start_interview(client)
+
+    body = client.get(f"/api/session/{session_id}", params={"fields": "resume_text,resume_summary"}).json()
+    assert set(body) == {"resume_text", "resume_summary"}
@@ -0,0 +1,30 @@
+import telemetry
+from conftest import start_interview
+
+
+def spans_by_trace():
+    traces = {}
+    for span in telemetry.finished_spans:
+        traces.setdefault(span.trace_id, []).append(span)
+    return traces
+
+
+def test_pool_refill_runs_in_its_own_trace(client, app_module):
+    telemetry.finished_spans.clear()
+    start_interview(client, company_type="enterprise", experience_level="Fresher")
+    client.portal.call(app_module.question_pool.warm, [])
+
+    traces = spans_by_trace()
+    request = [spans for spans in traces.values()
+               if any(span.name == "http.request" and span.attributes.get("route") == "/api/start-interview"
+                      for span in spans)]
+    assert len(request) == 1
+    # Only the opening question belongs to the request
+    assert [span.name for span in request[0]].count("llm.generate") == 1
+
+    refills = [spans for spans in traces.values() if any(span.name == "question_pool.refill" for span in spans)]
+    assert refills
+    for spans in refills:
+        root = [span for span in spans if span.parent_id is None]
+        assert [span.name for span in root] == ["question_pool.refill"]
+        assert all(span.name != "http.request" for span in spans)
@@ -0,0 +1,44 @@
+import asyncio
+
+from admission import TokenLedger, bind_shared_usage, bind_usage
+from conftest import start_interview
+
+
+def test_pool_refills_are_not_billed_to_the_starting_session(client, app_module):
+    # A company type no other test uses, so its pool starts empty and this start triggers a refill
+    session_id = start_interview(client, company_type="startup", experience_level="Senior")
+    client.portal.call(app_module.question_pool.warm, [])
+    assert app_module.question_pool.stats()["generated"] > 0
+
+    usage = client.get(f"/api/usage/{session_id}").json()
+    assert usage["calls"] == 1
+
+
+def test_shared_call_is_split_between_sessions():
+    ledger = TokenLedger()
+    ledger.reserve("ip:a", "s1", "end-interview", 100)
+    ledger.reserve("ip:b", "s2", "end-interview", 100)
+
+    async def shared_call():
+        bind_shared_usage(["s1", "s2"], "end-interview")
+        return ledger.record("x" * 400, "y" * 400)
+
+    tokens = asyncio.run(shared_call())
+    first, second = ledger.session_usage("s1")["actual"], ledger.session_usage("s2")["actual"]
+    assert first + second == tokens
+    assert abs(first - second) <= 1
+    assert ledger.stats()["tenants"]["ip:a"]["actual"] == first
+    assert ledger.stats()["tenants"]["ip:b"]["actual"] == second
+
+
+def test_binding_a_session_clears_a_shared_scope():
+    ledger = TokenLedger()
+
+    async def calls():
+        bind_shared_usage(["s1", "s2"], "end-interview")
+        bind_usage("ip:c", "s3", "submit-answer")
+        ledger.record("prompt", "response")
+
+    asyncio.run(calls())
+    assert ledger.session_usage("s3")["calls"] == 1
+    assert ledger.session_usage("s1") is None
@@ -0,0 +1,376 @@
+import os
+import json
+import time
+import asyncio
+from typing import Dict, List, Optional, Tuple
+
+from session_store import SESSION_TTL_SECONDS, SessionMutation, SessionStore
+
+# Directory holding the transcript log and its snapshots; empty disables the log
+TRANSCRIPT_LOG_DIR = os.getenv("TRANSCRIPT_LOG_DIR", "")
+# Appends arriving within this window share one write + fsync
+TRANSCRIPT_FSYNC_MS = float(os.getenv("TRANSCRIPT_FSYNC_MS", "5"))
+# Logged events between compacted snapshots (bounds what startup has to scan)
+TRANSCRIPT_SNAPSHOT_EVERY = int(os.getenv("TRANSCRIPT_SNAPSHOT_EVERY", "5000"))
+
+LOG_PREFIX = "transcript-"
+SNAPSHOT_PREFIX = "snapshot-"
+
+# Where one record of a session lives: (file name, byte offset)
+Location = Tuple[str, int]
+
+
+def encode_record(session_id: str, timestamp: float, payload: dict) -> bytes:
+    """One log line: session id, time and the JSON payload, tab-separated
+
+    The id and time come first so recovery can index a file without parsing
+    any JSON.
+    """
+    body = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return f"{session_id}\t{timestamp:.3f}\t".encode("utf-8") + body + b"\n"
+
+
+def decode_record(line: bytes) -> Tuple[str, float, dict]:
+    session_id, timestamp, body = line.rstrip(b"\n").split(b"\t", 2)
+    return session_id.decode("utf-8"), float(timestamp), json.loads(body)
+
+
+def apply_event(session: Optional[dict], event: dict) -> Optional[dict]:
+    """Fold one logged event into a session
+
+    `start` and `snapshot` events carry a whole session. A `turn` is applied
+    only if it is the next one, so a retried request can never add the same
+    answer twice.
+    """
+    kind = event["type"]
+    if kind in ("start", "snapshot"):
+        return event["session"]
+    if session is None:
+        return None
+    if kind == "turn":
+        if event["question_number"] != session["question_count"] + 1:
+            return session
+        session["conversation_history"].append(event["turn"])
+        session["question_count"] = event["question_number"]
+        session["current_question"] = event["next_question"]
+        session["last_question_kind"] = event["kind"]
+        if event.get("idempotency_key"):
+            session.setdefault("idempotency_keys", {})[event["idempotency_key"]] = event["question_number"]
+    elif kind == "feedback":
+        session["feedback"] = event["feedback"]
+    return session
+
+
+def _generation(name: str) -> int:
+    return int(name.rsplit("-", 1)[1].split(".", 1)[0])
+
+
+class TranscriptLog:
+    """Append-only log of interview events with batched fsyncs and compacted snapshots
+
+    Every event is written to the current `transcript-N.log` and acknowledged
+    once it has been fsynced. Appends arriving within TRANSCRIPT_FSYNC_MS
+    share a single write and fsync. Startup only indexes where each
+    session's records are; sessions are rebuilt from them on first access.
+
+    After TRANSCRIPT_SNAPSHOT_EVERY events, appends move to a new log file
+    and every live session is folded into one `snapshot-N.log` line. The
+    snapshot replaces all older files, so startup scans at most one
+    snapshot plus the events logged since.
+    """
+
+    def __init__(self, directory: str = TRANSCRIPT_LOG_DIR, fsync_ms: float = TRANSCRIPT_FSYNC_MS,
+                 snapshot_every: int = TRANSCRIPT_SNAPSHOT_EVERY, ttl: int = SESSION_TTL_SECONDS):
+        self.directory = directory
+        self.fsync_interval = fsync_ms / 1000.0
+        self.snapshot_every = snapshot_every
+        self.ttl = ttl
+        # session_id -> (time of its last event, where its records are)
+        self._index: Dict[str, Tuple[float, List[Location]]] = {}
+        self._pending: List[Tuple[str, float, dict, asyncio.Future]] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        self._compaction: Optional[asyncio.Task] = None
+        # Held while writing, switching files or reading records back
+        self._lock = asyncio.Lock()
+        self._file = None
+        self._log_name = ""
+        self._generation = 0
+        self.events_since_snapshot = 0
+        self.appended = 0
+        self.fsyncs = 0
+        self.rebuilt = 0
+        self.snapshots = 0
+        self.recovered_sessions = 0
+        self.recovery_seconds = 0.0
+        self.torn_bytes = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.directory)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    async def open(self) -> None:
+        """Index existing snapshots and logs, then start a new log file"""
+        if self.enabled:
+            await asyncio.to_thread(self._recover)
+
+    def _recover(self) -> None:
+        started = time.perf_counter()
+        os.makedirs(self.directory, exist_ok=True)
+        names = os.listdir(self.directory)
+        snapshots = sorted((n for n in names if n.startswith(SNAPSHOT_PREFIX) and n.endswith(".log")),
+                           key=_generation)
+        logs = sorted((n for n in names if n.startswith(LOG_PREFIX) and n.endswith(".log")), key=_generation)
+        covered = _generation(snapshots[-1]) if snapshots else -1
+        # Older files are already folded into the latest snapshot
+        for name in snapshots[:-1] + [n for n in logs if _generation(n) <= covered]:
+            os.remove(self._path(name))
+        logs = [n for n in logs if _generation(n) > covered]
+
+        for name in snapshots[-1:] + logs:
+            path = self._path(name)
+            offset = 0
+            with open(path, "rb") as f:
+                for line in f:
+                    parts = line.split(b"\t", 2)
+                    # A crash can leave the last write unfinished
+                    if not line.endswith(b"\n") or len(parts) != 3:
+                        break
+                    session_id = parts[0].decode("utf-8")
+                    locations = self._index.get(session_id, (0.0, []))[1]
+                    locations.append((name, offset))
+                    self._index[session_id] = (float(parts[1]), locations)
+                    offset += len(line)
+                    if name.startswith(LOG_PREFIX):
+                        self.events_since_snapshot += 1
+            size = os.path.getsize(path)
+            if offset < size:
+                self.torn_bytes += size - offset
+                with open(path, "r+b") as f:
+                    f.truncate(offset)
+
+        self._generation = max([covered] + [_generation(n) for n in logs]) + 1
+        self._log_name = f"{LOG_PREFIX}{self._generation:08d}.log"
+        self._file = open(self._path(self._log_name), "ab")
+        self.recovered_sessions = len(self._index)
+        self.recovery_seconds = time.perf_counter() - started
+
+    async def append(self, session_id: str, event: dict) -> None:
+        """Log an event and wait until it is on disk"""
+        if not self.enabled:
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((session_id, time.time(), event, future))
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_soon())
+        # A caller that disconnects mustn't stop the write
+        await asyncio.shield(future)
+
+    async def _flush_soon(self) -> None:
+        await asyncio.sleep(self.fsync_interval)
+        self._flush_task = None
+        async with self._lock:
+            batch, self._pending = self._pending, []
+            if not batch:
+                return
+            records = [encode_record(session_id, timestamp, event) for session_id, timestamp, event, _ in batch]
+            try:
+                offsets = await asyncio.to_thread(self._write, records)
+            except Exception as e:
+                print(f"Error writing transcript log: {e}")
+                for *_, future in batch:
+                    future.set_exception(e)
+                return
+            for (session_id, timestamp, _, future), offset in zip(batch, offsets):
+                locations = self._index.get(session_id, (0.0, []))[1]
+                locations.append((self._log_name, offset))
+                self._index[session_id] = (timestamp, locations)
+                future.set_result(None)
+            self.appended += len(batch)
+            self.events_since_snapshot += len(batch)
+        if self.events_since_snapshot >= self.snapshot_every and self._compaction is None:
+            self._compaction = asyncio.create_task(self._compact())
+
+    def _write(self, records: List[bytes]) -> List[int]:
+        offsets = []
+        offset = self._file.tell()
+        for record in records:
+            offsets.append(offset)
+            offset += len(record)
+        self._file.write(b"".join(records))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.fsyncs += 1
+        return offsets
+
+    def _read_session(self, locations: List[Location]) -> Optional[dict]:
+        session = None
+        handles = {}
+        try:
+            for name, offset in locations:
+                if name not in handles:
+                    handles[name] = open(self._path(name), "rb")
+                handles[name].seek(offset)
+                session = apply_event(session, decode_record(handles[name].readline())[2])
+        finally:
+            for handle in handles.values():
+                handle.close()
+        return session
+
+    async def rebuild(self, session_id: str) -> Optional[dict]:
+        """Rebuild a session from its logged events, if it has any that haven't expired"""
+        entry = self._index.get(session_id)
+        if entry is None or entry[0] < time.time() - self.ttl:
+            return None
+        async with self._lock:
+            # Re-read under the lock: a compaction may have moved the records
+            entry = self._index.get(session_id)
+            if entry is None:
+                return None
+            try:
+                session = await asyncio.to_thread(self._read_session, list(entry[1]))
+            except (OSError, ValueError) as e:
+                print(f"Error rebuilding session {session_id} from the transcript log: {e}")
+                return None
+        if session is not None:
+            self.rebuilt += 1
+        return session
+
+    async def _compact(self) -> None:
+        try:
+            async with self._lock:
+                # New events go to a fresh log while the snapshot is written
+                covered = self._generation
+                self._file.close()
+                self._generation += 1
+                self._log_name = f"{LOG_PREFIX}{self._generation:08d}.log"
+                self._file = open(self._path(self._log_name), "ab")
+                self.events_since_snapshot = 0
+                cutoff = time.time() - self.ttl
+                live = [(session_id, timestamp, list(locations))
+                        for session_id, (timestamp, locations) in self._index.items() if timestamp >= cutoff]
+
+            snapshot_name = f"{SNAPSHOT_PREFIX}{covered:08d}.log"
+            snapshot_index = await asyncio.to_thread(self._write_snapshot, snapshot_name, live)
+
+            async with self._lock:
+                old_files = {name for _, _, locations in live for name, _ in locations}
+                index = {}
+                for session_id, (timestamp, locations) in self._index.items():
+                    newer = [location for location in locations if location[0] == self._log_name]
+                    if session_id in snapshot_index:
+                        index[session_id] = (timestamp, [snapshot_index[session_id]] + newer)
+                    elif newer:
+                        index[session_id] = (timestamp, newer)
+                self._index = index
+                for name in old_files | {f"{LOG_PREFIX}{covered:08d}.log"}:
+                    if name != snapshot_name and os.path.exists(self._path(name)):
+                        os.remove(self._path(name))
+            self.snapshots += 1
+        except Exception as e:
+            print(f"Error compacting transcript log: {e}")
+        finally:
+            self._compaction = None
+
+    def _write_snapshot(self, name: str, live: List[Tuple[str, float, List[Location]]]) -> Dict[str, Location]:
+        index = {}
+        temporary = self._path(name + ".tmp")
+        with open(temporary, "wb") as out:
+            offset = 0
+            for session_id, timestamp, locations in live:
+                session = self._read_session(locations)
+                if session is None:
+                    continue
+                record = encode_record(session_id, timestamp, {"type": "snapshot", "session": session})
+                out.write(record)
+                index[session_id] = (name, offset)
+                offset += len(record)
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(temporary, self._path(name))
+        return index
+
+    async def close(self) -> None:
+        """Write out pending events and close the log"""
+        if self._flush_task is not None:
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+        if self._compaction is not None:
+            await asyncio.gather(self._compaction, return_exceptions=True)
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def stats(self) -> Dict[str, object]:
+        """Appends per fsync, rebuilt sessions, snapshots and startup recovery time"""
+        return {
+            "enabled": self.enabled,
+            "indexed_sessions": len(self._index),
+            "appended": self.appended,
+            "fsyncs": self.fsyncs,
+            "events_per_fsync": round(self.appended / self.fsyncs, 2) if self.fsyncs else 0.0,
+            "events_since_snapshot": self.events_since_snapshot,
+            "snapshots": self.snapshots,
+            "rebuilt_sessions": self.rebuilt,
+            "recovered_sessions": self.recovered_sessions,
+            "recovery_ms": round(self.recovery_seconds * 1000, 2),
+            "torn_bytes": self.torn_bytes,
+        }
+
+
+class DurableSessionStore(SessionStore):
+    """Session store whose misses are rebuilt from the transcript log
+
+    Sessions lost to a restart or evicted from the store come back on their
+    next access with their full transcript. Derived state (rolling summary,
+    per-answer scores) isn't logged and is recomputed as needed.
+    """
+
+    def __init__(self, store: SessionStore, log: TranscriptLog):
+        super().__init__(store.ttl)
+        self.store = store
+        self.log = log
+        self.name = store.name
+        # Concurrent misses for one session share a single rebuild
+        self._rebuilding: Dict[str, asyncio.Task] = {}
+
+    async def _rebuild(self, session_id: str) -> Optional[dict]:
+        try:
+            session = await self.log.rebuild(session_id)
+            if session is not None:
+                await self.store.set(session_id, session)
+            return session
+        finally:
+            self._rebuilding.pop(session_id, None)
+
+    async def get(self, session_id: str) -> Optional[dict]:
+        session = await self.store.get(session_id)
+        if session is None and self.log.enabled:
+            task = self._rebuilding.get(session_id)
+            if task is None:
+                task = self._rebuilding[session_id] = asyncio.create_task(self._rebuild(session_id))
+            await asyncio.shield(task)
+            # Every caller gets its own copy, as with the other stores
+            session = await self.store.get(session_id)
+        return session
+
+    async def set(self, session_id: str, session: dict) -> None:
+        await self.store.set(session_id, session)
+
+    async def delete(self, session_id: str) -> None:
+        await self.store.delete(session_id)
+
+    async def update(self, session_id: str, mutate: SessionMutation) -> Optional[dict]:
+        # Bring the session back into the store first if it was lost
+        if await self.get(session_id) is None:
+            return None
+        return await self.store.update(session_id, mutate)
+
+    async def size(self) -> int:
+        return await self.store.size()
+
+    async def stats(self) -> Dict[str, object]:
+        stats = await self.store.stats()
+        stats["transcript_log"] = self.log.stats()
+        return stats